@@ -0,0 +1,124 @@
+import json
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import groupby
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .conditional import bump_versions
+from .models import Attendance, AttendanceArchive
+from .partitions import add_months, drop_partition, ensure_partitions, lock_partition, month_start
+
+
+# Every month overlapping the last LIVE_DAYS days stays live, so the endpoints that read at
+# most 30 days back never need the archive, even just after a month boundary
+LIVE_DAYS = 31
+
+BATCH_SIZE = 1000
+
+
+def _timestamp(value):
+    return int(value.timestamp()) if value else None
+
+
+def _datetime(value):
+    return datetime.fromtimestamp(value, dt_timezone.utc) if value is not None else None
+
+
+# rows: (id, date, clock_in, clock_out) of one employee and month. Stored as JSON
+# [id, day of month, clock_in epoch, clock_out epoch] lists, compressed.
+def pack(rows):
+    data = [[pk, day.day, _timestamp(clock_in), _timestamp(clock_out)] for pk, day, clock_in, clock_out in rows]
+    return zlib.compress(json.dumps(data, separators=(',', ':')).encode(), 9)
+
+
+def unpack(archive):
+    for pk, day, clock_in, clock_out in json.loads(zlib.decompress(archive.payload)):
+        yield pk, archive.month.replace(day=day), _datetime(clock_in), _datetime(clock_out)
+
+
+def live_since(today=None):
+    return month_start((today or timezone.now().date()) - timedelta(days=LIVE_DAYS))
+
+
+# Yields (employee_id, date, clock_in, clock_out) for the employees (ids or an id queryset)
+# between start and end from the archive, oldest first per employee
+def archived_rows(employee_ids, start=None, end=None):
+    archives = AttendanceArchive.objects.filter(employee_id__in=employee_ids)
+    if start is not None:
+        archives = archives.filter(month__gte=month_start(start))
+    if end is not None:
+        archives = archives.filter(month__lte=end)
+    for archive in archives.order_by('employee_id', 'month').iterator(chunk_size=BATCH_SIZE):
+        for _, day, clock_in, clock_out in unpack(archive):
+            if (start is None or day >= start) and (end is None or day <= end):
+                yield archive.employee_id, day, clock_in, clock_out
+
+
+# Live rows followed by archived ones, as (employee_id, date, clock_in, clock_out). The archive
+# is only consulted when the range reaches back past the months that always stay live.
+def attendance_rows(employee_ids, start, end, chunk_size=5000):
+    live = Attendance.objects.filter(employee_id__in=employee_ids, date__range=(start, end))
+    yield from live.values_list('employee_id', 'date', 'clock_in', 'clock_out').iterator(chunk_size=chunk_size)
+    if start < live_since():
+        yield from archived_rows(employee_ids, start, end)
+
+
+# Moves one month of live attendance into compressed archive blocks, merging with blocks an
+# earlier run wrote for the same employees, then drops the month's partition (PostgreSQL) or
+# deletes its rows. Runs in one transaction; returns the number of rows archived.
+def archive_month(month, batch_size=BATCH_SIZE):
+    end = add_months(month, 1)
+    with transaction.atomic():
+        lock_partition(month)
+        rows = (
+            Attendance.objects.filter(date__gte=month, date__lt=end)
+            .order_by('employee_id', 'date')
+            .values_list('employee_id', 'id', 'date', 'clock_in', 'clock_out')
+        )
+        existing = set(AttendanceArchive.objects.filter(month=month).values_list('employee_id', flat=True))
+        blocks, archived = [], 0
+        for employee_id, group in groupby(rows.iterator(chunk_size=batch_size), key=lambda row: row[0]):
+            group = [row[1:] for row in group]
+            if employee_id in existing:
+                earlier = AttendanceArchive.objects.get(employee_id=employee_id, month=month)
+                kept = {row[0]: row for row in unpack(earlier)}
+                kept.update((row[0], row) for row in group)
+                group = sorted(kept.values(), key=lambda row: row[1])
+            blocks.append(AttendanceArchive(employee_id=employee_id, month=month, days=len(group), payload=pack(group)))
+            archived += len(group)
+            if len(blocks) >= batch_size:
+                _save_blocks(blocks, batch_size)
+                blocks = []
+        _save_blocks(blocks, batch_size)
+
+        # A raw DELETE, because Attendance's delete signals would take the rows out of the
+        # rollups and log tombstones; archived rows still count and are still readable
+        drop_partition(month)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM "{Attendance._meta.db_table}" WHERE date >= %s AND date < %s', [month, end])
+        bump_versions(Attendance)
+    return archived
+
+
+def _save_blocks(blocks, batch_size):
+    AttendanceArchive.objects.bulk_create(
+        blocks,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['employee', 'month'],
+        update_fields=['days', 'payload', 'archived_at'],
+    )
+
+
+# Creates upcoming partitions, then archives every month older than both the newest
+# `keep_months` and live_since(). Returns [(month, rows archived)].
+def apply_retention(keep_months, months_ahead=3, batch_size=BATCH_SIZE, today=None):
+    today = today or timezone.now().date()
+    current = month_start(today)
+    ensure_partitions(current, add_months(current, months_ahead))
+    cutoff = min(add_months(current, 1 - max(keep_months, 1)), live_since(today))
+    months = Attendance.objects.filter(date__lt=cutoff).dates('date', 'month')
+    return [(month, archive_month(month, batch_size)) for month in months]
+
@@ -0,0 +1,168 @@
+import asyncio
+import json
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F
+from django.http import HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException
+from rest_framework.utils.encoders import JSONEncoder
+
+from .attendance import monthly_summary
+from .authentication import CachedJWTAuthentication
+from .conditional import compute_validators, is_not_modified, set_validator_headers
+from .models import Attendance, CustomUser, Department, Employee, Task
+from .events import ADMIN_CHANNEL, get_broker, user_channel
+from .serializers import AttendanceSerializer, EmployeeSerializer, TaskSerializer
+from .sync import is_admin, visible_tasks
+from .views import EmployeeMonthlyAttendanceView, MyAttendanceView, TaskViewSet, department_employees, my_profile
+
+
+_authenticator = CachedJWTAuthentication()
+
+
+# Serves GET natively on the event loop with the async ORM. Other methods, and
+# requests the async path does not handle (`delegate_when`), go to the sync view.
+# `etag_models` enables the same conditional GET handling as the sync views.
+def async_read_view(fallback, delegate_when=None, etag_models=()):
+    fallback = sync_to_async(fallback)
+
+    def decorator(view):
+        @csrf_exempt
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method != 'GET' or (delegate_when and delegate_when(request)):
+                return await fallback(request, *args, **kwargs)
+
+            try:
+                authenticated = await sync_to_async(_authenticator.authenticate)(request)
+            except APIException as exc:
+                return JsonResponse({'detail': exc.detail}, status=exc.status_code)
+            if authenticated is None:
+                return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+            request.user = authenticated[0]
+
+            validators = None
+            if etag_models:
+                validators = await sync_to_async(compute_validators)(request, etag_models)
+                if is_not_modified(request, *validators):
+                    response = HttpResponseNotModified()
+                    set_validator_headers(response, *validators)
+                    return response
+
+            data, status = await view(request, *args, **kwargs)
+            response = JsonResponse(data, encoder=JSONEncoder, safe=False, status=status)
+            if validators and status == 200:
+                set_validator_headers(response, *validators)
+            return response
+        return wrapper
+    return decorator
+
+
+# Paginated and sparse-fieldset listings are left to the sync view
+def _paginated_or_sparse(request):
+    return any(param in request.GET for param in ('cursor', 'page_size', 'fields', 'exclude'))
+
+
+@async_read_view(my_profile, etag_models=(Employee, Department, CustomUser))
+async def my_profile_async(request):
+    try:
+        employee = await EmployeeSerializer.setup_eager_loading(Employee.objects.all()).aget(user=request.user)
+    except Employee.DoesNotExist:
+        return {'error': 'Employee not found'}, 404
+    return EmployeeSerializer(employee).data, 200
+
+
+@async_read_view(MyAttendanceView.as_view(), etag_models=MyAttendanceView.etag_models)
+async def my_attendance_async(request):
+    employee_id = getattr(getattr(request.user, 'employee_profile', None), 'id', None)
+    if employee_id is None:
+        return {'error': 'Employee not found'}, 404
+    attendances = AttendanceSerializer.setup_eager_loading(
+        Attendance.objects.filter(employee_id=employee_id)
+    ).order_by('-date')[:30]
+    return AttendanceSerializer([att async for att in attendances], many=True).data, 200
+
+
+@async_read_view(EmployeeMonthlyAttendanceView.as_view(), etag_models=EmployeeMonthlyAttendanceView.etag_models)
+async def monthly_attendance_async(request, employee_id):
+    today = timezone.now().date()
+    if not await Employee.objects.filter(id=employee_id).aexists():
+        return {'error': 'Employee not found'}, 404
+    attendances = Attendance.objects.filter(employee_id=employee_id, date__gte=today - timedelta(days=30))
+    return monthly_summary([att async for att in attendances], today), 200
+
+
+@async_read_view(department_employees, etag_models=(Employee, CustomUser))
+async def department_employees_async(request, department_id):
+    employees = Employee.objects.filter(department__id=department_id).values(
+        'id', 'first_name', 'last_name', 'position', 'salary', user_email=F('user__email'),
+    )
+    return [employee async for employee in employees], 200
+
+
+# Filtered and re-ordered task lists are left to the sync view as well
+def _filtered_tasks(request):
+    return _paginated_or_sparse(request) or any(param in request.GET for param in TaskViewSet.filter_params)
+
+
+@async_read_view(TaskViewSet.as_view({'get': 'list', 'post': 'create'}), delegate_when=_filtered_tasks, etag_models=TaskViewSet.etag_models)
+async def task_list_async(request):
+    tasks = visible_tasks(request.user, TaskSerializer.setup_eager_loading(Task.objects.all())).order_by('-created_at', '-id')
+    return TaskSerializer([task async for task in tasks], many=True).data, 200
+
+
+# EventSource cannot set headers, so the stream also accepts the access token as ?token=
+def _authenticate_stream(request):
+    raw_token = request.GET.get('token')
+    if not raw_token:
+        return _authenticator.authenticate(request)
+    validated = _authenticator.get_validated_token(raw_token)
+    return _authenticator.get_user(validated), validated
+
+
+# Django 5.0+ cancels this generator when the client disconnects, so the finally block is
+# what unsubscribes a closed connection (requirements.txt pins Django>=5.0 for that)
+async def _event_frames(subscription):
+    try:
+        yield 'retry: 5000\n\n'
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), settings.EVENT_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing an idle connection
+                yield ': heartbeat\n\n'
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        subscription.close()
+
+
+# Server-sent stream of task and request status changes for the caller. An idle
+# connection is one suspended coroutine and a small queue, so it needs ASGI; clients
+# reconcile anything missed while disconnected through /api/sync/.
+@csrf_exempt
+async def event_stream(request):
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    if not hasattr(request, 'scope'):
+        return JsonResponse({'detail': 'The event stream is only served under ASGI.'}, status=501)
+    try:
+        authenticated = await sync_to_async(_authenticate_stream)(request)
+    except APIException as exc:
+        return JsonResponse({'detail': exc.detail}, status=exc.status_code)
+    if authenticated is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    user = authenticated[0]
+
+    channels = [user_channel(user.pk)]
+    if is_admin(user):
+        channels.append(ADMIN_CHANNEL)
+    response = StreamingHttpResponse(_event_frames(get_broker().subscribe(channels)), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
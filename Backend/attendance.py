@@ -0,0 +1,253 @@
+from array import array
+from datetime import timedelta, timezone as dt_timezone
+from itertools import chain
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, When
+
+from .archive import archived_rows, attendance_rows, live_since
+from .conditional import bump_versions
+from .models import Attendance, ChangeLogEntry, DepartmentDailyHours, Employee, EmployeeMonthlyHours
+
+
+ATTENDANCE_ACTIONS = ('clock_in', 'clock_out')
+
+
+# Attendance rows are keyed by the UTC calendar day of the clock event
+def attendance_date(timestamp):
+    return timestamp.astimezone(dt_timezone.utc).date()
+
+
+def worked_seconds(clock_in, clock_out):
+    if clock_in and clock_out:
+        return (clock_out - clock_in).total_seconds()
+    return 0
+
+
+# Rollups store whole seconds per attendance row so incremental updates and
+# rebuild_attendance_rollups always agree
+def rollup_values(clock_in, clock_out):
+    return int(round(worked_seconds(clock_in, clock_out))), 1 if clock_in else 0
+
+
+# Adds the difference between each row's old and new clock values to the
+# monthly and department rollups. `changes` holds
+# (employee_id, department_id, date, (old_in, old_out), (new_in, new_out)); a None
+# employee or department leaves that rollup alone. Worked time is always filed under the
+# employee's current department, as rebuild_attendance_rollups does.
+def update_rollups(changes):
+    monthly = {}
+    daily = {}
+    for employee_id, department_id, day, old, new in changes:
+        old_seconds, old_present = rollup_values(*old)
+        new_seconds, new_present = rollup_values(*new)
+        delta = (new_seconds - old_seconds, new_present - old_present)
+        if delta == (0, 0):
+            continue
+        for bucket, key in ((monthly, (employee_id, day.replace(day=1))), (daily, (department_id, day))):
+            if key[0] is None:
+                continue
+            seconds, present = bucket.get(key, (0, 0))
+            bucket[key] = (seconds + delta[0], present + delta[1])
+
+    _increment(EmployeeMonthlyHours, ('employee_id', 'month'), 'days_present', monthly)
+    _increment(DepartmentDailyHours, ('department_id', 'date'), 'employees_present', daily)
+
+
+# Refiles an employee's worked time, live and archived, from one department's daily rollup
+# to another's (either may be None)
+def move_department_hours(employee_id, old_department_id, new_department_id, include_live=True):
+    rows = (row[1:] for row in archived_rows([employee_id]))
+    if include_live:
+        live = Attendance.objects.filter(employee_id=employee_id).values_list('date', 'clock_in', 'clock_out')
+        rows = chain(live.iterator(), rows)
+    changes = []
+    for day, clock_in, clock_out in rows:
+        changes.append((None, old_department_id, day, (clock_in, clock_out), (None, None)))
+        changes.append((None, new_department_id, day, (None, None), (clock_in, clock_out)))
+    update_rollups(changes)
+
+
+# Creates missing rollup rows, then applies every delta in a single UPDATE ... CASE.
+# Rows a decrease leaves empty are removed, since a rebuild would not create them.
+def _increment(model, key_fields, count_field, deltas):
+    if not deltas:
+        return
+    model.objects.bulk_create(
+        [model(**dict(zip(key_fields, key))) for key in deltas],
+        ignore_conflicts=True,
+    )
+    rows = model.objects.filter(**{
+        f'{field}__in': {key[position] for key in deltas} for position, field in enumerate(key_fields)
+    }).values_list('id', *key_fields)
+    ids = {tuple(row[1:]): row[0] for row in rows if tuple(row[1:]) in deltas}
+    model.objects.filter(id__in=ids.values()).update(
+        seconds_worked=Case(
+            *[When(id=ids[key], then=F('seconds_worked') + seconds) for key, (seconds, _) in deltas.items()],
+            output_field=model._meta.get_field('seconds_worked'),
+        ),
+        **{count_field: Case(
+            *[When(id=ids[key], then=F(count_field) + present) for key, (_, present) in deltas.items()],
+            output_field=IntegerField(),
+        )},
+    )
+    if any(seconds < 0 or present < 0 for seconds, present in deltas.values()):
+        model.objects.filter(id__in=ids.values(), seconds_worked=0, **{count_field: 0}).delete()
+
+
+def apply_attendance_action(attendance, action, timestamp):
+    if action == 'clock_in':
+        attendance.clock_in = timestamp
+    elif action == 'clock_out':
+        attendance.clock_out = timestamp
+    else:
+        raise ValueError(f'Invalid action: {action}')
+
+
+# One entry per day for the `days` days ending today, oldest first
+def monthly_summary(attendances, today, days=30):
+    # Create a map to quickly find attendance by date
+    attendance_map = {att.date: att for att in attendances}
+    result = []
+
+    for i in range(days):
+        day = today - timedelta(days=i)
+        att = attendance_map.get(day)
+        result.append({
+            'date': day,
+            'clock_in': att.clock_in if att else None,
+            'clock_out': att.clock_out if att else None,
+            'was_present': bool(att and att.clock_in),
+        })
+
+    return result[::-1]  # Reverse for chronological order
+
+
+# Applies many clock events in one transaction: one query for employees, one
+# locking read of existing rows, then a bulk update and conflict-safe bulk inserts.
+# Returns a result per entry, in input order.
+def mark_attendance_bulk(entries):
+    employees = Employee.objects.in_bulk({entry['employee_id'] for entry in entries})
+    results = [None] * len(entries)
+    valid = []
+    for index, entry in enumerate(entries):
+        if entry['employee_id'] in employees:
+            valid.append((index, entry))
+        else:
+            results[index] = {'error': 'Employee not found'}
+
+    if not valid:
+        return results
+
+    keys = {(entry['employee_id'], attendance_date(entry['timestamp'])) for _, entry in valid}
+    with transaction.atomic():
+        existing = {
+            (row.employee_id, row.date): row
+            for row in Attendance.objects.select_for_update().filter(
+                employee_id__in={employee_id for employee_id, _ in keys},
+                date__in={day for _, day in keys},
+            )
+            if (row.employee_id, row.date) in keys
+        }
+
+        rows = {}
+        touched = {}
+        previous = {}
+        for index, entry in valid:
+            key = (entry['employee_id'], attendance_date(entry['timestamp']))
+            if key not in rows:
+                rows[key] = existing.get(key) or Attendance(employee_id=key[0], date=key[1])
+                touched[key] = set()
+                previous[key] = (rows[key].clock_in, rows[key].clock_out)
+            apply_attendance_action(rows[key], entry['action'], entry['timestamp'])
+            touched[key].add(entry['action'])
+
+        updated = [rows[key] for key in rows if key in existing]
+        if updated:
+            Attendance.objects.bulk_update(updated, ['clock_in', 'clock_out'])
+
+        # New rows only overwrite the columns they set, so a row inserted
+        # concurrently by the single-entry endpoint keeps its other clock value.
+        created = {}
+        for key, row in rows.items():
+            if key not in existing:
+                created.setdefault(tuple(sorted(touched[key])), []).append(row)
+        for fields, batch in created.items():
+            Attendance.objects.bulk_create(
+                batch,
+                update_conflicts=True,
+                unique_fields=['employee', 'date'],
+                update_fields=list(fields),
+            )
+
+        update_rollups(
+            (key[0], employees[key[0]].department_id, key[1], previous[key], (row.clock_in, row.clock_out))
+            for key, row in rows.items()
+        )
+        bump_versions(Attendance)
+
+        missing_keys = [key for key, row in rows.items() if row.pk is None]
+        if missing_keys:
+            ids = {
+                (row['employee_id'], row['date']): row['id']
+                for row in Attendance.objects.filter(
+                    employee_id__in={employee_id for employee_id, _ in missing_keys},
+                    date__in={day for _, day in missing_keys},
+                ).values('id', 'employee_id', 'date')
+            }
+            for key in missing_keys:
+                rows[key].pk = ids.get(key)
+
+        ChangeLogEntry.objects.bulk_create(
+            [ChangeLogEntry.for_instance(row, employee=employees[key[0]]) for key, row in rows.items()]
+        )
+        ChangeLogEntry.sequence_on_commit()
+
+    for index, entry in valid:
+        row = rows[(entry['employee_id'], attendance_date(entry['timestamp']))]
+        row.employee = employees[entry['employee_id']]
+        results[index] = {'attendance': row}
+    return results
+
+
+# Builds an employees x days grid for the given employee queryset from one range
+# query (plus the archive for ranges reaching back that far). Cells live in flat arrays indexed by row * days + column, so the grid
+# costs nine bytes per cell however large the team or window.
+def attendance_matrix(employees, start, end):
+    days = (end - start).days + 1
+    team = list(employees.order_by('last_name', 'first_name', 'id').values_list('id', 'first_name', 'last_name'))
+    rows = {employee_id: row for row, (employee_id, _, _) in enumerate(team)}
+    present = bytearray(len(team) * days)
+    hours = array('d', bytes(8 * len(team) * days))
+
+    for employee_id, day, clock_in, clock_out in attendance_rows(employees.values('id'), start, end):
+        cell = rows[employee_id] * days + (day - start).days
+        present[cell] = 1 if clock_in else 0
+        hours[cell] = worked_seconds(clock_in, clock_out) / 3600
+
+    return {
+        'start': start,
+        'end': end,
+        'dates': [start + timedelta(days=offset) for offset in range(days)],
+        'employees': [{'id': pk, 'name': f'{first} {last}'} for pk, first, last in team],
+        'present': [list(present[row * days:(row + 1) * days]) for row in range(len(team))],
+        'hours': [[round(value, 2) for value in hours[row * days:(row + 1) * days]] for row in range(len(team))],
+    }
+
+
+# One employee's records between start and end, live and archived, oldest first
+def attendance_history(employee_id, start, end):
+    live = Attendance.objects.filter(employee_id=employee_id, date__range=(start, end)).values_list('date', 'clock_in', 'clock_out')
+    records = [(day, clock_in, clock_out, False) for day, clock_in, clock_out in live]
+    if start < live_since():
+        records += [(day, clock_in, clock_out, True) for _, day, clock_in, clock_out in archived_rows([employee_id], start, end)]
+    return [
+        {
+            'date': day,
+            'clock_in': clock_in,
+            'clock_out': clock_out,
+            'hours_worked': round(worked_seconds(clock_in, clock_out) / 3600, 2),
+            'archived': archived,
+        }
+        for day, clock_in, clock_out, archived in sorted(records, key=lambda record: record[0])
+    ]
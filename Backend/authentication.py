@@ -0,0 +1,47 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+def user_cache_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    if user_id is not None and settings.AUTH_USER_CACHE:
+        caches[settings.AUTH_USER_CACHE].delete(user_cache_key(user_id))
+
+
+# JWTAuthentication that resolves the user with employee_profile already loaded, from a
+# TTL cache when AUTH_USER_CACHE names one. Backend.signals drops the entry whenever the
+# user or profile changes, which only reaches every worker if the cache is shared.
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        cache = caches[settings.AUTH_USER_CACHE] if settings.AUTH_USER_CACHE else None
+        key = user_cache_key(user_id)
+        user = cache.get(key) if cache else None
+        if user is None:
+            try:
+                user = self.user_model.objects.select_related('employee_profile').get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found') from e
+            if cache:
+                cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        return user
@@ -0,0 +1,113 @@
+import hashlib
+from functools import wraps
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.response import Response
+
+from .models import TableVersion
+
+
+def table_name(model):
+    return model._meta.label_lower
+
+
+# Bumps the models' versions once the surrounding transaction commits, so a
+# reader can never pair the new version with rows it cannot see yet
+def bump_versions(*models):
+    names = [table_name(model) for model in models]
+    transaction.on_commit(lambda: TableVersion.bump(*names))
+
+
+# {table name: (version, updated_at)} for `models`, (0, None) for tables never written
+def table_versions(models):
+    names = [table_name(model) for model in models]
+    versions = dict.fromkeys(names, (0, None))
+    versions.update(
+        (name, (version, updated_at))
+        for name, version, updated_at in TableVersion.objects.filter(name__in=names).values_list('name', 'version', 'updated_at')
+    )
+    return versions
+
+
+# Returns (etag, last_modified) for the request from one query on TableVersion.
+# The ETag covers the URL, the caller and every version the response depends on.
+def compute_validators(request, models):
+    versions = table_versions(models)
+    names = sorted(versions)
+    user_id = getattr(request.user, 'pk', None)
+    fingerprint = f"{request.get_full_path()}|{user_id}|" + ','.join(f'{name}={versions[name][0]}' for name in names)
+    etag = '"%s"' % hashlib.md5(fingerprint.encode()).hexdigest()
+
+    # Only advertise Last-Modified once its second has passed, so a later write
+    # can never share the second a client was told about
+    timestamps = [updated_at for _, updated_at in versions.values() if updated_at]
+    last_modified = int(max(timestamps).timestamp()) if len(timestamps) == len(names) else None
+    if last_modified is not None and last_modified + 1 > timezone.now().timestamp():
+        last_modified = None
+    return etag, last_modified
+
+
+def is_not_modified(request, etag, last_modified):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return '*' in tags or etag in tags
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return last_modified is not None and if_modified_since is not None and last_modified <= if_modified_since
+
+
+def set_validator_headers(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Authorization',))
+
+
+class NotModified(Exception):
+    pass
+
+
+# Answers GET/HEAD with 304 before any serialization when the client's validators
+# still match the versions of `etag_models`
+class ConditionalGetMixin:
+    etag_models = ()
+
+    def initial(self, request, *args, **kwargs):
+        self.validators = None
+        super().initial(request, *args, **kwargs)
+        if request.method in ('GET', 'HEAD') and self.etag_models:
+            self.validators = compute_validators(request, self.etag_models)
+            if is_not_modified(request, *self.validators):
+                raise NotModified
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=304)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, 'validators', None) and response.status_code in (200, 304):
+            set_validator_headers(response, *self.validators)
+        return response
+
+
+# Function-view equivalent of ConditionalGetMixin; apply beneath @api_view
+def conditional_get(*models):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            validators = compute_validators(request, models)
+            if is_not_modified(request, *validators):
+                response = Response(status=304)
+            else:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                set_validator_headers(response, *validators)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,65 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import DeadlineDigest, Task, TaskDeadlineNotice
+
+
+OPEN_STATUSES = ('in_progress', 'submitted')
+BATCH_SIZE = 5000
+
+
+# Yields batches of (id, deadline, assigned_by, assignee's manager) for open tasks due on or
+# before `horizon`. Each status is walked separately in (deadline, id) order, so every batch
+# is a range read of the (status, deadline) index that resumes where the last one stopped.
+def open_tasks_due(horizon, batch_size=BATCH_SIZE):
+    for status in OPEN_STATUSES:
+        tasks = Task.objects.filter(status=status, deadline__lte=horizon).order_by('deadline', 'id')
+        after = None
+        while True:
+            batch = tasks
+            if after is not None:
+                batch = batch.filter(Q(deadline__gt=after[0]) | Q(deadline=after[0], id__gt=after[1]))
+            rows = list(batch.values_list('id', 'deadline', 'assigned_by_id', 'assigned_to__manager_id')[:batch_size])
+            if not rows:
+                break
+            yield rows
+            after = rows[-1][1], rows[-1][0]
+
+
+# Records a notice for every open task that is overdue or due within `due_within` days, for
+# whoever assigned it (or the assignee's manager), and rewrites today's per-manager digests.
+# Safe to run repeatedly or concurrently: notices are insert-or-ignore on their unique key,
+# digests are upserted from this scan's totals, and digests this scan did not touch are
+# dropped.
+def scan_deadlines(today=None, due_within=2, batch_size=BATCH_SIZE):
+    today = today or timezone.now().date()
+    started = timezone.now()
+    digests = {}
+    scanned = 0
+    for rows in open_tasks_due(today + timedelta(days=due_within), batch_size):
+        notices = []
+        for task_id, deadline, assigned_by_id, manager_id in rows:
+            recipient = assigned_by_id or manager_id
+            if recipient is None:
+                continue
+            kind = 'overdue' if deadline < today else 'due_soon'
+            notices.append(TaskDeadlineNotice(task_id=task_id, kind=kind, deadline=deadline, recipient_id=recipient))
+            digest = digests.setdefault(recipient, {'overdue': 0, 'due_soon': 0, 'oldest_deadline': deadline})
+            digest[kind] += 1
+            digest['oldest_deadline'] = min(digest['oldest_deadline'], deadline)
+        TaskDeadlineNotice.objects.bulk_create(notices, ignore_conflicts=True)
+        scanned += len(rows)
+
+    with transaction.atomic():
+        DeadlineDigest.objects.bulk_create(
+            [DeadlineDigest(manager_id=manager_id, date=today, updated_at=started, **digest) for manager_id, digest in digests.items()],
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['manager', 'date'],
+            update_fields=['overdue', 'due_soon', 'oldest_deadline', 'updated_at'],
+        )
+        DeadlineDigest.objects.filter(date=today, updated_at__lt=started).delete()
+    return {'scanned': scanned, 'managers': len(digests)}
@@ -0,0 +1,82 @@
+import asyncio
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+def user_channel(user_id):
+    return f'user:{user_id}'
+
+
+ADMIN_CHANNEL = 'role:admin'
+
+
+class Subscription:
+    def __init__(self, broker, channels, queue, loop):
+        self.broker = broker
+        self.channels = channels
+        self.queue = queue
+        self.loop = loop
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+# Fans events out to asyncio queues of subscribers in this process. publish() is
+# thread-safe, so sync views and signals can call it. A broker-backed class with the
+# same subscribe/unsubscribe/publish methods can replace it through EVENT_BROKER.
+class InProcessBroker:
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, tuple(channels), asyncio.Queue(self.queue_size), asyncio.get_running_loop())
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+    def publish(self, channels, event):
+        with self._lock:
+            targets = set().union(*(self._subscribers.get(channel, ()) for channel in channels))
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(_offer, subscription.queue, event)
+            except RuntimeError:
+                # The subscriber's loop has closed; its stream cleanup will unsubscribe it
+                pass
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(set().union(*self._subscribers.values())) if self._subscribers else 0
+
+
+# A slow client loses its oldest events rather than growing memory; it can catch up via /api/sync/
+def _offer(queue, event):
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(event)
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    return import_string(settings.EVENT_BROKER)()
+
+
+# Publishes once the surrounding transaction commits, so listeners never see uncommitted state
+def publish_on_commit(channels, event):
+    transaction.on_commit(lambda: get_broker().publish(channels, event))
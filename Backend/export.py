@@ -0,0 +1,84 @@
+import csv
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Attendance, Employee, Request, Task
+
+
+# dataset -> (model, exported columns as values_list paths, field filtered by ?start=/?end=)
+EXPORTS = {
+    'employees': (Employee, (
+        'id', 'employee_id', 'first_name', 'last_name', 'user__email', 'gender', 'date_of_birth',
+        'address', 'hire_date', 'position', 'salary', 'department_id', 'department__name',
+        'manager_id', 'is_active',
+    ), 'hire_date'),
+    'attendance': (Attendance, (
+        'id', 'employee_id', 'employee__employee_id', 'date', 'clock_in', 'clock_out',
+    ), 'date'),
+    'tasks': (Task, (
+        'id', 'title', 'description', 'status', 'deadline', 'assigned_to_id', 'assigned_by_id',
+        'rejection_comment', 'created_at', 'updated_at',
+    ), 'created_at__date'),
+    'requests': (Request, (
+        'id', 'name', 'description', 'status', 'submitted_by_id', 'date_submitted', 'admin_comment',
+    ), 'date_submitted__date'),
+}
+
+OUTPUT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+CHUNK_SIZE = 2000
+
+
+# Rows come from a server-side cursor in pk order, as tuples rather than model instances
+def export_rows(dataset, start=None, end=None, chunk_size=CHUNK_SIZE):
+    model, columns, date_field = EXPORTS[dataset]
+    queryset = model.objects.all()
+    if start is not None:
+        queryset = queryset.filter(**{f'{date_field}__gte': start})
+    if end is not None:
+        queryset = queryset.filter(**{f'{date_field}__lte': end})
+    return queryset.order_by('pk').values_list(*columns).iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+# Yields the export as text blocks of `chunk_size` rows, so memory stays flat however large it gets
+def export_chunks(dataset, output, start=None, end=None, chunk_size=CHUNK_SIZE):
+    columns = EXPORTS[dataset][1]
+    if output == 'csv':
+        writer = csv.writer(_Echo())
+        encode = writer.writerow
+        yield encode(columns)
+    else:
+        encoder = DjangoJSONEncoder()
+
+        def encode(row):
+            return encoder.encode(dict(zip(columns, row))) + '\n'
+
+    block = []
+    for row in export_rows(dataset, start, end, chunk_size):
+        block.append(encode(row))
+        if len(block) >= chunk_size:
+            yield ''.join(block)
+            block = []
+    if block:
+        yield ''.join(block)
+
+
+# Under ASGI a sync iterator would be drained into memory before sending, so each block is
+# pulled through sync_to_async instead; thread_sensitive keeps the cursor on one thread
+async def aiterate(iterator):
+    pull = sync_to_async(next, thread_sensitive=True)
+    while True:
+        block = await pull(iterator, None)
+        if block is None:
+            return
+        yield block
+
@@ -0,0 +1,122 @@
+from django.db.models import Subquery
+
+from .models import Employee, EmployeeHierarchy
+
+
+BATCH_SIZE = 5000
+
+
+# Yields (ancestor, descendant, depth) closure rows for `managers` ({employee: manager}).
+# `external` maps managers outside the mapping to their own [(ancestor, depth)] lists.
+# A chain that loops back on itself is cut where it repeats.
+def closure_rows(managers, external=None):
+    external = external or {}
+    for employee_id in managers:
+        seen = {employee_id}
+        yield employee_id, employee_id, 0
+        depth, current = 1, managers[employee_id]
+        while current is not None and current not in seen:
+            if current not in managers:
+                for ancestor_id, ancestor_depth in external.get(current, ()):
+                    yield ancestor_id, employee_id, depth + ancestor_depth
+                break
+            seen.add(current)
+            yield current, employee_id, depth
+            depth, current = depth + 1, managers[current]
+
+
+# Adds closure rows for new employees given as {employee: manager}, e.g. after bulk_create.
+# Managers may be among the new employees, in any order, or already linked.
+def extend_hierarchy(managers):
+    outside = list({manager_id for manager_id in managers.values() if manager_id is not None and manager_id not in managers})
+    external = {}
+    for start in range(0, len(outside), BATCH_SIZE):
+        links = EmployeeHierarchy.objects.filter(descendant_id__in=outside[start:start + BATCH_SIZE])
+        for descendant_id, ancestor_id, depth in links.values_list('descendant_id', 'ancestor_id', 'depth'):
+            external.setdefault(descendant_id, []).append((ancestor_id, depth))
+    _insert(closure_rows(managers, external))
+
+
+def rebuild_hierarchy():
+    EmployeeHierarchy.objects.all().delete()
+    _insert(closure_rows(dict(Employee.objects.values_list('id', 'manager_id'))))
+
+
+def _insert(rows):
+    batch = []
+    for ancestor_id, descendant_id, depth in rows:
+        batch.append(EmployeeHierarchy(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=depth))
+        if len(batch) >= BATCH_SIZE:
+            EmployeeHierarchy.objects.bulk_create(batch)
+            batch = []
+    EmployeeHierarchy.objects.bulk_create(batch)
+
+
+# Locks the rows a manager change can race on: the employee, the new manager and the new
+# manager's ancestors. Two concurrent moves that would close a loop between them always share
+# one of these rows, so the later one waits and its cycle check sees the earlier move. Rows
+# are locked in id order so concurrent moves cannot deadlock. Must run in a transaction.
+def lock_for_move(employee_id, manager_id):
+    ids = {employee_id}
+    if manager_id is not None:
+        ids.add(manager_id)
+        ids.update(EmployeeHierarchy.objects.filter(descendant_id=manager_id).values_list('ancestor_id', flat=True))
+    return list(Employee.objects.select_for_update().filter(id__in=ids).order_by('id').values_list('id', flat=True))
+
+
+def would_create_cycle(employee_id, manager_id):
+    if employee_id is None or manager_id is None:
+        return False
+    return EmployeeHierarchy.objects.filter(ancestor_id=employee_id, descendant_id=manager_id).exists()
+
+
+# Re-parents the subtree rooted at `employee_id` under `manager_id` (None makes it a root):
+# drops the links from its old ancestors, then links every new ancestor to every member
+def move_subtree(employee_id, manager_id):
+    subtree = EmployeeHierarchy.objects.filter(ancestor_id=employee_id)
+    EmployeeHierarchy.objects.filter(descendant_id__in=Subquery(subtree.values('descendant_id'))).exclude(
+        ancestor_id__in=Subquery(subtree.values('descendant_id'))
+    ).delete()
+    if manager_id is None:
+        return
+    ancestors = list(EmployeeHierarchy.objects.filter(descendant_id=manager_id).values_list('ancestor_id', 'depth'))
+    members = list(subtree.values_list('descendant_id', 'depth'))
+    _insert(
+        (ancestor_id, descendant_id, ancestor_depth + depth + 1)
+        for ancestor_id, ancestor_depth in ancestors
+        for descendant_id, depth in members
+    )
+
+
+# Nests (id, manager_id, first_name, last_name, position, department) rows into a chart in one
+# pass. Nodes deeper than `max_depth` below the starting level are left out, but every node
+# keeps its `report_count`. Returns None when `root` is not among the rows.
+def org_chart(rows, root=None, max_depth=None):
+    nodes, parents = {}, {}
+    for employee_id, manager_id, first_name, last_name, position, department in rows:
+        nodes[employee_id] = {
+            'id': employee_id, 'name': f'{first_name} {last_name}', 'position': position,
+            'department': department, 'report_count': 0, 'reports': [],
+        }
+        parents[employee_id] = manager_id
+
+    tops = []
+    for employee_id, node in nodes.items():
+        parent = nodes.get(parents[employee_id])
+        if parent is None:
+            tops.append(node)
+        else:
+            parent['reports'].append(node)
+            parent['report_count'] += 1
+
+    if root is not None:
+        if root not in nodes:
+            return None
+        tops = [nodes[root]]
+    if max_depth is not None:
+        level = tops
+        for _ in range(max_depth):
+            level = [child for node in level for child in node['reports']]
+        for node in level:
+            node['reports'] = []
+    return tops
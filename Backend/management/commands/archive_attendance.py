@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from Backend.archive import BATCH_SIZE, LIVE_DAYS, apply_retention
+
+
+# Meant to run monthly from a scheduler. On PostgreSQL it also creates the coming months'
+# attendance partitions, so it must run before the last one fills up.
+class Command(BaseCommand):
+    help = 'Creates upcoming attendance partitions and moves months past retention into the compressed archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-months', type=int, default=24, help=f'Months kept live; months within the last {LIVE_DAYS} days always are')
+        parser.add_argument('--months-ahead', type=int, default=3, help='Future monthly partitions to create (PostgreSQL)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        archived = apply_retention(options['keep_months'], options['months_ahead'], options['batch_size'])
+        for month, rows in archived:
+            self.stdout.write(f'Archived {rows} rows from {month:%Y-%m}')
+        self.stdout.write(self.style.SUCCESS(f'Archived {sum(rows for _, rows in archived)} attendance rows from {len(archived)} months'))
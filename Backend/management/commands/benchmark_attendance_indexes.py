@@ -0,0 +1,98 @@
+import json
+import random
+import time
+from datetime import date, timedelta
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+
+from Backend.models import Attendance, Employee, Request, Task
+
+
+# Records query plans and latencies for the attendance/task hot paths on a generated dataset
+# in a throwaway test database, optionally migrated back to an older schema after seeding.
+# Run once per schema state and compare, e.g.:
+#   manage.py benchmark_attendance_indexes --label before --migrate-to 0011
+#   manage.py benchmark_attendance_indexes --label after
+class Command(BaseCommand):
+    help = 'Benchmarks attendance, task and request lookups against the current indexes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--label', default='current', help='Name stored with this run, e.g. "before" or "after"')
+        parser.add_argument('--output', default='attendance_index_benchmark.json')
+        parser.add_argument('--employees', type=int, default=1000, help='Employees in the generated dataset')
+        parser.add_argument('--years', type=float, default=1, help='Attendance history in the generated dataset')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--migrate-to', help='Backend migration to roll the schema back to after seeding, e.g. 0011')
+        parser.add_argument('--use-current-database', action='store_true', help='Benchmark the existing data instead of seeding')
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        if options['use_current_database']:
+            self.benchmark(options)
+            return
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            call_command(
+                'generate_dataset', employees=options['employees'], departments=max(1, min(10, options['employees'] // 10)),
+                years=options['years'], seed=options['seed'], stdout=StringIO(),
+            )
+            if options['migrate_to']:
+                call_command('migrate', 'Backend', options['migrate_to'], verbosity=0)
+            self.benchmark(options)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+    def benchmark(self, options):
+        employee_ids = list(Employee.objects.values_list('id', flat=True))
+        if not employee_ids:
+            raise CommandError('No employees to benchmark.')
+
+        latest = Attendance.objects.order_by('-date').values_list('date', flat=True).first() or date.today()
+        cases = {
+            'mark_attendance': lambda pk: Attendance.objects.filter(employee_id=pk, date=latest),
+            'monthly_attendance': lambda pk: Attendance.objects.filter(employee_id=pk, date__gte=latest - timedelta(days=30)),
+            'my_attendance': lambda pk: Attendance.objects.filter(employee_id=pk).order_by('-date')[:30],
+            'tasks_by_assignee': lambda pk: Task.objects.filter(assigned_to_id=pk, status='in_progress'),
+            'tasks_by_assigner': lambda pk: Task.objects.filter(assigned_by_id=pk, status='submitted'),
+            'requests_by_submitter': lambda pk: Request.objects.filter(submitted_by_id=pk, status='pending'),
+        }
+
+        rng = random.Random(0)
+        results = {}
+        for name, build in cases.items():
+            sample = [rng.choice(employee_ids) for _ in range(options['repeat'])]
+            timings = []
+            for pk in sample:
+                queryset = build(pk)
+                start = time.perf_counter()
+                list(queryset)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            results[name] = {
+                'plan': build(sample[0]).explain(),
+                'p50_ms': round(timings[len(timings) // 2], 3),
+                'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 3),
+                'max_ms': round(timings[-1], 3),
+            }
+            self.stdout.write(f"{name}: p50={results[name]['p50_ms']}ms p95={results[name]['p95_ms']}ms")
+            self.stdout.write(f"  {results[name]['plan']}")
+
+        output = Path(options['output'])
+        runs = json.loads(output.read_text()) if output.exists() else {}
+        runs[options['label']] = {'attendance_rows': Attendance.objects.count(), 'cases': results}
+        output.write_text(json.dumps(runs, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Saved run '{options['label']}' to {output}"))
+
+        if len(runs) > 1:
+            labels = list(runs)
+            self.stdout.write('p50 (ms): ' + ' | '.join(labels))
+            for name in cases:
+                values = [str(runs[label]['cases'].get(name, {}).get('p50_ms', '-')) for label in labels]
+                self.stdout.write(f"  {name}: {' | '.join(values)}")
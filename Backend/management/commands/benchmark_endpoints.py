@@ -0,0 +1,203 @@
+import json
+import re
+import time
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.urls import URLResolver, get_resolver
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from Backend.models import Department, Employee, Task
+
+
+# Values for URL parameters whose model cannot be read off the view
+PARAMETER_MODELS = {'employee_id': Employee, 'department_id': Department, 'task_id': Task}
+PARAMETER_VALUES = {'dataset': 'employees'}
+
+# Query strings for routes that reject a bare GET
+QUERY_STRINGS = {'/api/attendance/matrix/': '?department=<department_id>'}
+
+
+def _route(pattern):
+    if hasattr(pattern, '_route'):
+        return re.sub(r'<(?:\w+:)?(\w+)>', r'<\1>', pattern._route)
+    return re.sub(r'\(\?P<(\w+)>[^)]*\)', r'<\1>', pattern._regex.lstrip('^').rstrip('$'))
+
+
+# Yields (path template, pattern) for every route served by the Backend app
+def iter_routes(patterns, prefix='/'):
+    for entry in patterns:
+        if isinstance(entry, URLResolver):
+            yield from iter_routes(entry.url_patterns, prefix + _route(entry.pattern))
+        elif getattr(entry.callback, '__module__', '').startswith('Backend.'):
+            yield prefix + _route(entry.pattern), entry
+
+
+def _view_model(callback):
+    view_class = getattr(callback, 'cls', None) or getattr(callback, 'view_class', None)
+    queryset = getattr(view_class, 'queryset', None)
+    return queryset.model if queryset is not None else None
+
+
+# Times every GET route of Backend/urls.py through the test client on freshly generated
+# datasets of each --sizes headcount (in a throwaway test database), recording p50/p95
+# latency, query count, SQL time and response size. With --update-baseline the results
+# become the baseline; otherwise any endpoint slower or chattier than the baseline by more
+# than the thresholds fails the run.
+class Command(BaseCommand):
+    help = 'Benchmarks every API GET route against seeded datasets and compares with a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,1000', help='Comma-separated employee counts to seed')
+        parser.add_argument('--years', type=float, default=0.25, help='Attendance history seeded per dataset')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--baseline', default='endpoint_benchmark_baseline.json')
+        parser.add_argument('--update-baseline', action='store_true')
+        parser.add_argument('--threshold', type=float, default=0.25, help='Allowed relative p50 slowdown')
+        parser.add_argument('--min-delta-ms', type=float, default=2.0, help='Slowdowns smaller than this are noise')
+        parser.add_argument('--query-threshold', type=int, default=0, help='Allowed extra queries per request')
+        parser.add_argument('--use-current-database', action='store_true', help='Benchmark the existing data instead of seeding')
+        parser.add_argument('--username', help='Staff user to benchmark as (defaults to the first staff employee)')
+
+    def handle(self, *args, **options):
+        results = {}
+        if options['use_current_database']:
+            results['current'] = self.run_suite(options['repeat'], options['username'])
+        else:
+            setup_test_environment()
+            old_config = setup_databases(verbosity=0, interactive=False)
+            try:
+                for size in [int(size) for size in options['sizes'].split(',')]:
+                    call_command('flush', interactive=False, verbosity=0)
+                    call_command(
+                        'generate_dataset', employees=size, departments=max(1, min(10, size // 10)),
+                        years=options['years'], seed=options['seed'], stdout=StringIO(),
+                    )
+                    self.stdout.write(f'Dataset with {size} employees:')
+                    results[str(size)] = self.run_suite(options['repeat'], options['username'], promote=True)
+            finally:
+                teardown_databases(old_config, verbosity=0)
+                teardown_test_environment()
+
+        baseline_path = Path(options['baseline'])
+        if options['update_baseline'] or not baseline_path.exists():
+            baseline_path.write_text(json.dumps(results, indent=2, sort_keys=True))
+            self.stdout.write(self.style.SUCCESS(f'Saved baseline to {baseline_path}'))
+            return
+
+        regressions = self.compare(json.loads(baseline_path.read_text()), results, options)
+        if regressions:
+            for line in regressions:
+                self.stderr.write(line)
+            raise CommandError(f'{len(regressions)} endpoint regression(s) against {baseline_path}')
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {baseline_path}'))
+
+    # Runs as a staff employee. Only the throwaway seeded databases (`promote`) may make a
+    # top-level manager staff; a real database must already have one.
+    def run_suite(self, repeat, username=None, promote=False):
+        employees = Employee.objects.select_related('user').order_by('id')
+        if username:
+            employee = employees.filter(user__username=username).first()
+            if employee is None:
+                raise CommandError(f'No employee has the username "{username}".')
+        else:
+            employee = employees.filter(user__is_staff=True).first()
+            if employee is None and promote:
+                employee = employees.filter(manager__isnull=True).first()
+        if employee is None:
+            raise CommandError('The database has no staff employee to benchmark with; pass --username.')
+        user = employee.user
+        if not user.is_staff:
+            if not promote:
+                raise CommandError(f'"{user.username}" is not a staff user.')
+            user.is_staff = True
+            user.save(update_fields=['is_staff'])
+        client = Client(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+        suite = {}
+        for template, pattern in iter_routes(get_resolver().url_patterns):
+            if '<format>' in template:
+                continue
+            path = self.fill(template + QUERY_STRINGS.get(template, ''), pattern, employee)
+            if path is None:
+                self.stdout.write(f'  skipped {template}: no row to address')
+                continue
+            measured = self.measure(client, path, repeat)
+            if measured is None:
+                continue
+            suite[template] = measured
+            self.stdout.write(
+                f"  {template:<48} p50={measured['p50_ms']:>8.2f}ms p95={measured['p95_ms']:>8.2f}ms "
+                f"queries={measured['queries']:>3} sql={measured['sql_ms']:>7.2f}ms bytes={measured['bytes']}"
+            )
+        return suite
+
+    def fill(self, template, pattern, employee):
+        path = template
+        for name in re.findall(r'<(\w+)>', template):
+            if name in PARAMETER_VALUES:
+                value = PARAMETER_VALUES[name]
+            elif name == 'employee_id':
+                value = employee.id
+            else:
+                model = PARAMETER_MODELS.get(name) or _view_model(pattern.callback)
+                value = model.objects.order_by('pk').values_list('pk', flat=True).first() if model else None
+            if value is None:
+                return None
+            path = path.replace(f'<{name}>', str(value))
+        return path
+
+    # Returns None for routes that do not answer GET
+    def measure(self, client, path, repeat):
+        timings = []
+        for _ in range(repeat):
+            sql = {'queries': 0, 'seconds': 0.0}
+
+            def record(execute, query, params, many, context):
+                start = time.perf_counter()
+                try:
+                    return execute(query, params, many, context)
+                finally:
+                    sql['queries'] += 1
+                    sql['seconds'] += time.perf_counter() - start
+
+            with connection.execute_wrapper(record):
+                start = time.perf_counter()
+                response = client.get(path)
+                body = b''.join(response.streaming_content) if response.streaming else response.content
+                timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code in (405, 501):
+                return None
+        timings.sort()
+        return {
+            'status': response.status_code,
+            'p50_ms': round(timings[len(timings) // 2], 3),
+            'p95_ms': round(timings[max(0, int(len(timings) * 0.95) - 1)], 3),
+            'queries': sql['queries'],
+            'sql_ms': round(sql['seconds'] * 1000, 3),
+            'bytes': len(body),
+        }
+
+    def compare(self, baseline, results, options):
+        regressions = []
+        for dataset, suite in results.items():
+            for template, current in suite.items():
+                previous = baseline.get(dataset, {}).get(template)
+                if previous is None:
+                    continue
+                slower = current['p50_ms'] - previous['p50_ms']
+                if slower > options['min_delta_ms'] and current['p50_ms'] > previous['p50_ms'] * (1 + options['threshold']):
+                    regressions.append(
+                        f"[{dataset}] {template}: p50 {previous['p50_ms']}ms -> {current['p50_ms']}ms"
+                    )
+                if current['queries'] > previous['queries'] + options['query_threshold']:
+                    regressions.append(
+                        f"[{dataset}] {template}: queries {previous['queries']} -> {current['queries']}"
+                    )
+        return regressions
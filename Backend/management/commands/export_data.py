@@ -0,0 +1,29 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from Backend.export import EXPORTS, OUTPUT_FORMATS, export_chunks
+
+
+# Same streaming export as /api/export/<dataset>/, written to a file or stdout
+class Command(BaseCommand):
+    help = 'Streams a dataset (employees, attendance, tasks, requests) as CSV or NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(EXPORTS))
+        parser.add_argument('--output', choices=sorted(OUTPUT_FORMATS), default='csv')
+        parser.add_argument('--start', type=date.fromisoformat, help='First date to include (YYYY-MM-DD)')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last date to include (YYYY-MM-DD)')
+        parser.add_argument('--file', help='Destination path (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        chunks = export_chunks(options['dataset'], options['output'], options['start'], options['end'], options['chunk_size'])
+        if not options['file']:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['file'], 'w', newline='', encoding='utf-8') as destination:
+            for chunk in chunks:
+                destination.write(chunk)
+        self.stderr.write(self.style.SUCCESS(f"Exported {options['dataset']} to {options['file']}"))
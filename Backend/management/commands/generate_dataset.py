@@ -0,0 +1,194 @@
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from Backend.conditional import bump_versions
+from Backend.hierarchy import extend_hierarchy
+from Backend.models import Attendance, CustomUser, Department, DepartmentStats, Employee, Request, Task
+
+
+DEPARTMENT_NAMES = (
+    'Engineering', 'Sales', 'Marketing', 'Finance', 'Operations',
+    'Support', 'Human Resources', 'Legal', 'Product', 'Research',
+)
+FIRST_NAMES = ('Alex', 'Sam', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie', 'Avery', 'Quinn', 'Drew', 'Robin')
+LAST_NAMES = ('Smith', 'Garcia', 'Chen', 'Okafor', 'Novak', 'Silva', 'Kim', 'Patel', 'Müller', 'Rossi', 'Haddad', 'Berg')
+TASK_TITLES = ('Prepare report', 'Review contract', 'Update documentation', 'Customer follow-up', 'Fix reported issue', 'Plan sprint')
+REQUEST_NAMES = ('Equipment purchase', 'Headcount increase', 'Training budget', 'Travel approval', 'Software licence')
+
+TASK_STATUSES = (('completed', 60), ('in_progress', 25), ('submitted', 15))
+REQUEST_STATUSES = (('completed', 60), ('pending', 25), ('declined', 15))
+
+
+def _weighted(rng, choices):
+    return rng.choices([value for value, _ in choices], weights=[weight for _, weight in choices])[0]
+
+
+# Builds a seeded, reproducible organization for load testing: departments, a manager tree
+# per department, users sharing one precomputed password hash, weekday attendance over
+# --years, and tasks and requests with realistic status mixes. Everything goes in through
+# bulk_create, so the hierarchy, rollups, department stats and table versions are rebuilt.
+class Command(BaseCommand):
+    help = 'Generates a deterministic synthetic organization for local load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=1000)
+        parser.add_argument('--departments', type=int, default=10)
+        parser.add_argument('--span', type=int, default=8, help='Direct reports per manager')
+        parser.add_argument('--years', type=float, default=1, help='Years of attendance history')
+        parser.add_argument('--attendance-rate', type=float, default=0.93, help='Chance an employee attends a weekday')
+        parser.add_argument('--tasks-per-employee', type=int, default=5)
+        parser.add_argument('--requests-per-manager', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--end-date', type=date.fromisoformat, help='Last day of history (default: today)')
+        parser.add_argument('--prefix', default='gen', help='Prefix for usernames and employee ids')
+        parser.add_argument('--password', default='password', help='Password shared by every generated user')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if CustomUser.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f"Users prefixed '{prefix}' already exist; choose another --prefix.")
+        if options['employees'] < options['departments']:
+            raise CommandError('--employees must be at least --departments.')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.end = options['end_date'] or timezone.now().date()
+        self.start = self.end - timedelta(days=int(options['years'] * 365))
+
+        with transaction.atomic():
+            departments = self.create_departments(options['departments'])
+            employees = self.create_employees(options['employees'], departments, options['span'], options['password'], prefix)
+            extend_hierarchy({employee.id: employee.manager_id for employee in employees})
+            tasks = self.create_tasks(employees, options['tasks_per_employee'])
+            requests = self.create_requests(employees, options['requests_per_manager'])
+        attendance = self.create_attendance(employees, options['attendance_rate'])
+
+        DepartmentStats.rebuild([department.id for department in departments])
+        call_command('rebuild_attendance_rollups', batch_size=self.batch_size, stdout=self.stdout)
+        bump_versions(Attendance, CustomUser, Department, Employee, Request, Task)
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {len(departments)} departments, {len(employees)} employees, {attendance} attendance rows, '
+            f'{tasks} tasks and {requests} requests'
+        ))
+
+    def create_departments(self, count):
+        departments = []
+        for n in range(count):
+            name = DEPARTMENT_NAMES[n % len(DEPARTMENT_NAMES)]
+            if n >= len(DEPARTMENT_NAMES):
+                name = f'{name} {n // len(DEPARTMENT_NAMES) + 1}'
+            departments.append(Department(name=name, description=f'Synthetic {name} department'))
+        return Department.objects.bulk_create(departments)
+
+    # Employees are dealt round-robin into departments. Within a department, member j reports
+    # to member (j - 1) // span, so each level is inserted after the one its managers are in.
+    def create_employees(self, count, departments, span, password, prefix):
+        password_hash = make_password(password)
+        members = [[] for _ in departments]
+        for n in range(count):
+            members[n % len(departments)].append(n)
+
+        plan = {}
+        for department, indexes in zip(departments, members):
+            for j, n in enumerate(indexes):
+                manager = indexes[(j - 1) // span] if j else None
+                depth = plan[manager]['depth'] + 1 if manager is not None else 0
+                plan[n] = {'department': department, 'manager': manager, 'depth': depth, 'has_reports': j * span + 1 < len(indexes)}
+
+        created = {}
+        for depth in range(max(entry['depth'] for entry in plan.values()) + 1):
+            level = [n for n in range(count) if plan[n]['depth'] == depth]
+            users = CustomUser.objects.bulk_create(
+                [
+                    CustomUser(
+                        username=f'{prefix}{n}', email=f'{prefix}{n}@example.com', password=password_hash,
+                        first_name=self.rng.choice(FIRST_NAMES), last_name=self.rng.choice(LAST_NAMES),
+                        role='manager' if plan[n]['has_reports'] else 'employee',
+                    )
+                    for n in level
+                ],
+                batch_size=self.batch_size,
+            )
+            employees = Employee.objects.bulk_create(
+                [self.build_employee(n, user, plan[n], created, prefix) for n, user in zip(level, users)],
+                batch_size=self.batch_size,
+            )
+            created.update(zip(level, employees))
+            self.stdout.write(f'Created level {depth}: {len(level)} employees')
+        return [created[n] for n in range(count)]
+
+    def build_employee(self, n, user, entry, created, prefix):
+        rng = self.rng
+        seniority = max(0, 4 - entry['depth'])
+        return Employee(
+            user=user, employee_id=f'{prefix.upper()}{n:07d}'[-20:], first_name=user.first_name, last_name=user.last_name,
+            gender=rng.choice('MFO'), date_of_birth=date(1960, 1, 1) + timedelta(days=rng.randint(0, 40 * 365)),
+            address=f'{rng.randint(1, 999)} Synthetic Street', position='Manager' if entry['has_reports'] else 'Specialist',
+            hire_date=self.start - timedelta(days=rng.randint(-365, 5 * 365)),
+            salary=Decimal(rng.randint(3000 + seniority * 1500, 6000 + seniority * 3000)),
+            department=entry['department'], manager=created.get(entry['manager']),
+        )
+
+    def create_tasks(self, employees, per_employee):
+        rng = self.rng
+        span_days = (self.end - self.start).days
+        tasks = []
+        total = 0
+        for employee in employees:
+            if employee.manager_id is None:
+                continue
+            for _ in range(rng.randint(0, per_employee * 2)):
+                status = _weighted(rng, TASK_STATUSES)
+                tasks.append(Task(
+                    title=rng.choice(TASK_TITLES), description='Generated task', status=status,
+                    deadline=self.start + timedelta(days=rng.randint(0, span_days + 30)),
+                    assigned_to=employee, assigned_by_id=employee.manager_id,
+                    rejection_comment='Please revise' if status == 'in_progress' and rng.random() < 0.2 else None,
+                ))
+            if len(tasks) >= self.batch_size:
+                total += len(Task.objects.bulk_create(tasks))
+                tasks = []
+        return total + len(Task.objects.bulk_create(tasks))
+
+    def create_requests(self, employees, per_manager):
+        rng = self.rng
+        requests = []
+        for employee in employees:
+            if employee.user.role != 'manager':
+                continue
+            for _ in range(rng.randint(0, per_manager * 2)):
+                status = _weighted(rng, REQUEST_STATUSES)
+                requests.append(Request(
+                    name=rng.choice(REQUEST_NAMES), description='Generated request', submitted_by=employee,
+                    status=status, admin_comment='Out of budget' if status == 'declined' else None,
+                ))
+        return len(Request.objects.bulk_create(requests, batch_size=self.batch_size))
+
+    # One weekday at a time, each in its own transaction, so memory stays bounded by the headcount
+    def create_attendance(self, employees, rate):
+        rng = self.rng
+        staff = [(employee.id, employee.hire_date) for employee in employees]
+        total = 0
+        day = self.start
+        while day <= self.end:
+            if day.weekday() < 5:
+                rows = []
+                for employee_id, hire_date in staff:
+                    if hire_date > day or rng.random() >= rate:
+                        continue
+                    clock_in = timezone.make_aware(datetime.combine(day, datetime.min.time()) + timedelta(minutes=480 + rng.randint(0, 90)))
+                    clock_out = clock_in + timedelta(minutes=rng.randint(450, 570))
+                    rows.append(Attendance(employee_id=employee_id, date=day, clock_in=clock_in, clock_out=clock_out))
+                with transaction.atomic():
+                    Attendance.objects.bulk_create(rows, batch_size=self.batch_size)
+                total += len(rows)
+            day += timedelta(days=1)
+        return total
@@ -0,0 +1,34 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Backend.onboarding import import_employees, parse_rows
+
+
+# Bulk onboarding from a CSV or JSON file, same rules as POST /api/employees/import/
+class Command(BaseCommand):
+    help = 'Imports users and employees from a CSV or JSON file in one validated batch'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--workers', type=int, help='Password hashing processes (default: CPU count)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Validate only')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        try:
+            rows = parse_rows(path.read_bytes(), path.name)
+        except (OSError, ValueError, KeyError) as exc:
+            raise CommandError(f'Could not read {path}: {exc}')
+
+        result = import_employees(rows, workers=options['workers'], batch_size=options['batch_size'], dry_run=options['dry_run'])
+        for error in result['errors']:
+            messages = '; '.join(f'{field}: {" ".join(map(str, problems))}' for field, problems in error['errors'].items())
+            self.stderr.write(f"Row {error['row']}: {messages}")
+        if result['errors']:
+            raise CommandError(f"{len(result['errors'])} invalid row(s); nothing was imported")
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'{len(rows)} row(s) are valid'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Imported {result['created']} employee(s)"))
@@ -0,0 +1,52 @@
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+
+# Fires concurrent GETs at a running server and reports throughput and latency per
+# concurrency level, for comparing the WSGI and ASGI deployments (see README).
+class Command(BaseCommand):
+    help = 'Load-tests running server endpoints at increasing concurrency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--path', action='append', dest='paths', help='Endpoint to hit; repeatable (default: /api/my-profile/)')
+        parser.add_argument('--token', required=True, help='JWT access token sent as a Bearer token')
+        parser.add_argument('--concurrency', default='1,10,50,100', help='Comma-separated concurrency levels')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per concurrency level')
+
+    def handle(self, *args, **options):
+        urls = [options['base_url'].rstrip('/') + path for path in (options['paths'] or ['/api/my-profile/'])]
+        headers = {'Authorization': f"Bearer {options['token']}"}
+
+        def fetch(n):
+            request = urllib.request.Request(urls[n % len(urls)], headers=headers)
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=30) as response:
+                    response.read()
+                    ok = response.status == 200
+            except (urllib.error.URLError, OSError):
+                ok = False
+            return time.perf_counter() - start, ok
+
+        self.stdout.write(f"{'concurrency':>11} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+        for concurrency in [int(level) for level in options['concurrency'].split(',')]:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                results = list(pool.map(fetch, range(options['requests'])))
+            elapsed = time.perf_counter() - started
+
+            latencies = sorted(latency * 1000 for latency, _ in results)
+            errors = sum(1 for _, ok in results if not ok)
+
+            def percentile(p):
+                return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+            self.stdout.write(
+                f'{concurrency:>11} {len(results) / elapsed:>9.1f} {percentile(0.5):>9.1f} '
+                f'{percentile(0.95):>9.1f} {percentile(0.99):>9.1f} {errors:>7}'
+            )
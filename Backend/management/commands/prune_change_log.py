@@ -0,0 +1,29 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from Backend.models import ChangeLogEntry
+
+
+# Drops old sync log entries; clients whose cursor predates the oldest kept entry get reset=true
+class Command(BaseCommand):
+    help = 'Deletes ChangeLogEntry rows older than --days'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--batch-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        total = 0
+        while True:
+            ids = list(
+                ChangeLogEntry.objects.filter(created_at__lt=cutoff)
+                .order_by('id')
+                .values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            total += ChangeLogEntry.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(f'Deleted {total} change log entries older than {cutoff:%Y-%m-%d}'))
@@ -0,0 +1,68 @@
+from itertools import chain
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from Backend.archive import archived_rows
+from Backend.attendance import rollup_values
+from Backend.models import Attendance, DepartmentDailyHours, Employee, EmployeeMonthlyHours
+
+
+# Recomputes the attendance rollups from the raw Attendance table and its archive, a chunk of
+# employees at a time. Like the incremental updates, it files each employee's history under
+# their current department and skips rows without a clock-in.
+class Command(BaseCommand):
+    help = 'Rebuilds EmployeeMonthlyHours and DepartmentDailyHours from Attendance'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Employees processed per batch')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        batch_size = options['batch_size']
+        employee_ids = list(Employee.objects.order_by('id').values_list('id', flat=True))
+        departments = dict(Employee.objects.values_list('id', 'department_id'))
+        daily = {}
+
+        with transaction.atomic():
+            EmployeeMonthlyHours.objects.all().delete()
+            DepartmentDailyHours.objects.all().delete()
+
+            for start in range(0, len(employee_ids), chunk_size):
+                chunk = employee_ids[start:start + chunk_size]
+                monthly = {}
+                rows = Attendance.objects.filter(employee_id__in=chunk).values_list('employee_id', 'date', 'clock_in', 'clock_out')
+                for employee_id, day, clock_in, clock_out in chain(rows.iterator(chunk_size=batch_size), archived_rows(chunk)):
+                    seconds, present = rollup_values(clock_in, clock_out)
+                    if not present:
+                        continue
+                    key = (employee_id, day.replace(day=1))
+                    total = monthly.get(key, (0, 0))
+                    monthly[key] = (total[0] + seconds, total[1] + present)
+
+                    department_id = departments[employee_id]
+                    if department_id is not None:
+                        total = daily.get((department_id, day), (0, 0))
+                        daily[(department_id, day)] = (total[0] + seconds, total[1] + present)
+
+                EmployeeMonthlyHours.objects.bulk_create(
+                    [
+                        EmployeeMonthlyHours(employee_id=employee_id, month=month, seconds_worked=seconds, days_present=present)
+                        for (employee_id, month), (seconds, present) in monthly.items()
+                    ],
+                    batch_size=batch_size,
+                )
+                self.stdout.write(f'Processed {min(start + chunk_size, len(employee_ids))}/{len(employee_ids)} employees')
+
+            DepartmentDailyHours.objects.bulk_create(
+                [
+                    DepartmentDailyHours(department_id=department_id, date=day, seconds_worked=seconds, employees_present=present)
+                    for (department_id, day), (seconds, present) in daily.items()
+                ],
+                batch_size=batch_size,
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt attendance rollups for {len(employee_ids)} employees and {len(daily)} department-days'
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from Backend.hierarchy import rebuild_hierarchy
+from Backend.models import EmployeeHierarchy
+
+
+# Recomputes the EmployeeHierarchy closure table from Employee.manager, e.g. after raw loads
+class Command(BaseCommand):
+    help = 'Rebuilds the EmployeeHierarchy closure table'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild_hierarchy()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {EmployeeHierarchy.objects.count()} hierarchy links'))
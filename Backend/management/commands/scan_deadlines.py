@@ -0,0 +1,21 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from Backend.deadlines import BATCH_SIZE, scan_deadlines
+
+
+# Meant to run from a scheduler (cron, a platform job) every few hours
+class Command(BaseCommand):
+    help = 'Records overdue and due-soon task notices and rewrites the per-manager deadline digests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--due-within', type=int, default=2, help='Days ahead that count as due soon')
+        parser.add_argument('--date', type=date.fromisoformat, help='Day to scan for (default: today)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        result = scan_deadlines(options['date'], options['due_within'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Scanned {result['scanned']} open tasks; wrote digests for {result['managers']} managers"
+        ))
@@ -0,0 +1,170 @@
+import cProfile
+import io
+import json
+import logging
+import pstats
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import ListSerializer
+
+
+logger = logging.getLogger('Backend.metrics')
+slow_query_logger = logging.getLogger('Backend.metrics.slow_queries')
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.timings = {}
+
+    def add(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+
+# Adds the block's duration to the current request's `name` timing; a no-op outside a request
+@contextmanager
+def timed(name):
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add(name, perf_counter() - start)
+
+
+def _record_sql(execute, sql, params, many, context):
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = perf_counter() - start
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.queries += 1
+            metrics.sql_seconds += elapsed
+        if elapsed * 1000 >= settings.METRICS_SLOW_QUERY_MS:
+            slow_query_logger.warning(
+                'slow query %.1fms: %s', elapsed * 1000, sql[:2000],
+                extra={'duration_ms': round(elapsed * 1000, 3), 'sql': sql, 'alias': context['connection'].alias},
+            )
+
+
+# Installed once per connection rather than per request, so an idle request pays nothing extra
+@receiver(connection_created)
+def install_sql_recorder(sender, connection, **kwargs):
+    if _record_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_sql)
+
+
+class TimedJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('render'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class TimedListSerializer(ListSerializer):
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
+
+
+# Times a serializer's `.data` as the request's serialize step. Lists get a
+# TimedListSerializer unless the serializer's Meta names its own list_serializer_class.
+class TimedSerializerMixin:
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
+
+    # TimedListSerializer only adds the timing, so the list DRF built (with its child already
+    # bound) is re-classed rather than rebuilt
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        serializer = super().many_init(*args, **kwargs)
+        if type(serializer) is ListSerializer:
+            serializer.__class__ = TimedListSerializer
+        return serializer
+
+
+# Records view name, SQL count and time, serialization/render time and response size for
+# every request. They are returned as a Server-Timing header and logged as one JSON line on
+# Backend.metrics. With METRICS_PROFILE_SAMPLE_RATE > 0, that fraction of sync requests runs
+# under cProfile and the profile is logged when the request exceeds METRICS_PROFILE_MIN_MS.
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = perf_counter()
+        profiler = None
+        if settings.METRICS_PROFILE_SAMPLE_RATE and random.random() < settings.METRICS_PROFILE_SAMPLE_RATE:
+            profiler = cProfile.Profile()
+        try:
+            if profiler is None:
+                response = self.get_response(request)
+            else:
+                response = profiler.runcall(self.get_response, request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, perf_counter() - start, profiler)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, metrics, perf_counter() - start)
+
+    def finish(self, request, response, metrics, elapsed, profiler=None):
+        match = getattr(request, 'resolver_match', None)
+        record = {
+            'view': (match.view_name or match._func_path) if match else None,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 3),
+            'db_queries': metrics.queries,
+            'db_ms': round(metrics.sql_seconds * 1000, 3),
+            **{f'{name}_ms': round(seconds * 1000, 3) for name, seconds in metrics.timings.items()},
+            'bytes': None if response.streaming else len(response.content),
+        }
+
+        entries = [f'db;dur={record["db_ms"]};desc="{metrics.queries} queries"']
+        entries += [f'{name};dur={round(seconds * 1000, 3)}' for name, seconds in metrics.timings.items()]
+        entries.append(f'total;dur={record["duration_ms"]}')
+        response['Server-Timing'] = ', '.join(entries)
+
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(record), extra={'metrics': record})
+        if profiler is not None and record['duration_ms'] >= settings.METRICS_PROFILE_MIN_MS:
+            output = io.StringIO()
+            pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(30)
+            logger.warning('profile for %s %s (%.1fms)\n%s', request.method, request.path, record['duration_ms'], output.getvalue())
+        return response
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_department_stats(apps, schema_editor):
+    Department = apps.get_model('Backend', 'Department')
+    DepartmentStats = apps.get_model('Backend', 'DepartmentStats')
+    totals = Department.objects.annotate(
+        employee_count=models.Count('employees'),
+        total_salary=models.Sum('employees__salary'),
+    ).values_list('id', 'employee_count', 'total_salary')
+    DepartmentStats.objects.bulk_create(
+        [DepartmentStats(department_id=pk, employee_count=count, total_salary=salary or 0) for pk, count, salary in totals],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Backend', '0009_alter_request_submitted_by'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartmentStats',
+            fields=[
+                ('department', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='Backend.department')),
+                ('employee_count', models.PositiveIntegerField(default=0)),
+                ('total_salary', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+        ),
+        migrations.RunPython(backfill_department_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:07
+
+from django.db import migrations, models
+
+
+# Folds duplicate (employee, date) rows left by racing get_or_create calls into one row
+def merge_duplicate_attendance(apps, schema_editor):
+    Attendance = apps.get_model('Backend', 'Attendance')
+    duplicates = (
+        Attendance.objects.values('employee_id', 'date')
+        .annotate(rows=models.Count('id'))
+        .filter(rows__gt=1)
+    )
+    for duplicate in list(duplicates):
+        rows = list(Attendance.objects.filter(employee_id=duplicate['employee_id'], date=duplicate['date']).order_by('id'))
+        keep = rows[0]
+        clock_ins = [row.clock_in for row in rows if row.clock_in]
+        clock_outs = [row.clock_out for row in rows if row.clock_out]
+        keep.clock_in = min(clock_ins) if clock_ins else None
+        keep.clock_out = max(clock_outs) if clock_outs else None
+        keep.save(update_fields=['clock_in', 'clock_out'])
+        Attendance.objects.filter(id__in=[row.id for row in rows[1:]]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Backend', '0011_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_attendance, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='request',
+            index=models.Index(fields=['submitted_by', 'status'], name='request_by_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_to', 'status'], name='task_assignee_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['assigned_by', 'status'], name='task_assigner_status_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(fields=('employee', 'date'), name='unique_attendance_per_day'),
+        ),
+    ]
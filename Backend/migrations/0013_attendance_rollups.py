@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Backend', '0012_attendance_unique_and_status_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartmentDailyHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('seconds_worked', models.BigIntegerField(default=0)),
+                ('employees_present', models.IntegerField(default=0)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_hours', to='Backend.department')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('department', 'date'), name='unique_department_day_hours')],
+            },
+        ),
+        migrations.CreateModel(
+            name='EmployeeMonthlyHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('seconds_worked', models.BigIntegerField(default=0)),
+                ('days_present', models.IntegerField(default=0)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_hours', to='Backend.employee')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('employee', 'month'), name='unique_employee_month_hours')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Frozen copy of Backend.hierarchy.closure_rows as of this migration, without the external
+# links only incremental updates need: (ancestor, descendant, depth) for every employee and
+# each manager above it, cutting a chain that loops back on itself where it repeats.
+def closure_rows(managers):
+    for employee_id in managers:
+        seen = {employee_id}
+        yield employee_id, employee_id, 0
+        depth, current = 1, managers[employee_id]
+        while current is not None and current not in seen and current in managers:
+            seen.add(current)
+            yield current, employee_id, depth
+            depth, current = depth + 1, managers[current]
+
+
+def backfill_hierarchy(apps, schema_editor):
+    Employee = apps.get_model('Backend', 'Employee')
+    EmployeeHierarchy = apps.get_model('Backend', 'EmployeeHierarchy')
+    batch = []
+    for ancestor_id, descendant_id, depth in closure_rows(dict(Employee.objects.values_list('id', 'manager_id'))):
+        batch.append(EmployeeHierarchy(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=depth))
+        if len(batch) >= 5000:
+            EmployeeHierarchy.objects.bulk_create(batch)
+            batch = []
+    EmployeeHierarchy.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Backend', '0015_change_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeHierarchy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='Backend.employee')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='Backend.employee')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='hierarchy_descendant_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ancestor', 'descendant'), name='unique_hierarchy_pair')],
+            },
+        ),
+        migrations.RunPython(backfill_hierarchy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,140 @@
+from django.db import DatabaseError, migrations
+
+
+# Frozen copy of the Backend.search schema as of this migration. Later changes to that module
+# go in through its post_migrate hook (install_search_index), never by editing this file.
+SEARCH_TABLE = 'backend_employee_search'
+
+DOCUMENT_SQL = (
+    'SELECT e.id, e.first_name, e.last_name, e.employee_id, e.position, d.name, u.email '
+    'FROM "Backend_employee" e '
+    'LEFT JOIN "Backend_department" d ON d.id = e.department_id '
+    'LEFT JOIN "Backend_customuser" u ON u.id = e.user_id'
+)
+
+SQLITE_TRIGGERS = {
+    'backend_employee_search_insert': f'''
+        CREATE TRIGGER backend_employee_search_insert AFTER INSERT ON "Backend_employee" BEGIN
+            INSERT INTO {SEARCH_TABLE}(rowid, first_name, last_name, employee_code, position, department, email)
+            VALUES (NEW.id, NEW.first_name, NEW.last_name, NEW.employee_id, NEW.position,
+                    (SELECT name FROM "Backend_department" WHERE id = NEW.department_id),
+                    (SELECT email FROM "Backend_customuser" WHERE id = NEW.user_id));
+        END''',
+    'backend_employee_search_update': f'''
+        CREATE TRIGGER backend_employee_search_update AFTER UPDATE ON "Backend_employee" BEGIN
+            DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.id;
+            INSERT INTO {SEARCH_TABLE}(rowid, first_name, last_name, employee_code, position, department, email)
+            VALUES (NEW.id, NEW.first_name, NEW.last_name, NEW.employee_id, NEW.position,
+                    (SELECT name FROM "Backend_department" WHERE id = NEW.department_id),
+                    (SELECT email FROM "Backend_customuser" WHERE id = NEW.user_id));
+        END''',
+    'backend_employee_search_delete': f'''
+        CREATE TRIGGER backend_employee_search_delete AFTER DELETE ON "Backend_employee" BEGIN
+            DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.id;
+        END''',
+    'backend_employee_search_department': f'''
+        CREATE TRIGGER backend_employee_search_department AFTER UPDATE OF name ON "Backend_department" BEGIN
+            UPDATE {SEARCH_TABLE} SET department = NEW.name
+            WHERE rowid IN (SELECT id FROM "Backend_employee" WHERE department_id = NEW.id);
+        END''',
+    'backend_employee_search_email': f'''
+        CREATE TRIGGER backend_employee_search_email AFTER UPDATE OF email ON "Backend_customuser" BEGIN
+            UPDATE {SEARCH_TABLE} SET email = NEW.email
+            WHERE rowid IN (SELECT id FROM "Backend_employee" WHERE user_id = NEW.id);
+        END''',
+}
+
+POSTGRESQL_SETUP = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (employee_id bigint PRIMARY KEY, document text NOT NULL)',
+    f'CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_trgm ON {SEARCH_TABLE} USING gin (document gin_trgm_ops)',
+    f'''
+    CREATE OR REPLACE FUNCTION {SEARCH_TABLE}_document(employee bigint) RETURNS text AS $$
+        SELECT lower(concat_ws(' ', e.first_name, e.last_name, e.employee_id, e.position, d.name, u.email))
+        FROM "Backend_employee" e
+        LEFT JOIN "Backend_department" d ON d.id = e.department_id
+        LEFT JOIN "Backend_customuser" u ON u.id = e.user_id
+        WHERE e.id = employee
+    $$ LANGUAGE sql STABLE''',
+    f'''
+    CREATE OR REPLACE FUNCTION {SEARCH_TABLE}_refresh() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            DELETE FROM {SEARCH_TABLE} WHERE employee_id = OLD.id;
+        ELSIF TG_TABLE_NAME = 'Backend_employee' THEN
+            INSERT INTO {SEARCH_TABLE} VALUES (NEW.id, {SEARCH_TABLE}_document(NEW.id))
+            ON CONFLICT (employee_id) DO UPDATE SET document = EXCLUDED.document;
+        ELSIF TG_TABLE_NAME = 'Backend_department' THEN
+            UPDATE {SEARCH_TABLE} SET document = {SEARCH_TABLE}_document(employee_id)
+            WHERE employee_id IN (SELECT id FROM "Backend_employee" WHERE department_id = NEW.id);
+        ELSE
+            UPDATE {SEARCH_TABLE} SET document = {SEARCH_TABLE}_document(employee_id)
+            WHERE employee_id IN (SELECT id FROM "Backend_employee" WHERE user_id = NEW.id);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql''',
+)
+POSTGRESQL_TRIGGERS = {
+    'backend_employee_search_employee': 'AFTER INSERT OR UPDATE OR DELETE ON "Backend_employee"',
+    'backend_employee_search_department': 'AFTER UPDATE OF name ON "Backend_department"',
+    'backend_employee_search_email': 'AFTER UPDATE OF email ON "Backend_customuser"',
+}
+
+
+# The search table and its triggers are vendor-specific raw SQL (FTS5 on SQLite, pg_trgm on
+# PostgreSQL); other databases, and SQLite built without FTS5, get nothing and search falls
+# back to prefix scans
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5('
+                    "first_name, last_name, employee_code, position, department, email, tokenize='trigram')"
+                )
+            except DatabaseError:
+                return
+            for name, sql in SQLITE_TRIGGERS.items():
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+                cursor.execute(sql)
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE}(rowid, first_name, last_name, employee_code, position, department, email) '
+                + DOCUMENT_SQL
+            )
+        elif connection.vendor == 'postgresql':
+            for sql in POSTGRESQL_SETUP:
+                cursor.execute(sql)
+            for name, event in POSTGRESQL_TRIGGERS.items():
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name} ON {event.rsplit(" ON ", 1)[1]}')
+                cursor.execute(f'CREATE TRIGGER {name} {event} FOR EACH ROW EXECUTE FUNCTION {SEARCH_TABLE}_refresh()')
+            cursor.execute(f'TRUNCATE {SEARCH_TABLE}')
+            cursor.execute(f'INSERT INTO {SEARCH_TABLE} SELECT id, {SEARCH_TABLE}_document(id) FROM "Backend_employee"')
+
+
+def drop_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        elif connection.vendor == 'postgresql':
+            for name, event in POSTGRESQL_TRIGGERS.items():
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name} ON {event.rsplit(" ON ", 1)[1]}')
+            cursor.execute(f'DROP FUNCTION IF EXISTS {SEARCH_TABLE}_refresh(), {SEARCH_TABLE}_document(bigint)')
+        else:
+            return
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Backend', '0016_employee_hierarchy'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:35
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Backend', '0018_task_status_deadline_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeadlineDigest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('overdue', models.PositiveIntegerField(default=0)),
+                ('due_soon', models.PositiveIntegerField(default=0)),
+                ('oldest_deadline', models.DateField(null=True)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('manager', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deadline_digests', to='Backend.employee')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('manager', 'date'), name='unique_manager_digest_day')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskDeadlineNotice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('due_soon', 'Due soon'), ('overdue', 'Overdue')], max_length=10)),
+                ('deadline', models.DateField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('recipient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deadline_notices', to='Backend.employee')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deadline_notices', to='Backend.task')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['recipient', 'created_at'], name='deadline_notice_recipient_idx')],
+                'constraints': [models.UniqueConstraint(fields=('task', 'kind', 'deadline'), name='unique_task_deadline_notice')],
+            },
+        ),
+    ]
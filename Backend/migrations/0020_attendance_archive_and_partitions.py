@@ -0,0 +1,128 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:39
+
+from datetime import date
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+# Frozen copy of the Backend.partitions conversion as of this migration
+TABLE = 'Backend_attendance'
+DEFAULT_PARTITION = f'{TABLE}_default'
+MONTHS_AHEAD = 3
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def is_partitioned(cursor):
+    cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [f'"{TABLE}"'])
+    return cursor.fetchone() is not None
+
+
+def add_constraints(cursor):
+    cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT unique_attendance_per_day UNIQUE (employee_id, date)')
+    cursor.execute(
+        f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_employee_id_fk" FOREIGN KEY (employee_id) '
+        'REFERENCES "Backend_employee" (id) DEFERRABLE INITIALLY DEFERRED'
+    )
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence('\"{TABLE}\"', 'id'), coalesce(max(id), 0) + 1, false) FROM \"{TABLE}\""
+    )
+
+
+# Monthly range partitions on PostgreSQL; other databases keep the plain table. Attendance is
+# rebuilt with the same columns, a DEFAULT partition and one partition per month from the
+# oldest row to MONTHS_AHEAD months out. The primary key has to include the partition key, so
+# it becomes (id, date); ids stay unique because they still come from one sequence.
+def partition_attendance(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    staging = f'{TABLE}_partitioned'
+    with connection.cursor() as cursor:
+        if is_partitioned(cursor):
+            return
+        cursor.execute(f'''
+            CREATE TABLE "{staging}" (
+                id bigint GENERATED BY DEFAULT AS IDENTITY,
+                date date NOT NULL,
+                clock_in timestamp with time zone NULL,
+                clock_out timestamp with time zone NULL,
+                employee_id bigint NOT NULL,
+                PRIMARY KEY (id, date)
+            ) PARTITION BY RANGE (date)''')
+        cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{staging}" DEFAULT')
+        cursor.execute(f'SELECT min(date), max(date) FROM "{TABLE}"')
+        first, last = cursor.fetchone()
+        today = date.today()
+        month = min(first or today, today).replace(day=1)
+        end = add_months(max(last or today, today).replace(day=1), MONTHS_AHEAD)
+        while month <= end:
+            cursor.execute(
+                f'CREATE TABLE "{TABLE}_p{month:%Y%m}" PARTITION OF "{staging}" FOR VALUES FROM (%s) TO (%s)',
+                [month, add_months(month, 1)],
+            )
+            month = add_months(month, 1)
+        cursor.execute(
+            f'INSERT INTO "{staging}" (id, date, clock_in, clock_out, employee_id) '
+            f'SELECT id, date, clock_in, clock_out, employee_id FROM "{TABLE}"'
+        )
+        cursor.execute(f'DROP TABLE "{TABLE}"')
+        cursor.execute(f'ALTER TABLE "{staging}" RENAME TO "{TABLE}"')
+        add_constraints(cursor)
+
+
+# Puts the rows back into a plain table
+def unpartition_attendance(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql':
+        return
+    staging = f'{TABLE}_plain'
+    with connection.cursor() as cursor:
+        if not is_partitioned(cursor):
+            return
+        cursor.execute(f'''
+            CREATE TABLE "{staging}" (
+                id bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+                date date NOT NULL,
+                clock_in timestamp with time zone NULL,
+                clock_out timestamp with time zone NULL,
+                employee_id bigint NOT NULL
+            )''')
+        cursor.execute(
+            f'INSERT INTO "{staging}" (id, date, clock_in, clock_out, employee_id) '
+            f'SELECT id, date, clock_in, clock_out, employee_id FROM "{TABLE}"'
+        )
+        cursor.execute(f'DROP TABLE "{TABLE}" CASCADE')
+        cursor.execute(f'ALTER TABLE "{staging}" RENAME TO "{TABLE}"')
+        add_constraints(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Backend', '0019_deadline_notices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('days', models.PositiveSmallIntegerField()),
+                ('payload', models.BinaryField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_archives', to='Backend.employee')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month'], name='attendance_archive_month_idx')],
+                'constraints': [models.UniqueConstraint(fields=('employee', 'month'), name='unique_attendance_archive_month')],
+            },
+        ),
+        migrations.RunPython(partition_attendance, unpartition_attendance),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Backend', '0020_attendance_archive_and_partitions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='changelogentry',
+            name='position',
+            field=models.BigIntegerField(null=True, unique=True),
+        ),
+        # Existing entries are committed, so they keep their ids as positions and clients'
+        # cursors stay valid
+        migrations.RunSQL(
+            'UPDATE "Backend_changelogentry" SET position = id',
+            migrations.RunSQL.noop,
+        ),
+        migrations.RemoveIndex(model_name='changelogentry', name='changelog_owner_idx'),
+        migrations.RemoveIndex(model_name='changelogentry', name='changelog_counterpart_idx'),
+        migrations.AddIndex(
+            model_name='changelogentry',
+            index=models.Index(fields=['owner', 'position'], name='changelog_owner_position_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='changelogentry',
+            index=models.Index(fields=['counterpart', 'position'], name='changelog_counterpart_pos_idx'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import connections, models, router, transaction
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 
@@ -13,6 +13,43 @@ class Department(models.Model):
         return self.name
 
 
+# Denormalized per-department headcount and payroll, kept in sync by Backend.signals
+class DepartmentStats(models.Model):
+    department = models.OneToOneField(Department, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    employee_count = models.PositiveIntegerField(default=0)
+    total_salary = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    @classmethod
+    def apply_delta(cls, department_id, count, salary):
+        if department_id is None:
+            return
+        updated = cls.objects.filter(department_id=department_id).update(
+            employee_count=models.F('employee_count') + count,
+            total_salary=models.F('total_salary') + salary,
+        )
+        if not updated:
+            cls.rebuild([department_id])
+
+    @classmethod
+    def rebuild(cls, department_ids=None):
+        departments = Department.objects.all()
+        if department_ids is not None:
+            departments = departments.filter(id__in=department_ids)
+        totals = departments.annotate(
+            employee_count=models.Count('employees'),
+            total_salary=models.Sum('employees__salary'),
+        ).values_list('id', 'employee_count', 'total_salary')
+        cls.objects.bulk_create(
+            [cls(department_id=pk, employee_count=count, total_salary=salary or 0) for pk, count, salary in totals],
+            update_conflicts=True,
+            unique_fields=['department'],
+            update_fields=['employee_count', 'total_salary'],
+        )
+
+    def __str__(self):
+        return f"{self.department} stats"
+
+
 class CustomUser(AbstractUser):
     ROLE_CHOICES = (
         ('admin', 'Administrator'),
@@ -21,6 +58,11 @@ class CustomUser(AbstractUser):
     )
     
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='employee')
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            models.Index(fields=['date_joined', 'id'], name='user_joined_id_idx'),
+        ]
     
     def __str__(self):
         return f"{self.username} ({self.get_role_display()})"
@@ -46,11 +88,36 @@ class Employee(models.Model):
     salary = models.DecimalField(max_digits=10, decimal_places=2)
     department = models.ForeignKey('Department', on_delete=models.SET_NULL, null=True, blank=True, related_name='employees')
     is_active = models.BooleanField(default=True)
+
+    # Saves in one transaction so the rows Backend.signals locks before a manager change stay
+    # locked until the hierarchy update commits
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
     
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.employee_id})"
 
 
+# Closure table over Employee.manager: one row per (ancestor, descendant) pair, including each
+# employee paired with itself at depth 0. Maintained by Backend.hierarchy via signals.
+class EmployeeHierarchy(models.Model):
+    ancestor = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='unique_hierarchy_pair'),
+        ]
+        indexes = [
+            models.Index(fields=['descendant', 'depth'], name='hierarchy_descendant_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
+
+
 class Attendance(models.Model):
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='attendances')
     date = models.DateField(default=timezone.now)
@@ -63,10 +130,54 @@ class Attendance(models.Model):
             delta = self.clock_out - self.clock_in
             return round(delta.total_seconds() / 3600, 2)
         return 0
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'date'], name='unique_attendance_per_day'),
+        ]
     
     def __str__(self):
         return f"{self.employee} - {self.date}"
 
+# Worked time per employee per calendar month, maintained incrementally by Backend.attendance
+class EmployeeMonthlyHours(models.Model):
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='monthly_hours')
+    month = models.DateField()
+    seconds_worked = models.BigIntegerField(default=0)
+    days_present = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'month'], name='unique_employee_month_hours'),
+        ]
+
+    @property
+    def hours_worked(self):
+        return round(self.seconds_worked / 3600, 2)
+
+    def __str__(self):
+        return f"{self.employee} - {self.month:%Y-%m}"
+
+
+# Worked time per department per day, maintained incrementally by Backend.attendance
+class DepartmentDailyHours(models.Model):
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='daily_hours')
+    date = models.DateField()
+    seconds_worked = models.BigIntegerField(default=0)
+    employees_present = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['department', 'date'], name='unique_department_day_hours'),
+        ]
+
+    @property
+    def hours_worked(self):
+        return round(self.seconds_worked / 3600, 2)
+
+    def __str__(self):
+        return f"{self.department} - {self.date}"
+
 class Task(models.Model):
     STATUS_CHOICES = (
         ('in_progress', 'In Progress'),
@@ -85,6 +196,14 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='task_created_id_idx'),
+            models.Index(fields=['assigned_to', 'status'], name='task_assignee_status_idx'),
+            models.Index(fields=['assigned_by', 'status'], name='task_assigner_status_idx'),
+            models.Index(fields=['status', 'deadline'], name='task_status_deadline_idx'),
+        ]
+
     def __str__(self):
         return f"{self.title} → {self.assigned_to.first_name} ({self.status})"
 
@@ -103,5 +222,175 @@ class Request(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     admin_comment = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['date_submitted', 'id'], name='request_submitted_id_idx'),
+            models.Index(fields=['submitted_by', 'date_submitted', 'id'], name='request_by_submitted_id_idx'),
+            models.Index(fields=['submitted_by', 'status'], name='request_by_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+# Write counter per model, bumped after every committed change; backs the ETag and
+# Last-Modified validators in Backend.conditional
+class TableVersion(models.Model):
+    name = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def bump(cls, *names):
+        now = timezone.now()
+        for name in names:
+            updated = cls.objects.filter(name=name).update(version=models.F('version') + 1, updated_at=now)
+            if not updated:
+                cls.objects.get_or_create(name=name, defaults={'version': 1, 'updated_at': now})
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+# Append-only log of task, request and attendance writes behind the /api/sync/ delta feed.
+# owner/counterpart are employee ids copied at write time so tombstones outlive the rows.
+class ChangeLogEntry(models.Model):
+    MODEL_CHOICES = (
+        ('task', 'Task'),
+        ('request', 'Request'),
+        ('attendance', 'Attendance'),
+    )
+    # PostgreSQL advisory lock key serializing assign_positions
+    SEQUENCE_LOCK = 0x53594E43
+
+    model = models.CharField(max_length=20, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    owner = models.BigIntegerField(null=True)
+    counterpart = models.BigIntegerField(null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    # Feed order, assigned by assign_positions once the entry has committed
+    position = models.BigIntegerField(null=True, unique=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'position'], name='changelog_owner_position_idx'),
+            models.Index(fields=['counterpart', 'position'], name='changelog_counterpart_pos_idx'),
+            models.Index(fields=['created_at'], name='changelog_created_idx'),
+        ]
+
+    # The (owner, counterpart) employee ids an instance's entries are filed under
+    @staticmethod
+    def parties(instance, employee=None):
+        if isinstance(instance, Task):
+            return instance.assigned_to_id, instance.assigned_by_id
+        if isinstance(instance, Request):
+            return instance.submitted_by_id, None
+        employee = employee or instance.employee
+        return instance.employee_id, employee.manager_id
+
+    @classmethod
+    def for_instance(cls, instance, deleted=False, employee=None, parties=None):
+        owner, counterpart = parties or cls.parties(instance, employee)
+        return cls(
+            model=instance._meta.model_name, object_id=instance.pk, deleted=deleted,
+            owner=owner, counterpart=counterpart,
+        )
+
+    # Numbers the committed entries that have no position, in id order, after the highest
+    # position so far. Run after each writing transaction commits (sequence_on_commit), so a
+    # transaction that took an early id but committed late is numbered after every position
+    # already served and no cursor can skip it; an entry whose hook never ran is picked up by
+    # the next write. The advisory lock (PostgreSQL) and the single UPDATE statement (SQLite)
+    # keep concurrent writers from handing out the same positions.
+    @classmethod
+    def assign_positions(cls):
+        using = router.db_for_write(cls)
+        if not cls.objects.using(using).filter(position__isnull=True).exists():
+            return
+        table = cls._meta.db_table
+        connection = connections[using]
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [cls.SEQUENCE_LOCK])
+            cursor.execute(f'''
+                UPDATE "{table}" SET position = numbered.position
+                FROM (
+                    SELECT id, (SELECT coalesce(max(position), 0) FROM "{table}") + row_number() OVER (ORDER BY id) AS position
+                    FROM "{table}" WHERE position IS NULL
+                ) AS numbered
+                WHERE "{table}".id = numbered.id''')
+
+    @classmethod
+    def sequence_on_commit(cls):
+        transaction.on_commit(cls.assign_positions)
+
+    def __str__(self):
+        return f"{self.model} {self.object_id} ({'deleted' if self.deleted else 'updated'})"
+
+
+# One row per task, kind and deadline, written by Backend.deadlines.scan_deadlines. The unique
+# constraint lets repeated or concurrent scans insert each notice once; a moved deadline earns
+# a new one.
+class TaskDeadlineNotice(models.Model):
+    KIND_CHOICES = (
+        ('due_soon', 'Due soon'),
+        ('overdue', 'Overdue'),
+    )
+
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='deadline_notices')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    deadline = models.DateField()
+    recipient = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='deadline_notices')
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'kind', 'deadline'], name='unique_task_deadline_notice'),
+        ]
+        indexes = [
+            models.Index(fields=['recipient', 'created_at'], name='deadline_notice_recipient_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task_id} {self.kind} ({self.deadline})"
+
+
+# Per-manager count of open tasks overdue or due soon as of `date`, rewritten by every scan
+# that day
+class DeadlineDigest(models.Model):
+    manager = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='deadline_digests')
+    date = models.DateField()
+    overdue = models.PositiveIntegerField(default=0)
+    due_soon = models.PositiveIntegerField(default=0)
+    oldest_deadline = models.DateField(null=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['manager', 'date'], name='unique_manager_digest_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.manager_id} {self.date}: {self.overdue} overdue, {self.due_soon} due soon"
+
+
+# Attendance moved out of the live table by archive_attendance: one zlib-compressed block of
+# rows per employee and month, read back through Backend.archive
+class AttendanceArchive(models.Model):
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='attendance_archives')
+    month = models.DateField()
+    days = models.PositiveSmallIntegerField()
+    payload = models.BinaryField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'month'], name='unique_attendance_archive_month'),
+        ]
+        indexes = [
+            models.Index(fields=['month'], name='attendance_archive_month_idx'),
+        ]
+
     def __str__(self):
-        return f"{self.name} ({self.status})"
\ No newline at end of file
+        return f"{self.employee_id} - {self.month:%Y-%m} ({self.days} days)"
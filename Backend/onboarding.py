@@ -0,0 +1,165 @@
+import csv
+import io
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .conditional import bump_versions
+from .hierarchy import extend_hierarchy
+from .models import CustomUser, Department, DepartmentStats, Employee
+from .serializers import EmployeeImportRowSerializer
+
+
+# Below this many passwords a process pool costs more to start than it saves
+PARALLEL_HASHING_THRESHOLD = 200
+
+# Keeps IN (...) lookups under SQLite's bound-parameter limit
+LOOKUP_CHUNK = 900
+
+
+def parse_rows(content, filename=''):
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    if filename.lower().endswith('.json') or content.lstrip().startswith(('[', '{')):
+        data = json.loads(content)
+        return data['employees'] if isinstance(data, dict) else data
+    return list(csv.DictReader(io.StringIO(content)))
+
+
+def _existing(model, field, values):
+    values = list(values)
+    found = set()
+    for start in range(0, len(values), LOOKUP_CHUNK):
+        chunk = values[start:start + LOOKUP_CHUNK]
+        found.update(model.objects.filter(**{f'{field}__in': chunk}).values_list(field, flat=True))
+    return found
+
+
+def _init_worker():
+    django.setup()
+
+
+# Hashing dominates import time, so it is spread over processes when the batch is large
+def hash_passwords(passwords, workers=None):
+    if len(passwords) < PARALLEL_HASHING_THRESHOLD or workers == 1:
+        return [make_password(password or None) for password in passwords]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        return list(pool.map(make_password, [password or None for password in passwords], chunksize=64))
+
+
+# Checks every row before anything is written: field validation, duplicates within the
+# file and against the database, and department/manager references, each in bulk.
+# Returns (cleaned rows, errors) where errors is a list of {'row': n, 'errors': {...}}.
+def validate_rows(rows):
+    cleaned, errors = [], {}
+    for number, row in enumerate(rows, start=1):
+        serializer = EmployeeImportRowSerializer(data=row)
+        if serializer.is_valid():
+            cleaned.append((number, serializer.validated_data))
+        else:
+            errors[number] = dict(serializer.errors)
+
+    def add_error(number, field, message):
+        errors.setdefault(number, {}).setdefault(field, []).append(message)
+
+    for field, model, lookup in (
+        ('username', CustomUser, 'username'),
+        ('employee_id', Employee, 'employee_id'),
+    ):
+        seen = {}
+        for number, data in cleaned:
+            value = data[field]
+            if value in seen:
+                add_error(number, field, f'Duplicates row {seen[value]}.')
+            seen.setdefault(value, number)
+        taken = _existing(model, lookup, seen)
+        for number, data in cleaned:
+            if data[field] in taken:
+                add_error(number, field, 'Already exists.')
+
+    department_names = {data['department'] for _, data in cleaned if data.get('department')}
+    departments = dict(Department.objects.filter(name__in=department_names).values_list('name', 'id'))
+    manager_refs = {data['manager'] for _, data in cleaned if data.get('manager')}
+    in_file = {data['employee_id'] for _, data in cleaned}
+    managers = {}
+    refs = list(manager_refs - in_file)
+    for start in range(0, len(refs), LOOKUP_CHUNK):
+        managers.update(Employee.objects.filter(employee_id__in=refs[start:start + LOOKUP_CHUNK]).values_list('employee_id', 'id'))
+
+    for number, data in cleaned:
+        if data.get('department') and data['department'] not in departments:
+            add_error(number, 'department', f"Unknown department '{data['department']}'.")
+        data['department_id'] = departments.get(data.get('department'))
+        manager = data.get('manager')
+        if manager and manager not in in_file and manager not in managers:
+            add_error(number, 'manager', f"Unknown manager employee_id '{manager}'.")
+        if manager and manager == data['employee_id']:
+            add_error(number, 'manager', 'An employee cannot manage themselves.')
+        data['manager_id'] = managers.get(manager)
+
+    # A reporting line inside the file must not lead back to the employee it starts from
+    in_file_managers = {data['employee_id']: data.get('manager') for _, data in cleaned}
+    for number, data in cleaned:
+        current, steps = data.get('manager'), 0
+        if current == data['employee_id']:
+            continue
+        while current in in_file_managers and current != data['employee_id'] and steps < len(in_file_managers):
+            current, steps = in_file_managers[current], steps + 1
+        if current == data['employee_id']:
+            add_error(number, 'manager', 'The reporting line loops back to this employee.')
+
+    return [data for number, data in cleaned if number not in errors], [
+        {'row': number, 'errors': errors[number]} for number in sorted(errors)
+    ]
+
+
+# Validates all rows, then creates users and employees with chunked bulk_create in one
+# transaction. Nothing is written if any row fails validation or dry_run is set.
+def import_employees(rows, workers=None, batch_size=1000, dry_run=False):
+    valid, errors = validate_rows(rows)
+    if errors or dry_run:
+        return {'created': 0, 'errors': errors}
+
+    hashes = hash_passwords([data.get('password') for data in valid], workers)
+    users = [
+        CustomUser(
+            username=data['username'], email=data['email'], password=password,
+            first_name=data['first_name'], last_name=data['last_name'], role=data['role'],
+            is_staff=data['role'] == 'admin', is_superuser=data['role'] == 'admin',
+        )
+        for data, password in zip(valid, hashes)
+    ]
+
+    with transaction.atomic():
+        CustomUser.objects.bulk_create(users, batch_size=batch_size)
+        employees = [
+            Employee(
+                user=user, employee_id=data['employee_id'], first_name=data['first_name'],
+                last_name=data['last_name'], gender=data['gender'], date_of_birth=data['date_of_birth'],
+                address=data['address'], hire_date=data['hire_date'], position=data['position'],
+                salary=data['salary'], department_id=data['department_id'], manager_id=data['manager_id'],
+            )
+            for user, data in zip(users, valid)
+        ]
+        Employee.objects.bulk_create(employees, batch_size=batch_size)
+
+        # Managers that arrived in the same file only have ids now
+        by_employee_id = {employee.employee_id: employee for employee in employees}
+        linked = []
+        for employee, data in zip(employees, valid):
+            if data.get('manager') and employee.manager_id is None:
+                employee.manager_id = by_employee_id[data['manager']].id
+                linked.append(employee)
+        Employee.objects.bulk_update(linked, ['manager'], batch_size=batch_size)
+        extend_hierarchy({employee.id: employee.manager_id for employee in employees})
+
+        # bulk_create skips the signals that keep the hierarchy, stats and validators current
+        department_ids = {data['department_id'] for data in valid if data['department_id']}
+        if department_ids:
+            DepartmentStats.rebuild(department_ids)
+        bump_versions(CustomUser, Employee)
+
+    return {'created': len(employees), 'errors': []}
@@ -0,0 +1,152 @@
+from datetime import date
+
+from django.db import connection as default_connection
+
+
+# PostgreSQL keeps Attendance as a table range-partitioned by month on `date`, with a DEFAULT
+# partition catching rows no monthly partition covers yet. Queries filtered on date only read
+# the matching partitions, and archived months are dropped whole. Other databases keep the
+# plain table; everything here is a no-op for them.
+TABLE = 'Backend_attendance'
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month:%Y%m}'
+
+
+def is_partitioned(conn=default_connection):
+    if conn.vendor != 'postgresql':
+        return False
+    with conn.cursor() as cursor:
+        cursor.execute('SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)', [f'"{TABLE}"'])
+        return cursor.fetchone() is not None
+
+
+def partition_exists(cursor, month):
+    cursor.execute('SELECT to_regclass(%s)', [f'"{partition_name(month)}"'])
+    return cursor.fetchone()[0] is not None
+
+
+# Creates the monthly partitions from `first` through `last`, moving any of their rows out of
+# the DEFAULT partition first, since PostgreSQL refuses to attach over rows it holds
+def ensure_partitions(first, last, conn=default_connection):
+    if not is_partitioned(conn):
+        return []
+    created = []
+    month = month_start(first)
+    with conn.cursor() as cursor:
+        while month <= last:
+            if not partition_exists(cursor, month):
+                bounds = [month, add_months(month, 1)]
+                name = partition_name(month)
+                cursor.execute(f'CREATE TABLE "{name}" (LIKE "{TABLE}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)')
+                cursor.execute(
+                    f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" WHERE date >= %s AND date < %s RETURNING *) '
+                    f'INSERT INTO "{name}" SELECT * FROM moved',
+                    bounds,
+                )
+                cursor.execute(f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{name}" FOR VALUES FROM (%s) TO (%s)', bounds)
+                created.append(month)
+            month = add_months(month, 1)
+    return created
+
+
+# Drops the partition of an archived month in one statement instead of deleting its rows
+def drop_partition(month, conn=default_connection):
+    if not is_partitioned(conn):
+        return False
+    with conn.cursor() as cursor:
+        if not partition_exists(cursor, month):
+            return False
+        cursor.execute(f'DROP TABLE "{partition_name(month)}"')
+    return True
+
+
+# Locks a month's partition against writes while it is being archived
+def lock_partition(month, conn=default_connection):
+    if not is_partitioned(conn):
+        return
+    with conn.cursor() as cursor:
+        if partition_exists(cursor, month):
+            cursor.execute(f'LOCK TABLE "{partition_name(month)}" IN EXCLUSIVE MODE')
+
+
+# Rebuilds Attendance as a partitioned table with the same columns and constraints, copying
+# every row and carrying the id sequence over. The primary key has to include the partition
+# key, so it becomes (id, date); ids stay unique because they still come from one sequence.
+def convert_to_partitioned(conn, months_ahead=3):
+    if conn.vendor != 'postgresql' or is_partitioned(conn):
+        return
+    staging = f'{TABLE}_partitioned'
+    with conn.cursor() as cursor:
+        cursor.execute(f'''
+            CREATE TABLE "{staging}" (
+                id bigint GENERATED BY DEFAULT AS IDENTITY,
+                date date NOT NULL,
+                clock_in timestamp with time zone NULL,
+                clock_out timestamp with time zone NULL,
+                employee_id bigint NOT NULL,
+                PRIMARY KEY (id, date)
+            ) PARTITION BY RANGE (date)''')
+        cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{staging}" DEFAULT')
+        cursor.execute(f'SELECT min(date), max(date) FROM "{TABLE}"')
+        first, last = cursor.fetchone()
+        today = date.today()
+        month, end = month_start(min(first or today, today)), add_months(month_start(max(last or today, today)), months_ahead)
+        while month <= end:
+            cursor.execute(
+                f'CREATE TABLE "{partition_name(month)}" PARTITION OF "{staging}" FOR VALUES FROM (%s) TO (%s)',
+                [month, add_months(month, 1)],
+            )
+            month = add_months(month, 1)
+        cursor.execute(
+            f'INSERT INTO "{staging}" (id, date, clock_in, clock_out, employee_id) '
+            f'SELECT id, date, clock_in, clock_out, employee_id FROM "{TABLE}"'
+        )
+        cursor.execute(f'DROP TABLE "{TABLE}"')
+        cursor.execute(f'ALTER TABLE "{staging}" RENAME TO "{TABLE}"')
+        _add_constraints(cursor)
+
+
+# Puts the rows back into a plain table, for reversing the migration
+def convert_to_plain(conn):
+    if not is_partitioned(conn):
+        return
+    staging = f'{TABLE}_plain'
+    with conn.cursor() as cursor:
+        cursor.execute(f'''
+            CREATE TABLE "{staging}" (
+                id bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+                date date NOT NULL,
+                clock_in timestamp with time zone NULL,
+                clock_out timestamp with time zone NULL,
+                employee_id bigint NOT NULL
+            )''')
+        cursor.execute(
+            f'INSERT INTO "{staging}" (id, date, clock_in, clock_out, employee_id) '
+            f'SELECT id, date, clock_in, clock_out, employee_id FROM "{TABLE}"'
+        )
+        cursor.execute(f'DROP TABLE "{TABLE}" CASCADE')
+        cursor.execute(f'ALTER TABLE "{staging}" RENAME TO "{TABLE}"')
+        _add_constraints(cursor)
+
+
+def _add_constraints(cursor):
+    cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT unique_attendance_per_day UNIQUE (employee_id, date)')
+    cursor.execute(
+        f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_employee_id_fk" FOREIGN KEY (employee_id) '
+        'REFERENCES "Backend_employee" (id) DEFERRABLE INITIALLY DEFERRED'
+    )
+    cursor.execute(
+        f"SELECT setval(pg_get_serial_sequence('\"{TABLE}\"', 'id'), coalesce(max(id), 0) + 1, false) FROM \"{TABLE}\""
+    )
@@ -0,0 +1,95 @@
+import hashlib
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_routing = ContextVar('replica_routing', default=None)
+
+
+class RequestRouting:
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+def pin_key(request):
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    return 'replica-pin:' + hashlib.md5(authorization.encode()).hexdigest()
+
+
+# Reads go to a random DATABASE_REPLICAS alias, but only inside a request the middleware
+# released to the replicas. Writes, reads in a transaction, reads after a write in the same
+# request, and everything outside a request (commands, workers) stay on the primary.
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        routing = _routing.get()
+        if not settings.DATABASE_REPLICAS or routing is None or not routing.use_replica or routing.wrote:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        routing = _routing.get()
+        if routing is not None:
+            routing.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    # Replicas get their schema through replication
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+# Releases safe requests to the replicas unless the caller (keyed by Authorization header)
+# wrote within the last REPLICA_STICKY_SECONDS, so users read their own writes even when
+# the replicas lag. Unsafe requests, and requests that wrote, start a new window.
+class ReplicaStickinessMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+        cache = caches[settings.REPLICA_PIN_CACHE]
+        safe = request.method in SAFE_METHODS
+        routing = RequestRouting(safe and cache.get(pin_key(request)) is None)
+        token = _routing.set(routing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        if routing.wrote or not safe:
+            cache.set(pin_key(request), True, settings.REPLICA_STICKY_SECONDS)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+        cache = caches[settings.REPLICA_PIN_CACHE]
+        safe = request.method in SAFE_METHODS
+        routing = RequestRouting(safe and await cache.aget(pin_key(request)) is None)
+        token = _routing.set(routing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        if routing.wrote or not safe:
+            await cache.aset(pin_key(request), True, settings.REPLICA_STICKY_SECONDS)
+        return response
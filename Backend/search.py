@@ -0,0 +1,256 @@
+import re
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
+
+from .models import Employee
+
+
+SEARCH_TABLE = 'backend_employee_search'
+
+# Candidates fetched from the index before they are re-ranked in Python
+CANDIDATES = 200
+
+# Matches scoring below this are dropped
+MIN_SCORE = 0.3
+
+# Word similarity threshold for the pg_trgm `<%` operator (its default is 0.6)
+PG_WORD_SIMILARITY = 0.3
+
+_DOCUMENT_SQL = (
+    'SELECT e.id, e.first_name, e.last_name, e.employee_id, e.position, d.name, u.email '
+    'FROM "Backend_employee" e '
+    'LEFT JOIN "Backend_department" d ON d.id = e.department_id '
+    'LEFT JOIN "Backend_customuser" u ON u.id = e.user_id'
+)
+
+# SQLite: an FTS5 trigram table keyed by employee rowid, kept in step by triggers. Department
+# renames and email changes are copied into every affected row.
+SQLITE_TRIGGERS = {
+    'backend_employee_search_insert': f'''
+        CREATE TRIGGER backend_employee_search_insert AFTER INSERT ON "Backend_employee" BEGIN
+            INSERT INTO {SEARCH_TABLE}(rowid, first_name, last_name, employee_code, position, department, email)
+            VALUES (NEW.id, NEW.first_name, NEW.last_name, NEW.employee_id, NEW.position,
+                    (SELECT name FROM "Backend_department" WHERE id = NEW.department_id),
+                    (SELECT email FROM "Backend_customuser" WHERE id = NEW.user_id));
+        END''',
+    'backend_employee_search_update': f'''
+        CREATE TRIGGER backend_employee_search_update AFTER UPDATE ON "Backend_employee" BEGIN
+            DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.id;
+            INSERT INTO {SEARCH_TABLE}(rowid, first_name, last_name, employee_code, position, department, email)
+            VALUES (NEW.id, NEW.first_name, NEW.last_name, NEW.employee_id, NEW.position,
+                    (SELECT name FROM "Backend_department" WHERE id = NEW.department_id),
+                    (SELECT email FROM "Backend_customuser" WHERE id = NEW.user_id));
+        END''',
+    'backend_employee_search_delete': f'''
+        CREATE TRIGGER backend_employee_search_delete AFTER DELETE ON "Backend_employee" BEGIN
+            DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.id;
+        END''',
+    'backend_employee_search_department': f'''
+        CREATE TRIGGER backend_employee_search_department AFTER UPDATE OF name ON "Backend_department" BEGIN
+            UPDATE {SEARCH_TABLE} SET department = NEW.name
+            WHERE rowid IN (SELECT id FROM "Backend_employee" WHERE department_id = NEW.id);
+        END''',
+    'backend_employee_search_email': f'''
+        CREATE TRIGGER backend_employee_search_email AFTER UPDATE OF email ON "Backend_customuser" BEGIN
+            UPDATE {SEARCH_TABLE} SET email = NEW.email
+            WHERE rowid IN (SELECT id FROM "Backend_employee" WHERE user_id = NEW.id);
+        END''',
+}
+
+# PostgreSQL: one lower-cased document per employee under a GIN trigram index. There is no
+# foreign key, so flushing Backend_employee with TRUNCATE is not blocked by this table.
+POSTGRESQL_SETUP = (
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    f'CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (employee_id bigint PRIMARY KEY, document text NOT NULL)',
+    f'CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_trgm ON {SEARCH_TABLE} USING gin (document gin_trgm_ops)',
+    f'''
+    CREATE OR REPLACE FUNCTION {SEARCH_TABLE}_document(employee bigint) RETURNS text AS $$
+        SELECT lower(concat_ws(' ', e.first_name, e.last_name, e.employee_id, e.position, d.name, u.email))
+        FROM "Backend_employee" e
+        LEFT JOIN "Backend_department" d ON d.id = e.department_id
+        LEFT JOIN "Backend_customuser" u ON u.id = e.user_id
+        WHERE e.id = employee
+    $$ LANGUAGE sql STABLE''',
+    f'''
+    CREATE OR REPLACE FUNCTION {SEARCH_TABLE}_refresh() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            DELETE FROM {SEARCH_TABLE} WHERE employee_id = OLD.id;
+        ELSIF TG_TABLE_NAME = 'Backend_employee' THEN
+            INSERT INTO {SEARCH_TABLE} VALUES (NEW.id, {SEARCH_TABLE}_document(NEW.id))
+            ON CONFLICT (employee_id) DO UPDATE SET document = EXCLUDED.document;
+        ELSIF TG_TABLE_NAME = 'Backend_department' THEN
+            UPDATE {SEARCH_TABLE} SET document = {SEARCH_TABLE}_document(employee_id)
+            WHERE employee_id IN (SELECT id FROM "Backend_employee" WHERE department_id = NEW.id);
+        ELSE
+            UPDATE {SEARCH_TABLE} SET document = {SEARCH_TABLE}_document(employee_id)
+            WHERE employee_id IN (SELECT id FROM "Backend_employee" WHERE user_id = NEW.id);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql''',
+)
+POSTGRESQL_TRIGGERS = {
+    'backend_employee_search_employee': 'AFTER INSERT OR UPDATE OR DELETE ON "Backend_employee"',
+    'backend_employee_search_department': 'AFTER UPDATE OF name ON "Backend_department"',
+    'backend_employee_search_email': 'AFTER UPDATE OF email ON "Backend_customuser"',
+}
+
+
+def _existing_triggers(cursor, vendor):
+    if vendor == 'sqlite':
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN ('Backend_employee', 'Backend_department', 'Backend_customuser')")
+    else:
+        cursor.execute('SELECT tgname FROM pg_trigger WHERE NOT tgisinternal')
+    return {row[0] for row in cursor.fetchall()}
+
+
+# Creates the search table and triggers where missing and refills the table if anything had
+# to be (re)created. Runs from the migration and after every migrate, because SQLite drops a
+# table's triggers when a migration rebuilds it. Returns False when the database has no
+# index support (another vendor, or SQLite built without FTS5); search then scans instead.
+def install_search_index(conn=connection):
+    if conn.vendor not in ('sqlite', 'postgresql'):
+        return False
+    with conn.cursor() as cursor:
+        expected = SQLITE_TRIGGERS if conn.vendor == 'sqlite' else POSTGRESQL_TRIGGERS
+        existing = _existing_triggers(cursor, conn.vendor)
+        if conn.vendor == 'sqlite' and SEARCH_TABLE in conn.introspection.table_names(cursor) and existing >= set(expected):
+            return True
+        if conn.vendor == 'postgresql' and existing >= set(expected):
+            return True
+        with transaction.atomic(using=conn.alias):
+            if conn.vendor == 'sqlite':
+                try:
+                    cursor.execute(
+                        f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5('
+                        "first_name, last_name, employee_code, position, department, email, tokenize='trigram')"
+                    )
+                except DatabaseError:
+                    return False
+                for name, sql in SQLITE_TRIGGERS.items():
+                    cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+                    cursor.execute(sql)
+                cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+                cursor.execute(
+                    f'INSERT INTO {SEARCH_TABLE}(rowid, first_name, last_name, employee_code, position, department, email) '
+                    + _DOCUMENT_SQL
+                )
+            else:
+                for sql in POSTGRESQL_SETUP:
+                    cursor.execute(sql)
+                for name, event in POSTGRESQL_TRIGGERS.items():
+                    cursor.execute(f'DROP TRIGGER IF EXISTS {name} ON {event.rsplit(" ON ", 1)[1]}')
+                    cursor.execute(f'CREATE TRIGGER {name} {event} FOR EACH ROW EXECUTE FUNCTION {SEARCH_TABLE}_refresh()')
+                cursor.execute(f'TRUNCATE {SEARCH_TABLE}')
+                cursor.execute(f'INSERT INTO {SEARCH_TABLE} SELECT id, {SEARCH_TABLE}_document(id) FROM "Backend_employee"')
+    return True
+
+
+def remove_search_index(conn=connection):
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+        elif conn.vendor == 'postgresql':
+            for name, event in POSTGRESQL_TRIGGERS.items():
+                cursor.execute(f'DROP TRIGGER IF EXISTS {name} ON {event.rsplit(" ON ", 1)[1]}')
+            cursor.execute(f'DROP FUNCTION IF EXISTS {SEARCH_TABLE}_refresh(), {SEARCH_TABLE}_document(bigint)')
+        else:
+            return
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+def _terms(query):
+    return [term for term in re.split(r'[^\w]+', query.lower()) if term]
+
+
+def _trigrams(word):
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# pg_trgm-style score of one query term against the best word of a document: 1.0 for a
+# prefix match, otherwise the share of trigrams the two have in common
+def _term_score(term, words):
+    best = 0.0
+    grams = _trigrams(term)
+    for word in words:
+        if word.startswith(term):
+            return 1.0
+        other = _trigrams(word)
+        best = max(best, len(grams & other) / len(grams | other))
+    return best
+
+
+def rank(query, candidates, limit):
+    terms = _terms(query)
+    scored = []
+    for employee_id, text in candidates:
+        words = _terms(text)
+        score = sum(_term_score(term, words) for term in terms) / len(terms)
+        if score >= MIN_SCORE:
+            scored.append((-score, employee_id))
+    scored.sort()
+    return [(employee_id, round(-score, 3)) for score, employee_id in scored[:limit]]
+
+
+def _fts5_candidates(terms):
+    grams = {gram for term in terms if len(term) >= 3 for gram in (term[i:i + 3] for i in range(len(term) - 2))}
+    if not grams:
+        return None
+    match = ' OR '.join('"{}"'.format(gram.replace('"', '""')) for gram in sorted(grams))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, first_name || ' ' || last_name || ' ' || employee_code || ' ' || position || ' ' "
+            f"|| coalesce(department, '') || ' ' || coalesce(email, '') FROM {SEARCH_TABLE} "
+            f'WHERE {SEARCH_TABLE} MATCH %s ORDER BY bm25({SEARCH_TABLE}) LIMIT %s',
+            [match, CANDIDATES],
+        )
+        return cursor.fetchall()
+
+
+def _trigram_candidates(terms):
+    with connection.cursor() as cursor:
+        cursor.execute(f'SET LOCAL pg_trgm.word_similarity_threshold = {PG_WORD_SIMILARITY}')
+        cursor.execute(
+            f'SELECT employee_id, document FROM {SEARCH_TABLE} WHERE %s <%% document '
+            f'ORDER BY word_similarity(%s, document) DESC LIMIT %s',
+            [' '.join(terms), ' '.join(terms), CANDIDATES],
+        )
+        return cursor.fetchall()
+
+
+# Prefix scan for terms too short for trigrams and for databases without the index
+def _scan_candidates(terms):
+    condition = Q()
+    for term in terms:
+        condition |= (
+            Q(first_name__istartswith=term) | Q(last_name__istartswith=term) | Q(employee_id__istartswith=term)
+            | Q(position__istartswith=term) | Q(department__name__istartswith=term) | Q(user__email__istartswith=term)
+        )
+    rows = Employee.objects.filter(condition).values_list(
+        'id', 'first_name', 'last_name', 'employee_id', 'position', 'department__name', 'user__email',
+    ).order_by('id')[:CANDIDATES]
+    return [(row[0], ' '.join(value or '' for value in row[1:])) for row in rows]
+
+
+# Returns up to `limit` (employee id, score) pairs, best first. Matches names, employee id,
+# position, department name and email by prefix and, through trigrams, despite typos.
+def search_employees(query, limit=20):
+    terms = _terms(query)
+    if not terms:
+        return []
+    candidates = None
+    try:
+        with transaction.atomic():
+            if connection.vendor == 'sqlite':
+                candidates = _fts5_candidates(terms)
+            elif connection.vendor == 'postgresql':
+                candidates = _trigram_candidates(terms)
+    except DatabaseError:
+        candidates = None
+    if candidates is None:
+        candidates = _scan_candidates(terms)
+    return rank(query, candidates, limit)
@@ -1,19 +1,125 @@
+from datetime import timedelta
+
 from rest_framework import serializers
 from .models import Department, CustomUser, Employee, Attendance, Task, Request
 from django.contrib.auth import get_user_model
+from django.core.exceptions import FieldDoesNotExist
 from django.db.models import Sum
+from django.utils import timezone
+from .archive import live_since
+from .attendance import ATTENDANCE_ACTIONS, attendance_date
+from .hierarchy import would_create_cycle
+from .metrics import TimedSerializerMixin
+
+
+# Declares which relations each serializer field reads, so views can eager-load them up front
+class EagerLoadingMixin:
+    select_related_fields = {}
+    prefetch_related_fields = {}
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None):
+        select = set()
+        prefetch = set()
+        for name, paths in cls.select_related_fields.items():
+            if fields is None or name in fields:
+                select.update(paths)
+        for name, paths in cls.prefetch_related_fields.items():
+            if fields is None or name in fields:
+                prefetch.update(paths)
+        if select:
+            queryset = queryset.select_related(*sorted(select))
+        if prefetch:
+            queryset = queryset.prefetch_related(*sorted(prefetch))
+        return queryset
+
+
+def _parse_field_list(value):
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+# Maps a serializer field's source onto an `.only()` path, or None when it is not a plain column
+def _model_column(model, attrs):
+    parts = []
+    for attr in attrs:
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        if not field.concrete or field.many_to_many:
+            return None
+        parts.append(attr)
+        if field.is_relation:
+            model = field.related_model
+    return '__'.join(parts) or None
+
+
+# Trims GET responses to ?fields=a,b or drops ?exclude=c. EagerLoadingViewMixin applies the
+# same selection to the queryset, so unrequested columns and joins are never fetched.
+class SparseFieldsetMixin:
+    # Columns read by fields whose source is not a model column; () means none
+    field_columns = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is not None and request.method in ('GET', 'HEAD'):
+            selected = self.sparse_fieldset(request.query_params, self.fields)
+            if selected is not None:
+                for name in set(self.fields) - selected:
+                    self.fields.pop(name)
+
+    @classmethod
+    def sparse_fieldset(cls, query_params, available=None):
+        requested = _parse_field_list(query_params.get('fields', ''))
+        excluded = _parse_field_list(query_params.get('exclude', ''))
+        if not requested and not excluded:
+            return None
+        available = set(cls().fields if available is None else available)
+        unknown = (requested | excluded) - available
+        if unknown:
+            raise serializers.ValidationError({'fields': f"Unknown field(s): {', '.join(sorted(unknown))}"})
+        return (requested or available) - excluded
+
+    # Returns the `.only()` paths needed to render `selected`, or None if some field cannot be mapped
+    @classmethod
+    def only_columns(cls, selected):
+        model = cls.Meta.model
+        fields = cls().fields
+        columns = {model._meta.pk.name}
+        for name in selected:
+            if name in cls.field_columns:
+                columns.update(cls.field_columns[name])
+                continue
+            if fields[name].write_only:
+                continue
+            column = _model_column(model, fields[name].source_attrs)
+            if column is None:
+                return None
+            columns.add(column)
+        return columns
 
 
-class DepartmentSerializer(serializers.ModelSerializer):
+class DepartmentSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    field_columns = {
+        'employee_count': (),
+        'total_salary': (),
+    }
+
     employee_count = serializers.SerializerMethodField()
     total_salary = serializers.SerializerMethodField()
     class Meta:
         model = Department
         fields = '__all__'
+    # DepartmentViewSet annotates both values; the queries below only run for unannotated instances
     def get_employee_count(self, obj):
+        if hasattr(obj, 'employee_count'):
+            return obj.employee_count
         return Employee.objects.filter(department=obj).count()
 
     def get_total_salary(self, obj):
+        if hasattr(obj, 'total_salary'):
+            return obj.total_salary or 0.00
         total = Employee.objects.filter(department=obj).aggregate(total=Sum('salary'))['total']
         return total or 0.00
 
@@ -21,7 +127,7 @@ class DepartmentSerializer(serializers.ModelSerializer):
 
 User = get_user_model()
 
-class CustomUserSerializer(serializers.ModelSerializer):
+class CustomUserSerializer(TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=False)
 
     class Meta:
@@ -57,7 +163,16 @@ class CustomUserSerializer(serializers.ModelSerializer):
         return instance
 
 
-class EmployeeSerializer(serializers.ModelSerializer):
+class EmployeeSerializer(TimedSerializerMixin, SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = {
+        'department_name': ('department',),
+        'manager_name': ('manager',),
+        'manager_email': ('manager__user',),
+    }
+    field_columns = {
+        'manager_email': ('manager__user__email',),
+    }
+
     department_name = serializers.ReadOnlyField(source='department.name')
     manager_name = serializers.ReadOnlyField(source='manager.first_name', read_only=True)
     manager_email = serializers.SerializerMethodField()
@@ -67,6 +182,11 @@ class EmployeeSerializer(serializers.ModelSerializer):
             return obj.manager.user.email
         return None
 
+    def validate_manager(self, manager):
+        if manager is not None and self.instance is not None and would_create_cycle(self.instance.pk, manager.pk):
+            raise serializers.ValidationError('An employee cannot report to someone in their own reporting line.')
+        return manager
+
     class Meta:
         model = Employee
         fields = [
@@ -78,7 +198,34 @@ class EmployeeSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class AttendanceSerializer(serializers.ModelSerializer):
+# One row of a bulk employee import; department is a name and manager an employee_id,
+# which Backend.onboarding resolves for all rows at once
+class EmployeeImportRowSerializer(serializers.Serializer):
+    username = serializers.CharField(max_length=150)
+    email = serializers.EmailField()
+    password = serializers.CharField(required=False, allow_blank=True, write_only=True)
+    first_name = serializers.CharField(max_length=50)
+    last_name = serializers.CharField(max_length=50)
+    role = serializers.ChoiceField(choices=CustomUser.ROLE_CHOICES, default='employee')
+    employee_id = serializers.CharField(max_length=20)
+    gender = serializers.ChoiceField(choices=Employee.GENDER_CHOICES)
+    date_of_birth = serializers.DateField()
+    address = serializers.CharField()
+    hire_date = serializers.DateField()
+    position = serializers.CharField(max_length=100)
+    salary = serializers.DecimalField(max_digits=10, decimal_places=2)
+    department = serializers.CharField(required=False, allow_blank=True)
+    manager = serializers.CharField(required=False, allow_blank=True)
+
+
+class AttendanceSerializer(TimedSerializerMixin, SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = {
+        'employee_name': ('employee',),
+    }
+    field_columns = {
+        'hours_worked': ('clock_in', 'clock_out'),
+    }
+
     employee_name = serializers.ReadOnlyField(source='employee.first_name', read_only=True)
     hours_worked = serializers.ReadOnlyField()
     
@@ -87,7 +234,33 @@ class AttendanceSerializer(serializers.ModelSerializer):
         fields = '__all__'
         read_only_fields = ('id',)
 
-class TaskSerializer(serializers.ModelSerializer):
+# Offline clock events may carry their own timestamp, but only within the live months (older
+# ones belong to archived months) and no later than now, allowing for a little clock skew
+class BulkAttendanceEntrySerializer(serializers.Serializer):
+    max_clock_skew = timedelta(minutes=1)
+
+    employee_id = serializers.IntegerField()
+    action = serializers.ChoiceField(choices=ATTENDANCE_ACTIONS)
+    timestamp = serializers.DateTimeField(required=False)
+
+    def validate_timestamp(self, value):
+        if value > timezone.now() + self.max_clock_skew:
+            raise serializers.ValidationError('Timestamp is in the future.')
+        if attendance_date(value) < live_since():
+            raise serializers.ValidationError('Timestamp falls in an archived month.')
+        return value
+
+    def validate(self, attrs):
+        attrs.setdefault('timestamp', timezone.now())
+        return attrs
+
+
+class TaskSerializer(TimedSerializerMixin, SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = {
+        'assigned_to_name': ('assigned_to',),
+        'assigned_by_name': ('assigned_by',),
+    }
+
     assigned_to_name = serializers.ReadOnlyField(source='assigned_to.first_name')
     assigned_by_name = serializers.ReadOnlyField(source='assigned_by.first_name')
 
@@ -96,7 +269,14 @@ class TaskSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class RequestSerializer(serializers.ModelSerializer):
+class RequestSerializer(TimedSerializerMixin, SparseFieldsetMixin, EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = {
+        'submitted_by_name': ('submitted_by',),
+    }
+    field_columns = {
+        'submitted_by_name': ('submitted_by__first_name', 'submitted_by__last_name'),
+    }
+
     submitted_by_name = serializers.SerializerMethodField()
 
     class Meta:
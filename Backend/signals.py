@@ -0,0 +1,257 @@
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db import connections, router, transaction
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from .attendance import move_department_hours, update_rollups
+from .authentication import invalidate_cached_user
+from .conditional import bump_versions
+from .events import ADMIN_CHANNEL, publish_on_commit, user_channel
+from .hierarchy import extend_hierarchy, lock_for_move, move_subtree, would_create_cycle
+from .models import Attendance, ChangeLogEntry, CustomUser, Department, DepartmentStats, Employee, Request, Task
+from .search import SEARCH_TABLE, install_search_index
+
+
+# Creates an empty stats row so later employee deltas can be applied with a single UPDATE
+@receiver(post_save, sender=Department)
+def create_department_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        DepartmentStats.objects.get_or_create(department=instance)
+
+
+# Remembers the stored department, salary, user and manager so post_save can compute deltas,
+# and refuses a manager change that would put an employee under their own subtree, checked
+# once the rows involved are locked (Employee.save runs in a transaction)
+@receiver(pre_save, sender=Employee)
+def remember_employee_state(sender, instance, raw=False, **kwargs):
+    instance._stats_previous = None
+    instance._previous_user_id = None
+    instance._previous_manager_id = None
+    if instance.pk and not raw:
+        previous = Employee.objects.filter(pk=instance.pk).values_list('department_id', 'salary', 'user_id', 'manager_id').first()
+        if previous:
+            instance._stats_previous = previous[:2]
+            instance._previous_user_id = previous[2]
+            instance._previous_manager_id = previous[3]
+            if previous[3] != instance.manager_id:
+                lock_for_move(instance.pk, instance.manager_id)
+                if would_create_cycle(instance.pk, instance.manager_id):
+                    raise ValidationError({'manager': 'An employee cannot report to someone in their own reporting line.'})
+
+
+@receiver(post_save, sender=Employee)
+def update_department_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    salary = Decimal(instance.salary or 0)
+    previous = getattr(instance, '_stats_previous', None)
+    if previous is None:
+        DepartmentStats.apply_delta(instance.department_id, 1, salary)
+        return
+
+    old_department_id, old_salary = previous
+    old_salary = old_salary or Decimal(0)
+    if old_department_id == instance.department_id:
+        if old_salary != salary:
+            DepartmentStats.apply_delta(instance.department_id, 0, salary - old_salary)
+    else:
+        DepartmentStats.apply_delta(old_department_id, -1, -old_salary)
+        DepartmentStats.apply_delta(instance.department_id, 1, salary)
+
+
+@receiver(post_delete, sender=Employee)
+def update_department_stats_on_delete(sender, instance, **kwargs):
+    DepartmentStats.apply_delta(instance.department_id, -1, -Decimal(instance.salary or 0))
+
+
+# Attendance history counts under the employee's current department, so a move refiles it
+@receiver(post_save, sender=Employee)
+def move_attendance_rollups(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, '_stats_previous', None)
+    if not raw and previous is not None and previous[0] != instance.department_id:
+        move_department_hours(instance.pk, previous[0], instance.department_id)
+
+
+# Archived attendance is removed with the employee without signals, so its hours leave the
+# department rollup here; live rows go through update_rollups_on_delete
+@receiver(pre_delete, sender=Employee)
+def remove_archived_hours(sender, instance, **kwargs):
+    move_department_hours(instance.pk, instance.department_id, None, include_live=False)
+
+
+# Remembers the stored row so post_save can apply the difference to the rollups
+@receiver(pre_save, sender=Attendance)
+def remember_attendance_state(sender, instance, raw=False, **kwargs):
+    instance._rollup_previous = None
+    if instance.pk and not raw:
+        instance._rollup_previous = (
+            Attendance.objects.filter(pk=instance.pk).values_list('employee_id', 'date', 'clock_in', 'clock_out').first()
+        )
+
+
+def _department_id(employee_id):
+    return Employee.objects.filter(pk=employee_id).values_list('department_id', flat=True).first()
+
+
+# Keeps EmployeeMonthlyHours and DepartmentDailyHours in step with single-row attendance
+# writes, like DepartmentStats; mark_attendance_bulk applies its own deltas
+@receiver(post_save, sender=Attendance)
+def update_rollups_on_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    current = (instance.clock_in, instance.clock_out)
+    previous = getattr(instance, '_rollup_previous', None)
+    if previous is None and not instance.clock_in:
+        return
+    department_id = instance.employee.department_id
+    if previous and previous[:2] == (instance.employee_id, instance.date):
+        changes = [(instance.employee_id, department_id, instance.date, previous[2:], current)]
+    else:
+        changes = [(instance.employee_id, department_id, instance.date, (None, None), current)]
+        if previous:
+            changes.append((previous[0], _department_id(previous[0]), previous[1], previous[2:], (None, None)))
+    update_rollups(changes)
+
+
+# Rows deleted along with their employee only leave the department rollup; the same
+# cascade deletes the employee's monthly rows
+@receiver(post_delete, sender=Attendance)
+def update_rollups_on_delete(sender, instance, origin=None, **kwargs):
+    cascaded = isinstance(origin, Employee) or getattr(origin, 'model', None) is Employee
+    update_rollups([(
+        None if cascaded else instance.employee_id, _department_id(instance.employee_id),
+        instance.date, (instance.clock_in, instance.clock_out), (None, None),
+    )])
+
+
+# Cached authentication entries embed the employee profile, so both models invalidate them.
+# Eviction waits for the commit: evicting inside the transaction would let a concurrent
+# request cache the old row again before the new one is visible.
+def invalidate_on_commit(user_id):
+    if user_id is not None:
+        transaction.on_commit(lambda: invalidate_cached_user(user_id))
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def invalidate_user_cache(sender, instance, **kwargs):
+    invalidate_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_profile_cache(sender, instance, **kwargs):
+    invalidate_on_commit(instance.user_id)
+    previous_user_id = getattr(instance, '_previous_user_id', None)
+    if previous_user_id != instance.user_id:
+        invalidate_on_commit(previous_user_id)
+
+
+# Every committed write moves the model's version so conditional GETs revalidate
+def bump_table_version(sender, raw=False, **kwargs):
+    if not raw:
+        bump_versions(sender)
+
+
+for model in (Attendance, CustomUser, Department, Employee, Request, Task):
+    post_save.connect(bump_table_version, sender=model)
+    post_delete.connect(bump_table_version, sender=model)
+
+
+# Feeds the /api/sync/ change log, including tombstones for deletes. A task or request that
+# changes hands also gets a tombstone filed under its previous parties, written first so
+# anyone who can still see it ends on the update.
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Request)
+@receiver(post_save, sender=Attendance)
+def log_change(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    entry = ChangeLogEntry.for_instance(instance)
+    previous = getattr(instance, '_previous_parties', None)
+    if previous is None or previous == (entry.owner, entry.counterpart):
+        entry.save()
+    else:
+        ChangeLogEntry.objects.bulk_create([ChangeLogEntry.for_instance(instance, deleted=True, parties=previous), entry])
+    ChangeLogEntry.sequence_on_commit()
+
+
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Request)
+@receiver(post_delete, sender=Attendance)
+def log_deletion(sender, instance, **kwargs):
+    ChangeLogEntry.for_instance(instance, deleted=True).save()
+    ChangeLogEntry.sequence_on_commit()
+
+
+# Remembers the stored status and parties so post_save only publishes real transitions and
+# the change log can retract the row from its previous parties
+@receiver(pre_save, sender=Task)
+@receiver(pre_save, sender=Request)
+def remember_status(sender, instance, raw=False, **kwargs):
+    instance._previous_status = None
+    instance._previous_parties = None
+    if instance.pk and not raw:
+        previous = sender.objects.filter(pk=instance.pk).first()
+        if previous is not None:
+            instance._previous_status = previous.status
+            instance._previous_parties = ChangeLogEntry.parties(previous)
+
+
+# Pushes status transitions to the employees involved and to admins over /api/events/
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=Request)
+def publish_status_change(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_status', None)
+    if raw or (not created and previous == instance.status):
+        return
+    if sender is Task:
+        kind, owner_id, others = 'task', instance.assigned_to_id, [instance.assigned_by_id]
+    else:
+        kind, owner_id, others = 'request', instance.submitted_by_id, []
+    # The owner's manager is told too; one query covers every recipient
+    user_ids = set()
+    for employee_id, user_id, manager_user_id in Employee.objects.filter(
+        id__in=[pk for pk in (owner_id, *others) if pk]
+    ).values_list('id', 'user_id', 'manager__user_id'):
+        user_ids.add(user_id)
+        if employee_id == owner_id and manager_user_id:
+            user_ids.add(manager_user_id)
+    publish_on_commit(
+        [ADMIN_CHANNEL, *(user_channel(user_id) for user_id in sorted(user_ids))],
+        {
+            'type': f'{kind}.created' if created else f'{kind}.status',
+            'id': instance.pk,
+            'status': instance.status,
+            'previous_status': previous,
+        },
+    )
+
+
+# Keeps the EmployeeHierarchy closure table in step with Employee.manager
+@receiver(post_save, sender=Employee)
+def update_hierarchy(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        extend_hierarchy({instance.pk: instance.manager_id})
+    elif getattr(instance, '_previous_manager_id', None) != instance.manager_id:
+        move_subtree(instance.pk, instance.manager_id)
+
+
+# Team members are detached by a SET_NULL update that sends no signals, so the subtree is
+# cut loose from the departing employee's ancestors here
+@receiver(pre_delete, sender=Employee)
+def detach_hierarchy(sender, instance, **kwargs):
+    move_subtree(instance.pk, None)
+
+
+# SQLite drops a table's triggers when a migration rebuilds it, so the search index's
+# triggers are restored (and the index refilled) after every migrate that left them missing
+@receiver(post_migrate)
+def restore_search_index(sender, using, **kwargs):
+    connection = connections[using]
+    if sender.name != 'Backend' or not router.allow_migrate(using, sender.label):
+        return
+    if SEARCH_TABLE in connection.introspection.table_names():
+        install_search_index(connection)
@@ -0,0 +1,88 @@
+from django.db.models import Max, Min, Q
+
+from .models import Attendance, ChangeLogEntry, Employee, EmployeeHierarchy, Request, Task
+from .serializers import AttendanceSerializer, RequestSerializer, TaskSerializer
+
+
+# ChangeLogEntry.model -> (response key, model, serializer)
+SYNCED_MODELS = {
+    'task': ('tasks', Task, TaskSerializer),
+    'request': ('requests', Request, RequestSerializer),
+    'attendance': ('attendance', Attendance, AttendanceSerializer),
+}
+
+def is_admin(user):
+    return user.is_staff or getattr(user, 'role', None) == 'admin'
+
+
+# Changes `user` may see, by the rule visible_tasks uses: everything for admins; otherwise
+# rows owned anywhere in their subtree (their own included) and rows they are the
+# counterpart of (tasks they assigned)
+def visible_changes(user):
+    entries = ChangeLogEntry.objects.all()
+    if is_admin(user):
+        return entries
+    subtree = EmployeeHierarchy.objects.filter(ancestor__user_id=user.pk).values('descendant_id')
+    own = Employee.objects.filter(user_id=user.pk).values('id')
+    return entries.filter(Q(owner__in=subtree) | Q(counterpart__in=own))
+
+
+# Tasks `user` may see: everything for admins; otherwise tasks assigned anywhere in their
+# subtree (their own included) and tasks they assigned. Built from subqueries only, so no
+# query runs until the queryset is evaluated, which also lets async views use it.
+def visible_tasks(user, queryset=None):
+    queryset = Task.objects.all() if queryset is None else queryset
+    if is_admin(user):
+        return queryset
+    subtree = EmployeeHierarchy.objects.filter(ancestor__user_id=user.pk).values('descendant_id')
+    own = Employee.objects.filter(user_id=user.pk).values('id')
+    return queryset.filter(Q(assigned_to_id__in=subtree) | Q(assigned_by_id__in=own))
+
+
+# Cursors count feed positions, which ChangeLogEntry.assign_positions hands out after each
+# writing transaction commits, so reading the feed never writes
+def latest_cursor():
+    return ChangeLogEntry.objects.aggregate(cursor=Max('position'))['cursor'] or 0
+
+
+# The position just before the first entry written at or after `since`. Positions follow
+# commit order rather than time, so this may resend a few older changes but never skips one.
+def cursor_for_timestamp(since):
+    first = ChangeLogEntry.objects.filter(created_at__gte=since).aggregate(first=Min('position'))['first']
+    return first - 1 if first is not None else latest_cursor()
+
+
+# Returns the changes visible to `user` after `cursor`, collapsed to the latest
+# state per object: full rows for upserts and bare ids for tombstones
+def changes_since(user, cursor, limit):
+    oldest = ChangeLogEntry.objects.aggregate(oldest=Min('position'))['oldest']
+    if oldest is not None and cursor < oldest - 1:
+        return {'reset': True, 'cursor': latest_cursor()}
+
+    entries = list(
+        visible_changes(user)
+        .filter(position__gt=cursor)
+        .order_by('position')
+        .values_list('position', 'model', 'object_id', 'deleted')[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    latest = {}
+    for _, model, object_id, deleted in entries:
+        latest[(model, object_id)] = deleted
+
+    data = {'reset': False, 'cursor': entries[-1][0] if entries else cursor, 'has_more': has_more}
+    for name, (key, model, serializer_class) in SYNCED_MODELS.items():
+        upserts = [object_id for (model_name, object_id), deleted in latest.items() if model_name == name and not deleted]
+        rows = list(serializer_class.setup_eager_loading(model.objects.filter(id__in=upserts))) if upserts else []
+        found = {row.id for row in rows}
+        deleted = [
+            object_id for (model_name, object_id), is_deleted in latest.items()
+            if model_name == name and (is_deleted or object_id not in found)
+        ]
+        data[key] = {
+            'updated': serializer_class(rows, many=True).data,
+            'deleted': deleted,
+        }
+    return data
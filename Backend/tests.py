@@ -1,3 +1,1106 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from itertools import count
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import MagicMock, patch
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F, Sum
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.urls import path
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .async_views import _event_frames, department_employees_async, monthly_attendance_async, my_attendance_async, my_profile_async, task_list_async
+from .attendance import attendance_date
+from .authentication import user_cache_key
+from .events import ADMIN_CHANNEL, InProcessBroker, user_channel
+from .hierarchy import lock_for_move
+from .models import Attendance, AttendanceArchive, ChangeLogEntry, CustomUser, DeadlineDigest, Department, DepartmentDailyHours, DepartmentStats, Employee, EmployeeHierarchy, EmployeeMonthlyHours, Request, Task, TaskDeadlineNotice
+from .archive import apply_retention, live_since
+from .partitions import add_months, month_start
+from .replicas import ReplicaRouter, ReplicaStickinessMiddleware
+
+
+_sequence = count(1)
+
+
+def create_employee(department=None, manager=None, role='employee'):
+    n = next(_sequence)
+    user = CustomUser.objects.create_user(
+        username=f'user{n}', email=f'user{n}@example.com', password='password', role=role,
+    )
+    return Employee.objects.create(
+        user=user, employee_id=f'EMP{n:05d}', first_name=f'First{n}', last_name=f'Last{n}',
+        gender='O', date_of_birth=date(1990, 1, 1), address='1 Main Street',
+        hire_date=date(2020, 1, 1), position='Engineer', salary=Decimal('1000.00'),
+        department=department, manager=manager,
+    )
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class DepartmentStatsTests(APITestCase):
+    def setUp(self):
+        self.support = Department.objects.create(name='Support')
+        self.sales = Department.objects.create(name='Sales')
+
+    def stats(self):
+        rows = DepartmentStats.objects.values_list('department_id', 'employee_count', 'total_salary')
+        return {department_id: (count, salary) for department_id, count, salary in rows}
+
+    def test_deltas_follow_creates_moves_salary_changes_and_deletes(self):
+        employee = create_employee(self.support)
+        create_employee(self.support)
+        self.assertEqual(self.stats(), {self.support.id: (2, Decimal('2000.00')), self.sales.id: (0, Decimal('0.00'))})
+
+        employee.salary = Decimal('1500.00')
+        employee.save()
+        self.assertEqual(self.stats()[self.support.id], (2, Decimal('2500.00')))
+
+        employee.department = self.sales
+        employee.save()
+        self.assertEqual(self.stats(), {self.support.id: (1, Decimal('1000.00')), self.sales.id: (1, Decimal('1500.00'))})
+
+        employee.delete()
+        self.assertEqual(self.stats()[self.sales.id], (0, Decimal('0.00')))
+        incremental = self.stats()
+        DepartmentStats.objects.all().delete()
+        DepartmentStats.rebuild()
+        self.assertEqual(self.stats(), incremental)
+
+    def test_stats_listing_matches_the_aggregate(self):
+        for department, salary in ((self.support, '1200.50'), (self.support, '800.25'), (self.sales, '999.99')):
+            employee = create_employee(department)
+            employee.salary = Decimal(salary)
+            employee.save()
+        Department.objects.create(name='Empty')
+        self.client.force_authenticate(create_employee(self.sales).user)
+        aggregate = self.client.get('/api/departments/').json()
+        with self.settings(USE_DEPARTMENT_STATS=True):
+            stats = self.client.get('/api/departments/').json()
+        self.assertEqual(stats, aggregate)
+        self.assertEqual(
+            {row['name']: (row['employee_count'], row['total_salary']) for row in stats}['Support'], (2, 2000.75),
+        )
+
+
+# Fails when an endpoint's query count grows with the number of rows it returns
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class QueryBudgetTestCase(APITestCase):
+    def count_queries(self, url, user):
+        # A fresh instance per request so cached relations do not hide per-request lookups
+        self.client.force_authenticate(CustomUser.objects.get(pk=user.pk))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(queries)
+
+    def assertQueryBudget(self, url, user, grow, steps=(3, 10), max_queries=None):
+        counts = []
+        for rows in steps:
+            for _ in range(rows):
+                grow()
+            counts.append(self.count_queries(url, user))
+        self.assertEqual(len(set(counts)), 1, f'{url} issued {counts} queries as rows grew by {steps}')
+        if max_queries is not None:
+            self.assertLessEqual(counts[0], max_queries, f'{url} exceeded its budget of {max_queries} queries')
+
+
+class EndpointQueryBudgetTests(QueryBudgetTestCase):
+    def setUp(self):
+        self.department = Department.objects.create(name='Engineering')
+        self.admin = CustomUser.objects.create_superuser('admin', 'admin@example.com', 'admin', role='admin')
+        self.manager = create_employee(self.department, role='manager')
+        self.employee = create_employee(self.department, self.manager)
+
+    def test_departments(self):
+        self.assertQueryBudget(
+            '/api/departments/',
+            self.admin,
+            lambda: create_employee(Department.objects.create(name='Sales')),
+            max_queries=2,
+        )
+
+    def test_users(self):
+        self.assertQueryBudget('/api/users/', self.admin, create_employee, max_queries=2)
+
+    def test_employees(self):
+        self.assertQueryBudget(
+            '/api/employees/',
+            self.admin,
+            lambda: create_employee(Department.objects.create(name='Ops'), create_employee()),
+            max_queries=2,
+        )
+
+    def test_tasks(self):
+        self.assertQueryBudget(
+            '/api/tasks/',
+            self.manager.user,
+            lambda: Task.objects.create(title='Task', assigned_to=create_employee(manager=self.manager), assigned_by=create_employee()),
+            max_queries=2,
+        )
+
+    def test_manager_requests(self):
+        self.assertQueryBudget(
+            '/api/requests/manager/',
+            self.manager.user,
+            lambda: Request.objects.create(name='Laptop', description='New laptop', submitted_by=self.manager),
+            max_queries=3,
+        )
+
+    def test_admin_requests(self):
+        self.assertQueryBudget(
+            '/api/requests/admin/',
+            self.admin,
+            lambda: Request.objects.create(name='Laptop', description='New laptop', submitted_by=create_employee()),
+            max_queries=2,
+        )
+
+    def test_department_employees(self):
+        self.assertQueryBudget(
+            f'/api/departments/{self.department.id}/employees/',
+            self.manager.user,
+            lambda: create_employee(self.department),
+            max_queries=2,
+        )
+
+    def test_my_attendance(self):
+        days = count(1)
+        self.assertQueryBudget(
+            '/api/my-attendance/',
+            self.employee.user,
+            lambda: Attendance.objects.create(
+                employee=self.employee, date=date.today() - timedelta(days=next(days)), clock_in=timezone.now(),
+            ),
+            max_queries=3,
+        )
+
+    def test_monthly_attendance(self):
+        days = count(1)
+        self.assertQueryBudget(
+            f'/api/attendance/{self.employee.id}/monthly/',
+            self.manager.user,
+            lambda: Attendance.objects.create(
+                employee=self.employee, date=date.today() - timedelta(days=next(days)), clock_in=timezone.now(),
+            ),
+            max_queries=3,
+        )
+
+    def test_attendance_matrix(self):
+        def grow():
+            member = create_employee(self.department, self.manager)
+            Attendance.objects.create(employee=member, date=date.today(), clock_in=timezone.now())
+
+        self.assertQueryBudget(f'/api/attendance/matrix/?department={self.department.id}', self.manager.user, grow, max_queries=3)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.manager = create_employee(role='manager')
+        self.client.force_authenticate(self.manager.user)
+        for n in range(5):
+            Task.objects.create(title=f'Task {n}', assigned_to=self.manager, assigned_by=self.manager)
+
+    def test_unpaginated_by_default(self):
+        response = self.client.get('/api/tasks/')
+        self.assertEqual(len(response.data), 5)
+
+    def test_cursor_walks_every_row_once(self):
+        seen = []
+        url = '/api/tasks/?page_size=2'
+        while url:
+            response = self.client.get(url)
+            seen.extend(task['id'] for task in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, sorted(Task.objects.values_list('id', flat=True), reverse=True))
+
+    def test_ties_on_the_leading_key_resume_by_id_without_offsets(self):
+        # None of the tasks has a deadline, so every row shares the leading key
+        pages, url = [], '/api/tasks/?ordering=deadline&page_size=2'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertFalse(any('OFFSET' in query['sql'] for query in queries.captured_queries))
+            pages.append([task['id'] for task in response.data['results']])
+            url = response.data['next']
+        self.assertEqual(sum(pages, []), sorted(Task.objects.values_list('id', flat=True)))
+        previous = self.client.get(response.data['previous'])
+        self.assertEqual([task['id'] for task in previous.data['results']], pages[-2])
+        self.assertEqual(self.client.get('/api/tasks/?cursor=cD1nYXJiYWdl').status_code, 404)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class BulkAttendanceTests(APITestCase):
+    def setUp(self):
+        self.manager = create_employee(role='manager')
+        self.team = [create_employee(manager=self.manager) for _ in range(20)]
+        self.client.force_authenticate(self.manager.user)
+
+    def post(self, entries):
+        return self.client.post('/api/attendance/mark/bulk/', {'entries': entries}, format='json')
+
+    def test_per_entry_results(self):
+        Attendance.objects.create(employee=self.team[0], date=timezone.now().date(), clock_in=timezone.now())
+        response = self.post([
+            {'employee_id': self.team[0].id, 'action': 'clock_out'},
+            {'employee_id': self.team[1].id, 'action': 'clock_in'},
+            {'employee_id': 0, 'action': 'clock_in'},
+            {'employee_id': self.team[2].id, 'action': 'lunch'},
+        ])
+        statuses = [result['status'] for result in response.data['results']]
+        self.assertEqual(statuses, ['ok', 'ok', 'error', 'error'])
+        first = Attendance.objects.get(employee=self.team[0])
+        self.assertIsNotNone(first.clock_in)
+        self.assertIsNotNone(first.clock_out)
+        self.assertEqual(response.data['results'][1]['attendance']['id'], Attendance.objects.get(employee=self.team[1]).id)
+        self.assertEqual(Attendance.objects.count(), 2)
+
+    def test_future_and_archived_timestamps_are_rejected(self):
+        now = timezone.now()
+        response = self.post([
+            {'employee_id': self.team[0].id, 'action': 'clock_in', 'timestamp': (now + timedelta(days=400)).isoformat()},
+            {'employee_id': self.team[1].id, 'action': 'clock_in', 'timestamp': '2001-01-01T09:00:00Z'},
+            {'employee_id': self.team[2].id, 'action': 'clock_in', 'timestamp': (now - timedelta(hours=1)).isoformat()},
+        ])
+        results = response.data['results']
+        self.assertEqual([result['status'] for result in results], ['error', 'error', 'ok'])
+        self.assertIn('timestamp', results[0]['errors'])
+        self.assertIn('timestamp', results[1]['errors'])
+        self.assertEqual(list(Attendance.objects.values_list('employee_id', flat=True)), [self.team[2].id])
+
+    def test_remarking_the_same_day_updates_the_existing_row(self):
+        employee = self.team[0]
+        first = self.client.post('/api/attendance/mark/', {'employee_id': employee.id, 'action': 'clock_in'}, format='json')
+        second = self.client.post('/api/attendance/mark/', {'employee_id': employee.id, 'action': 'clock_out'}, format='json')
+        self.assertEqual(second.data['id'], first.data['id'])
+        results = self.post([{'employee_id': employee.id, 'action': 'clock_out'}]).data['results']
+        self.assertEqual(results[0]['attendance']['id'], first.data['id'])
+
+        row = Attendance.objects.get(employee=employee)
+        self.assertLess(row.clock_in, row.clock_out)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Attendance.objects.create(employee=employee, date=row.date)
+
+    def test_query_count_independent_of_batch_size(self):
+        counts = []
+        for team in (self.team[:5], self.team[5:]):
+            with CaptureQueriesContext(connection) as queries:
+                self.post([{'employee_id': employee.id, 'action': 'clock_in'} for employee in team])
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AttendanceRollupTests(APITestCase):
+    def setUp(self):
+        self.department = Department.objects.create(name='Support')
+        self.manager = create_employee(self.department, role='manager')
+        self.team = [create_employee(self.department, self.manager) for _ in range(3)]
+        self.client.force_authenticate(self.manager.user)
+
+    def snapshot(self):
+        return (
+            sorted(EmployeeMonthlyHours.objects.values_list('employee_id', 'month', 'seconds_worked', 'days_present')),
+            sorted(DepartmentDailyHours.objects.values_list('department_id', 'date', 'seconds_worked', 'employees_present')),
+        )
+
+    def test_incremental_rollups_match_rebuild(self):
+        start = timezone.now() - timedelta(hours=9)
+        self.client.post('/api/attendance/mark/', {'employee_id': self.team[0].id, 'action': 'clock_in'}, format='json')
+        self.client.post('/api/attendance/mark/', {'employee_id': self.team[0].id, 'action': 'clock_out'}, format='json')
+        self.client.post('/api/attendance/mark/bulk/', {'entries': [
+            {'employee_id': employee.id, 'action': action, 'timestamp': (start + timedelta(hours=hours)).isoformat()}
+            for employee in self.team[1:]
+            for action, hours in (('clock_in', 0), ('clock_out', 8))
+        ]}, format='json')
+
+        incremental = self.snapshot()
+        call_command('rebuild_attendance_rollups', stdout=StringIO())
+        self.assertEqual(incremental, self.snapshot())
+        self.assertEqual(sum(DepartmentDailyHours.objects.values_list('employees_present', flat=True)), 3)
+
+        # A department move refiles history; deleted rows and employees leave the rollups
+        moved = self.team[1]
+        moved.department = Department.objects.create(name='Sales')
+        moved.save()
+        Attendance.objects.filter(employee=self.team[2]).delete()
+        self.team[0].delete()
+        incremental = self.snapshot()
+        self.assertEqual(
+            [row[:2] for row in incremental[1]], [(moved.department_id, attendance_date(start))],
+        )
+        call_command('rebuild_attendance_rollups', stdout=StringIO())
+        self.assertEqual(incremental, self.snapshot())
+
+        response = self.client.get(f"/api/reports/hours/monthly/?month={start:%Y-%m}")
+        hours = {row['employee_id']: row['hours_worked'] for row in response.data['employees']}
+        self.assertEqual(hours[self.team[1].id], 8.0)
+
+    def test_reports_reject_bad_parameters(self):
+        for url in (
+            '/api/reports/hours/monthly/?department=abc',
+            '/api/reports/hours/departments/?start=2020-01-01&end=2024-01-01',
+            '/api/reports/hours/departments/?start=2024-02-01&end=2024-01-01',
+        ):
+            self.assertEqual(self.client.get(url).status_code, 400, url)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'], AUTH_USER_CACHE='default')
+class CachedAuthenticationTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.employee = create_employee()
+        token = RefreshToken.for_user(self.employee.user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_user_and_profile_served_from_cache(self):
+        self.assertEqual(self.count_queries('/api/my-attendance/'), 3)
+        self.assertEqual(self.count_queries('/api/my-attendance/'), 2)
+
+    def test_deactivation_invalidates_cache(self):
+        self.count_queries('/api/my-attendance/')
+        key = user_cache_key(self.employee.user_id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.employee.user.is_active = False
+            self.employee.user.save()
+            # Still cached until the deactivation commits
+            self.assertIsNotNone(cache.get(key))
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(self.client.get('/api/my-attendance/').status_code, 401)
+
+    @override_settings(AUTH_USER_CACHE=None)
+    def test_no_caching_without_a_shared_cache(self):
+        self.assertEqual(self.count_queries('/api/my-attendance/'), 3)
+        self.assertEqual(self.count_queries('/api/my-attendance/'), 3)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.manager = create_employee(role='manager')
+        self.client.force_authenticate(self.manager.user)
+
+    def test_unchanged_list_returns_304_until_a_write(self):
+        Task.objects.create(title='Task', assigned_to=self.manager, assigned_by=self.manager)
+        first = self.client.get('/api/tasks/')
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(len(queries), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(title='Another', assigned_to=self.manager, assigned_by=self.manager)
+        changed = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], first['ETag'])
+
+    def test_function_view_validators(self):
+        first = self.client.get('/api/my-profile/')
+        self.assertEqual(self.client.get('/api/my-profile/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class DeltaSyncTests(APITestCase):
+    def setUp(self):
+        self.manager = create_employee(role='manager')
+        self.employee = create_employee(manager=self.manager)
+        self.outsider = create_employee()
+
+    def sync(self, user, cursor):
+        self.client.force_authenticate(user)
+        return self.client.get(f'/api/sync/?cursor={cursor}').data
+
+    def test_changes_and_tombstones_since_cursor(self):
+        self.client.force_authenticate(self.employee.user)
+        cursor = self.client.get('/api/sync/').data['cursor']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            kept = Task.objects.create(title='Kept', assigned_to=self.employee, assigned_by=self.manager)
+            removed = Task.objects.create(title='Removed', assigned_to=self.employee, assigned_by=self.manager)
+            removed_id = removed.id
+            removed.delete()
+            Task.objects.create(title='Hidden', assigned_to=self.outsider, assigned_by=self.outsider)
+
+        data = self.sync(self.employee.user, cursor)
+        self.assertEqual([task['id'] for task in data['tasks']['updated']], [kept.id])
+        self.assertEqual(data['tasks']['deleted'], [removed_id])
+        self.assertEqual(self.sync(self.manager.user, cursor)['tasks']['deleted'], [removed_id])
+        self.assertEqual(self.sync(self.employee.user, data['cursor'])['tasks']['updated'], [])
+
+    def test_a_late_commit_is_not_skipped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            late = Task.objects.create(title='Late', assigned_to=self.employee, assigned_by=self.manager)
+        entry = ChangeLogEntry.objects.get(model='task', object_id=late.id)
+        # The entry took its id first but has not committed yet when the client syncs
+        entry.delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            early = Task.objects.create(title='Early', assigned_to=self.employee, assigned_by=self.manager)
+        data = self.sync(self.employee.user, 0)
+        self.assertEqual([task['id'] for task in data['tasks']['updated']], [early.id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ChangeLogEntry.objects.create(id=entry.id, model='task', object_id=late.id, owner=self.employee.id, counterpart=self.manager.id)
+            ChangeLogEntry.sequence_on_commit()
+        data = self.sync(self.employee.user, data['cursor'])
+        self.assertEqual([task['id'] for task in data['tasks']['updated']], [late.id])
+
+    def test_positions_are_assigned_on_commit_not_on_read(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            task = Task.objects.create(title='Pending', assigned_to=self.employee, assigned_by=self.manager)
+        self.assertEqual(self.sync(self.employee.user, 0)['tasks']['updated'], [])
+        self.assertIsNone(ChangeLogEntry.objects.get(model='task', object_id=task.id).position)
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual([row['id'] for row in self.sync(self.employee.user, 0)['tasks']['updated']], [task.id])
+        with self.assertNumQueries(1):
+            ChangeLogEntry.assign_positions()
+
+    def test_changes_follow_the_task_visibility_subtree(self):
+        director = create_employee(role='manager')
+        self.manager.manager = director
+        self.manager.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.create(title='Deep', assigned_to=self.employee, assigned_by=self.employee)
+        for user in (director.user, self.manager.user, self.employee.user):
+            self.assertEqual([row['id'] for row in self.sync(user, 0)['tasks']['updated']], [task.id])
+        self.assertEqual(self.sync(self.outsider.user, 0)['tasks']['updated'], [])
+
+    def test_reassignment_retracts_the_task_from_the_previous_assignee(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.create(title='Moved', assigned_to=self.employee, assigned_by=self.manager)
+        cursor = self.sync(self.employee.user, 0)['cursor']
+        with self.captureOnCommitCallbacks(execute=True):
+            task.assigned_to = self.outsider
+            task.save()
+
+        self.assertEqual(self.sync(self.employee.user, cursor)['tasks']['deleted'], [task.id])
+        self.assertEqual([row['id'] for row in self.sync(self.outsider.user, cursor)['tasks']['updated']], [task.id])
+        manager_view = self.sync(self.manager.user, cursor)['tasks']
+        self.assertEqual(([row['id'] for row in manager_view['updated']], manager_view['deleted']), ([task.id], []))
+
+
+# The URLconf ASYNC_VIEWS=True installs, used as ROOT_URLCONF by AsyncViewParityTests
+urlpatterns = [
+    path('api/tasks/', task_list_async),
+    path('api/my-profile/', my_profile_async),
+    path('api/departments/<int:department_id>/employees/', department_employees_async),
+    path('api/attendance/<int:employee_id>/monthly/', monthly_attendance_async),
+    path('api/my-attendance/', my_attendance_async),
+]
+
+
+# Each async view must answer exactly like the sync view it stands in for
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AsyncViewParityTests(APITestCase):
+    def setUp(self):
+        department = Department.objects.create(name='Field')
+        self.manager = create_employee(department, role='manager')
+        self.employee = create_employee(department, self.manager)
+        Task.objects.create(title='Visit', assigned_to=self.employee, assigned_by=self.manager)
+        Attendance.objects.create(employee=self.employee, date=timezone.now().date(), clock_in=timezone.now())
+        self.paths = [
+            '/api/tasks/', '/api/my-profile/', '/api/my-attendance/',
+            f'/api/departments/{department.id}/employees/', f'/api/attendance/{self.employee.id}/monthly/',
+        ]
+        self.authorization = f'Bearer {RefreshToken.for_user(self.employee.user).access_token}'
+
+    async def test_async_views_match_sync_views(self):
+        for url in self.paths:
+            with self.subTest(url=url):
+                sync = await sync_to_async(self.client.get)(url, HTTP_AUTHORIZATION=self.authorization)
+                with self.settings(ROOT_URLCONF=__name__):
+                    native = await self.async_client.get(url, headers={'Authorization': self.authorization})
+                    cached = await self.async_client.get(url, headers={'Authorization': self.authorization, 'If-None-Match': sync['ETag']})
+                    anonymous = await self.async_client.get(url)
+                self.assertEqual((native.status_code, native['ETag']), (200, sync['ETag']))
+                self.assertEqual(json.loads(native.content), json.loads(sync.content))
+                self.assertEqual(cached.status_code, 304)
+                self.assertEqual(anonymous.status_code, 401)
+                self.assertEqual((await sync_to_async(self.client.get)(url)).status_code, 401)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class StatusEventTests(APITestCase):
+    def test_status_change_reaches_employee_manager_and_admins(self):
+        manager = create_employee(role='manager')
+        employee = create_employee(manager=manager)
+        task = Task.objects.create(title='Report', assigned_to=employee, assigned_by=manager)
+        broker = MagicMock()
+        with patch('Backend.events.get_broker', return_value=broker):
+            with self.captureOnCommitCallbacks(execute=True):
+                task.save()
+            self.assertFalse(broker.publish.called)
+            with self.captureOnCommitCallbacks(execute=True):
+                task.status = 'submitted'
+                task.save()
+
+        channels, event = broker.publish.call_args.args
+        self.assertEqual(set(channels), {ADMIN_CHANNEL, user_channel(employee.user_id), user_channel(manager.user_id)})
+        self.assertEqual(event, {'type': 'task.status', 'id': task.id, 'status': 'submitted', 'previous_status': 'in_progress'})
+
+    def test_broker_delivers_only_to_subscribed_channels(self):
+        async def scenario():
+            broker = InProcessBroker()
+            mine, other = broker.subscribe(['user:1']), broker.subscribe(['user:2'])
+            broker.publish(['user:1', ADMIN_CHANNEL], {'type': 'task.status'})
+            event = await asyncio.wait_for(mine.queue.get(), 1)
+            mine.close()
+            other.close()
+            return event, other.queue.empty(), broker.subscriber_count()
+
+        self.assertEqual(asyncio.run(scenario()), ({'type': 'task.status'}, True, 0))
+
+    def test_cancelled_stream_unsubscribes(self):
+        async def scenario():
+            broker = InProcessBroker()
+            frames = _event_frames(broker.subscribe(['user:1']))
+            await frames.__anext__()
+            # What Django's ASGI handler does to the response iterator on a disconnect
+            waiting = asyncio.ensure_future(frames.__anext__())
+            await asyncio.sleep(0)
+            waiting.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+            return broker.subscriber_count()
+
+        self.assertEqual(asyncio.run(scenario()), 0)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class SparseFieldsetTests(APITestCase):
+    def setUp(self):
+        self.department = Department.objects.create(name='Engineering')
+        self.manager = create_employee(department=self.department, role='manager')
+        create_employee(department=self.department, manager=self.manager)
+        self.client.force_authenticate(self.manager.user)
+
+    def test_fields_trim_response_and_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/employees/?fields=id,first_name,department_name')
+        self.assertEqual(set(response.data[0]), {'id', 'first_name', 'department_name'})
+        self.assertEqual(response.data[0]['department_name'], 'Engineering')
+        sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('"address"', sql)
+        self.assertNotIn('"Backend_customuser"', sql)
+
+        response = self.client.get('/api/employees/?exclude=address,manager_email&page_size=1')
+        self.assertNotIn('address', response.data['results'][0])
+        self.assertIn('salary', response.data['results'][0])
+        self.assertIsNotNone(response.data['next'])
+
+    def test_unknown_field_is_rejected(self):
+        self.assertEqual(self.client.get('/api/tasks/?fields=bogus').status_code, 400)
+        self.assertEqual(set(self.client.get('/api/departments/?fields=name,employee_count').data[0]), {'name', 'employee_count'})
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ExportTests(APITestCase):
+    def setUp(self):
+        self.admin = create_employee(role='admin')
+        self.admin.user.is_staff = True
+        self.admin.user.save()
+        self.employee = create_employee()
+        for day in (1, 2, 3):
+            Attendance.objects.create(employee=self.employee, date=date(2024, 1, day))
+
+    def test_streams_csv_and_ndjson(self):
+        self.client.force_authenticate(self.admin.user)
+        response = self.client.get('/api/export/attendance/?output=ndjson&start=2024-01-02')
+        self.assertTrue(response.streaming)
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['date'] for row in rows], ['2024-01-02', '2024-01-03'])
+
+        response = self.client.get('/api/export/employees/')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'employee_id', 'first_name'])
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(self.client.get('/api/export/attendance/?start=yesterday').status_code, 400)
+
+        self.client.force_authenticate(self.employee.user)
+        self.assertEqual(self.client.get('/api/export/employees/').status_code, 403)
+
+    def test_command_matches_endpoint(self):
+        out = StringIO()
+        call_command('export_data', 'attendance', '--end', '2024-01-01', '--chunk-size', '1', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class EmployeeImportTests(APITestCase):
+    def setUp(self):
+        self.admin = create_employee(role='admin')
+        self.admin.user.is_staff = True
+        self.admin.user.save()
+        self.department = Department.objects.create(name='Sales')
+        self.client.force_authenticate(self.admin.user)
+
+    def row(self, n, **overrides):
+        return {
+            'username': f'new{n}', 'email': f'new{n}@example.com', 'password': 'secret123',
+            'first_name': 'New', 'last_name': f'Hire{n}', 'employee_id': f'NEW{n}', 'gender': 'F',
+            'date_of_birth': '1992-05-01', 'address': '2 High Street', 'hire_date': '2024-02-01',
+            'position': 'Rep', 'salary': '500.00', 'department': 'Sales', **overrides,
+        }
+
+    def test_import_links_in_file_managers_and_updates_stats(self):
+        rows = [self.row(1, role='manager'), self.row(2, manager='NEW1'), self.row(3, manager=self.admin.employee_id)]
+        response = self.client.post('/api/employees/import/', {'employees': rows}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['created'], 3)
+
+        hire = Employee.objects.select_related('manager', 'user').get(employee_id='NEW2')
+        self.assertEqual(hire.manager.employee_id, 'NEW1')
+        self.assertTrue(hire.user.check_password('secret123'))
+        self.assertEqual(Employee.objects.get(employee_id='NEW3').manager_id, self.admin.id)
+        self.assertEqual(DepartmentStats.objects.get(department=self.department).employee_count, 3)
+
+    def test_errors_are_reported_per_row_and_nothing_is_written(self):
+        rows = [self.row(1), self.row(2, employee_id='NEW1'), self.row(3, department='Nowhere', salary='x')]
+        response = self.client.post('/api/employees/import/', rows, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['row'] for error in response.data['errors']], [2, 3])
+        self.assertIn('salary', response.data['errors'][1]['errors'])
+        self.assertFalse(Employee.objects.filter(employee_id='NEW1').exists())
+
+    def test_command_hashes_in_worker_processes(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / 'hires.csv'
+        with open(path, 'w', newline='') as handle:
+            writer = csv.DictWriter(handle, fieldnames=list(self.row(0)))
+            writer.writeheader()
+            writer.writerows([self.row(1), self.row(2)])
+        with patch('Backend.onboarding.PARALLEL_HASHING_THRESHOLD', 0):
+            call_command('import_employees', str(path), '--workers', '2', stdout=StringIO())
+        self.assertTrue(CustomUser.objects.get(username='new2').check_password('secret123'))
+
+
+class GenerateDatasetTests(APITestCase):
+    def test_seeded_organization_is_consistent(self):
+        call_command(
+            'generate_dataset', '--employees', '40', '--departments', '2', '--span', '3', '--years', '0.1',
+            '--end-date', '2024-03-01', '--seed', '7', stdout=StringIO(),
+        )
+        self.assertEqual(Employee.objects.count(), 40)
+        self.assertTrue(Employee.objects.filter(manager__manager__isnull=False).exists())
+        self.assertEqual(
+            sorted(DepartmentStats.objects.values_list('employee_count', flat=True)), [20, 20],
+        )
+        self.assertEqual(
+            EmployeeMonthlyHours.objects.aggregate(days=Sum('days_present'))['days'], Attendance.objects.count(),
+        )
+        self.assertFalse(Task.objects.exclude(assigned_by=F('assigned_to__manager')).exists())
+
+
+class EndpointBenchmarkTests(APITestCase):
+    def test_baseline_then_regression(self):
+        call_command('generate_dataset', '--employees', '12', '--years', '0.05', stdout=StringIO())
+        CustomUser.objects.filter(employee_profile__manager__isnull=True).update(is_staff=True)
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        baseline = Path(directory.name) / 'baseline.json'
+        call_command('benchmark_endpoints', '--use-current-database', '--repeat', '1', '--baseline', str(baseline), stdout=StringIO())
+        results = json.loads(baseline.read_text())['current']
+        self.assertIn('/api/employees/<pk>/', results)
+        self.assertEqual(results['/api/employees/'].get('status'), 200)
+
+        results['/api/employees/']['queries'] = 0
+        baseline.write_text(json.dumps({'current': results}))
+        with self.assertRaises(CommandError):
+            call_command(
+                'benchmark_endpoints', '--use-current-database', '--repeat', '1', '--baseline', str(baseline),
+                stdout=StringIO(), stderr=StringIO(),
+            )
+
+    def test_current_database_needs_an_existing_staff_user(self):
+        call_command('generate_dataset', '--employees', '5', '--departments', '1', '--years', '0.05', stdout=StringIO())
+        username = Employee.objects.filter(manager__isnull=True).first().user.username
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        baseline = Path(directory.name) / 'baseline.json'
+        for extra in ([], ['--username', username]):
+            with self.assertRaises(CommandError):
+                call_command(
+                    'benchmark_endpoints', '--use-current-database', '--repeat', '1', '--baseline', str(baseline),
+                    *extra, stdout=StringIO(),
+                )
+        self.assertFalse(CustomUser.objects.filter(is_staff=True).exists())
+        self.assertFalse(baseline.exists())
+
+
+class AttendanceIndexBenchmarkTests(APITestCase):
+    def test_current_database_is_read_not_seeded(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        output = Path(directory.name) / 'runs.json'
+        with self.assertRaises(CommandError):
+            call_command('benchmark_attendance_indexes', '--use-current-database', '--output', str(output), stdout=StringIO())
+        self.assertFalse(Employee.objects.exists())
+
+        call_command('generate_dataset', '--employees', '5', '--departments', '1', '--years', '0.05', stdout=StringIO())
+        rows = Attendance.objects.count()
+        call_command(
+            'benchmark_attendance_indexes', '--use-current-database', '--repeat', '2', '--label', 'after',
+            '--output', str(output), stdout=StringIO(),
+        )
+        run = json.loads(output.read_text())['after']
+        self.assertEqual(run['attendance_rows'], rows)
+        self.assertIn('my_attendance', run['cases'])
+        self.assertEqual(Employee.objects.count(), 5)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class RequestMetricsTests(APITestCase):
+    def setUp(self):
+        self.employee = create_employee()
+        self.client.force_authenticate(self.employee.user)
+
+    def test_server_timing_and_log_line(self):
+        with self.assertLogs('Backend.metrics', 'INFO') as logs:
+            response = self.client.get('/api/employees/')
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="2 queries"')
+        self.assertIn('serialize;dur=', timing)
+        self.assertIn('render;dur=', timing)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual((record['view'], record['db_queries'], record['bytes']), ('employee-list', 2, len(response.content)))
+
+    @override_settings(METRICS_SLOW_QUERY_MS=0, METRICS_PROFILE_SAMPLE_RATE=1, METRICS_PROFILE_MIN_MS=0)
+    def test_slow_queries_and_sampled_profiles_are_logged(self):
+        with self.assertLogs('Backend.metrics', 'WARNING') as logs:
+            self.client.get('/api/my-profile/')
+        messages = [record.getMessage() for record in logs.records]
+        self.assertTrue(any(message.startswith('slow query') for message in messages))
+        self.assertTrue(any(message.startswith('profile for GET /api/my-profile/') for message in messages))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class EmployeeHierarchyTests(APITestCase):
+    def setUp(self):
+        self.admin = create_employee(role='admin')
+        self.admin.user.is_staff = True
+        self.admin.user.save()
+        self.ceo = create_employee(role='manager')
+        self.head = create_employee(manager=self.ceo, role='manager')
+        self.lead = create_employee(manager=self.head, role='manager')
+        self.engineer = create_employee(manager=self.lead)
+        self.client.force_authenticate(self.admin.user)
+
+    def links(self):
+        return set(EmployeeHierarchy.objects.filter(depth__gt=0).values_list('ancestor_id', 'descendant_id', 'depth'))
+
+    def test_closure_follows_moves_and_deletes(self):
+        ceo, head, lead, engineer = (e.id for e in (self.ceo, self.head, self.lead, self.engineer))
+        self.assertEqual(self.links(), {
+            (ceo, head, 1), (ceo, lead, 2), (ceo, engineer, 3), (head, lead, 1), (head, engineer, 2), (lead, engineer, 1),
+        })
+
+        self.lead.manager = self.ceo
+        self.lead.save()
+        self.assertEqual(self.links(), {(ceo, head, 1), (ceo, lead, 1), (ceo, engineer, 2), (lead, engineer, 1)})
+
+        self.lead.delete()
+        self.assertEqual(self.links(), {(ceo, head, 1)})
+        self.assertEqual(EmployeeHierarchy.objects.filter(descendant_id=engineer).count(), 1)
+
+    def test_cycles_are_rejected(self):
+        response = self.client.patch(f'/api/employees/{self.ceo.id}/', {'manager': self.engineer.id}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('manager', response.data)
+        self.ceo.manager = self.ceo
+        with self.assertRaises(ValidationError):
+            self.ceo.save()
+
+    def test_manager_change_locks_rows_before_the_cycle_check(self):
+        locked = []
+        with patch('Backend.signals.lock_for_move', side_effect=lambda *ids: locked.append((ids, connection.in_atomic_block))):
+            with patch('Backend.signals.would_create_cycle', side_effect=lambda *ids: self.assertTrue(locked)) as check:
+                self.engineer.manager = self.head
+                self.engineer.save()
+        self.assertEqual(locked, [((self.engineer.id, self.head.id), True)])
+        self.assertTrue(check.called)
+        self.assertEqual(lock_for_move(self.engineer.id, self.head.id), sorted([self.ceo.id, self.head.id, self.engineer.id]))
+
+    def test_subtree_chain_and_stats_endpoints(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/employees/{self.ceo.id}/subtree/')
+        self.assertEqual([(row['id'], row['depth']) for row in response.data], [
+            (self.head.id, 1), (self.lead.id, 2), (self.engineer.id, 3),
+        ])
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(len(self.client.get(f'/api/employees/{self.ceo.id}/subtree/?max_depth=2').data), 2)
+
+        chain = self.client.get(f'/api/employees/{self.engineer.id}/chain/').data
+        self.assertEqual([row['id'] for row in chain], [self.lead.id, self.head.id, self.ceo.id])
+
+        stats = self.client.get(f'/api/employees/{self.head.id}/subtree/stats/').data
+        self.assertEqual((stats['headcount'], stats['direct_reports'], stats['total_salary'], stats['depth']), (2, 1, Decimal('2000.00'), 2))
+        self.assertEqual(self.client.get('/api/employees/99999/chain/').status_code, 404)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class OrgChartTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.ceo = create_employee(role='manager')
+        self.head = create_employee(manager=self.ceo, role='manager')
+        self.engineer = create_employee(manager=self.head)
+        self.client.force_authenticate(self.ceo.user)
+
+    def test_chart_is_built_once_and_invalidated_by_hierarchy_changes(self):
+        with CaptureQueriesContext(connection) as queries:
+            chart = self.client.get('/api/org-chart/').json()
+        self.assertEqual(len(queries), 3)
+        self.assertEqual([node['id'] for node in chart], [self.ceo.id])
+        self.assertEqual(chart[0]['reports'][0]['reports'][0]['id'], self.engineer.id)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/org-chart/')
+        self.assertEqual(len(queries), 2)
+
+        shallow = self.client.get(f'/api/org-chart/?root={self.head.id}&depth=0').json()
+        self.assertEqual((shallow[0]['report_count'], shallow[0]['reports']), (1, []))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.engineer.manager = self.ceo
+            self.engineer.save()
+        chart = self.client.get('/api/org-chart/').json()
+        self.assertEqual(sorted(node['id'] for node in chart[0]['reports']), [self.head.id, self.engineer.id])
+        self.assertEqual(self.client.get('/api/org-chart/?root=99999').status_code, 404)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class EmployeeSearchTests(APITestCase):
+    def setUp(self):
+        self.department = Department.objects.create(name='Logistics')
+        self.johnathan = create_employee(department=self.department)
+        Employee.objects.filter(pk=self.johnathan.pk).update(first_name='Johnathan', last_name='Okafor')
+        self.other = create_employee()
+        Employee.objects.filter(pk=self.other.pk).update(first_name='Honda', last_name='Berg', position='Driver')
+        self.client.force_authenticate(self.other.user)
+
+    def search(self, query):
+        response = self.client.get('/api/employees/search/', {'q': query})
+        self.assertEqual(response.status_code, 200, response.content)
+        return [item['id'] for item in response.json()]
+
+    def test_prefix_typo_and_related_fields_match(self):
+        self.assertEqual(self.search('john')[0], self.johnathan.id)
+        self.assertEqual(self.search('jonhathan')[0], self.johnathan.id)
+        self.assertEqual(self.search('okafr johnatan'), [self.johnathan.id])
+        self.assertEqual(self.search('driv'), [self.other.id])
+        self.assertEqual(self.search(self.johnathan.employee_id.lower())[0], self.johnathan.id)
+        self.assertEqual(self.search('lo'), [self.johnathan.id])
+        self.assertEqual(self.client.get('/api/employees/search/').status_code, 400)
+
+    def test_index_follows_renames_email_changes_and_deletes(self):
+        self.department.name = 'Warehouse'
+        self.department.save()
+        self.assertEqual(self.search('warehose'), [self.johnathan.id])
+        user = self.other.user
+        user.email = 'quartermaster@example.com'
+        user.save()
+        self.assertEqual(self.search('quartermaster'), [self.other.id])
+        self.johnathan.delete()
+        self.assertEqual(self.search('johnathan'), [])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class TaskScopeTests(APITestCase):
+    def setUp(self):
+        self.manager = create_employee(role='manager')
+        self.lead = create_employee(manager=self.manager, role='manager')
+        self.member = create_employee(manager=self.lead)
+        self.outsider = create_employee()
+        today = timezone.now().date()
+        self.overdue = Task.objects.create(title='Overdue', assigned_to=self.member, assigned_by=self.lead, deadline=today - timedelta(days=1))
+        self.done = Task.objects.create(title='Done', assigned_to=self.member, assigned_by=self.lead, status='completed', deadline=today - timedelta(days=3))
+        self.undated = Task.objects.create(title='Undated', assigned_to=self.lead, assigned_by=self.manager)
+        self.delegated = Task.objects.create(title='Delegated', assigned_to=self.outsider, assigned_by=self.lead, deadline=today + timedelta(days=5))
+        self.hidden = Task.objects.create(title='Hidden', assigned_to=self.outsider, assigned_by=self.outsider)
+
+    def ids(self, user, query=''):
+        self.client.force_authenticate(user)
+        response = self.client.get(f'/api/tasks/{query}')
+        self.assertEqual(response.status_code, 200, response.content)
+        return [task['id'] for task in response.data]
+
+    def test_each_role_sees_its_scope(self):
+        everyone = {self.overdue.id, self.done.id, self.undated.id, self.delegated.id, self.hidden.id}
+        self.assertEqual(set(self.ids(self.member.user)), {self.overdue.id, self.done.id})
+        self.assertEqual(set(self.ids(self.lead.user)), everyone - {self.hidden.id})
+        self.assertEqual(set(self.ids(self.manager.user)), {self.overdue.id, self.done.id, self.undated.id})
+        self.assertEqual(set(self.ids(create_employee(role='admin').user)), everyone)
+        self.client.force_authenticate(self.member.user)
+        self.assertEqual(self.client.patch(f'/api/tasks/{self.hidden.id}/', {'title': 'Mine'}).status_code, 404)
+
+    def test_filters_and_ordering(self):
+        admin = create_employee(role='admin').user
+        self.assertEqual(self.ids(admin, '?overdue=true'), [self.overdue.id])
+        self.assertEqual(set(self.ids(admin, '?status=completed,submitted')), {self.done.id})
+        self.assertEqual(set(self.ids(admin, f'?assigned_by={self.lead.id}&status=in_progress')), {self.overdue.id, self.delegated.id})
+        today = timezone.now().date()
+        self.assertEqual(self.ids(admin, f'?deadline_after={today}&deadline_before={today + timedelta(days=7)}'), [self.delegated.id])
+        self.assertEqual(self.ids(admin, '?ordering=deadline')[:3], [self.done.id, self.overdue.id, self.delegated.id])
+
+        # Tasks without a deadline sort last and are still reached by the cursor
+        seen, url = [], '/api/tasks/?ordering=deadline,title&page_size=2'
+        while url:
+            response = self.client.get(url)
+            seen.extend(task['id'] for task in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, [self.done.id, self.overdue.id, self.delegated.id, self.hidden.id, self.undated.id])
+        sparse = self.client.get('/api/tasks/?fields=id&ordering=-deadline&page_size=10')
+        self.assertEqual([task['id'] for task in sparse.data['results']][:2], [self.hidden.id, self.undated.id])
+        for query in ('?ordering=salary', '?status=open', '?deadline_after=soon', '?assigned_to=me'):
+            self.assertEqual(self.client.get(f'/api/tasks/{query}').status_code, 400, query)
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class DeadlineScanTests(APITestCase):
+    def test_scan_writes_notices_once_and_refreshes_digests(self):
+        manager = create_employee(role='manager')
+        member = create_employee(manager=manager)
+        lead = create_employee(role='manager')
+        today = date(2026, 3, 10)
+        late = Task.objects.create(title='Late', assigned_to=member, assigned_by=lead, deadline=today - timedelta(days=4))
+        soon = Task.objects.create(title='Soon', assigned_to=member, deadline=today + timedelta(days=1))
+        Task.objects.create(title='Later', assigned_to=member, assigned_by=lead, deadline=today + timedelta(days=9))
+        Task.objects.create(title='Done', assigned_to=member, assigned_by=lead, status='completed', deadline=today - timedelta(days=1))
+
+        for _ in range(2):
+            call_command('scan_deadlines', '--date', today.isoformat(), '--batch-size', '1', stdout=StringIO())
+        self.assertEqual(
+            sorted(TaskDeadlineNotice.objects.values_list('task_id', 'kind', 'recipient_id')),
+            sorted([(late.id, 'overdue', lead.id), (soon.id, 'due_soon', manager.id)]),
+        )
+        self.assertEqual(
+            sorted(DeadlineDigest.objects.values_list('manager_id', 'overdue', 'due_soon', 'oldest_deadline')),
+            sorted([(lead.id, 1, 0, late.deadline), (manager.id, 0, 1, soon.deadline)]),
+        )
+
+        # The next day the due-soon task is overdue, and a finished task leaves the digest
+        late.status = 'completed'
+        late.save()
+        call_command('scan_deadlines', '--date', (today + timedelta(days=2)).isoformat(), stdout=StringIO())
+        self.assertTrue(TaskDeadlineNotice.objects.filter(task=soon, kind='overdue').exists())
+        self.assertEqual(
+            list(DeadlineDigest.objects.filter(date=today + timedelta(days=2)).values_list('manager_id', 'overdue')),
+            [(manager.id, 1)],
+        )
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.router = ReplicaRouter()
+
+    def route(self, method, token='a', write=False):
+        def view(request):
+            if write:
+                self.router.db_for_write(Task)
+            return HttpResponse(self.router.db_for_read(Task))
+        request = getattr(RequestFactory(), method.lower())('/api/tasks/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return ReplicaStickinessMiddleware(view)(request).content.decode()
+
+    def test_reads_stick_to_the_primary_after_a_write(self):
+        self.assertEqual(self.router.db_for_read(Task), 'default')
+        self.assertEqual(self.route('GET'), 'replica1')
+        self.assertEqual(self.route('POST'), 'default')
+        self.assertEqual(self.route('GET'), 'default')
+        self.assertEqual(self.route('GET', token='b'), 'replica1')
+        self.assertEqual(self.route('GET', token='c', write=True), 'default')
+        self.assertEqual(self.route('GET', token='c'), 'default')
+        cache.clear()
+        self.assertEqual(self.route('GET'), 'replica1')
+
+    def test_async_middleware_routes_the_same_way(self):
+        async def view(request):
+            return HttpResponse(self.router.db_for_read(Task))
+        middleware = ReplicaStickinessMiddleware(view)
+        factory = RequestFactory()
+        get = asyncio.run(middleware(factory.get('/api/tasks/', HTTP_AUTHORIZATION='Bearer d')))
+        asyncio.run(middleware(factory.post('/api/tasks/', HTTP_AUTHORIZATION='Bearer d')))
+        pinned = asyncio.run(middleware(factory.get('/api/tasks/', HTTP_AUTHORIZATION='Bearer d')))
+        self.assertEqual((get.content, pinned.content), (b'replica1', b'default'))
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class AttendanceArchiveTests(APITestCase):
+    def setUp(self):
+        self.employee = create_employee(department=Department.objects.create(name='Ops'))
+        self.client.force_authenticate(self.employee.user)
+        today = timezone.now().date()
+        self.old = add_months(month_start(today), -4).replace(day=10)
+        self.recent = today - timedelta(days=3)
+        for day in (self.old, self.old + timedelta(days=1), self.recent):
+            clock_in = timezone.make_aware(datetime.combine(day, datetime.min.time())) + timedelta(hours=9)
+            Attendance.objects.create(employee=self.employee, date=day, clock_in=clock_in, clock_out=clock_in + timedelta(hours=8))
+
+    def rollups(self):
+        return sorted(EmployeeMonthlyHours.objects.values_list('month', 'seconds_worked', 'days_present'))
+
+    def test_cold_months_move_to_the_archive_and_stay_readable(self):
+        call_command('rebuild_attendance_rollups', stdout=StringIO())
+        before = self.rollups()
+        self.assertEqual(len(before), 2)
+        call_command('archive_attendance', '--keep-months', '2', stdout=StringIO())
+        self.assertEqual(list(Attendance.objects.values_list('date', flat=True)), [self.recent])
+        archive = AttendanceArchive.objects.get()
+        self.assertEqual((archive.month, archive.days), (month_start(self.old), 2))
+        self.assertEqual(self.rollups(), before)
+        call_command('rebuild_attendance_rollups', stdout=StringIO())
+        self.assertEqual(self.rollups(), before)
+
+        history = self.client.get(f'/api/attendance/{self.employee.id}/history/?start={self.old}&end={self.recent}').json()
+        self.assertEqual([(record['date'], record['archived'], record['hours_worked']) for record in history['records']], [
+            (self.old.isoformat(), True, 8.0), ((self.old + timedelta(days=1)).isoformat(), True, 8.0), (self.recent.isoformat(), False, 8.0),
+        ])
+        matrix = self.client.get(f'/api/attendance/matrix/?department={self.employee.department_id}&start={self.old}&end={self.old + timedelta(days=1)}').json()
+        self.assertEqual(matrix['present'], [[1, 1]])
+
+        # A late row for an archived month is merged into its block on the next run
+        Attendance.objects.create(employee=self.employee, date=self.old + timedelta(days=2))
+        call_command('archive_attendance', '--keep-months', '2', stdout=StringIO())
+        self.assertEqual(AttendanceArchive.objects.get().days, 3)
+        self.assertEqual(Attendance.objects.count(), 1)
+
+    def test_the_last_31_days_stay_live_across_a_month_boundary(self):
+        Attendance.objects.all().delete()
+        for day in (date(2026, 12, 15), date(2027, 1, 31)):
+            Attendance.objects.create(employee=self.employee, date=day)
+        archived = apply_retention(2, today=date(2027, 3, 1))
+        self.assertEqual(archived, [(date(2026, 12, 1), 1)])
+        self.assertEqual(list(Attendance.objects.values_list('date', flat=True)), [date(2027, 1, 31)])
+
+    # My attendance is the last 30 records however old, not the last 30 live days
+    def test_my_attendance_reaches_back_past_the_live_months(self):
+        self.assertLess(self.old, live_since())
+        expected = [self.recent.isoformat(), (self.old + timedelta(days=1)).isoformat(), self.old.isoformat()]
+        self.assertEqual([record['date'] for record in self.client.get('/api/my-attendance/').json()], expected)
+
+        authorization = f'Bearer {RefreshToken.for_user(self.employee.user).access_token}'
+        with self.settings(ROOT_URLCONF=__name__):
+            native = async_to_sync(self.async_client.get)('/api/my-attendance/', headers={'Authorization': authorization})
+        self.assertEqual([record['date'] for record in json.loads(native.content)], expected)
@@ -1,7 +1,9 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
-from .views import LoginView, UserViewSet, TestAuthView, RequestAdminListView, RequestListCreateView, RequestReviewView, DepartmentViewSet, EmployeeViewSet, submit_task, review_task, department_employees, my_profile, TaskViewSet, MarkAttendanceView, EmployeeMonthlyAttendanceView, MyAttendanceView
+from .async_views import department_employees_async, event_stream, monthly_attendance_async, my_attendance_async, my_profile_async, task_list_async
+from .views import LoginView, UserViewSet, TestAuthView, RequestAdminListView, RequestListCreateView, RequestReviewView, DepartmentViewSet, EmployeeViewSet, submit_task, review_task, department_employees, my_profile, TaskViewSet, MarkAttendanceView, BulkMarkAttendanceView, AttendanceMatrixView, EmployeeMonthlyAttendanceView, EmployeeAttendanceHistoryView, MyAttendanceView, MonthlyHoursReportView, DepartmentHoursReportView, SyncView, ExportView, EmployeeImportView, OrgChartView
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet)
@@ -10,6 +12,8 @@ router.register(r'employees', EmployeeViewSet)
 router.register(r'tasks', TaskViewSet, basename='task')
 
 urlpatterns = [
+    # Listed ahead of the router so 'import' is not taken for an employee pk
+    path('employees/import/', EmployeeImportView.as_view(), name='employee-import'),
     path('', include(router.urls)),
     path('login/', LoginView.as_view(), name='login'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
@@ -17,13 +21,32 @@ urlpatterns = [
     path('my-profile/', my_profile),
     path('departments/<int:department_id>/employees/', department_employees),
     path('attendance/mark/', MarkAttendanceView.as_view(), name='mark-attendance'),
+    path('attendance/mark/bulk/', BulkMarkAttendanceView.as_view(), name='bulk-mark-attendance'),
+    path('attendance/matrix/', AttendanceMatrixView.as_view(), name='attendance-matrix'),
     path('attendance/<int:employee_id>/monthly/', EmployeeMonthlyAttendanceView.as_view(), name='monthly-attendance'),
+    path('attendance/<int:employee_id>/history/', EmployeeAttendanceHistoryView.as_view(), name='attendance-history'),
+    path('reports/hours/monthly/', MonthlyHoursReportView.as_view(), name='monthly-hours-report'),
+    path('reports/hours/departments/', DepartmentHoursReportView.as_view(), name='department-hours-report'),
     path('my-attendance/', MyAttendanceView.as_view(), name='my-attendance'),
     path('tasks/<int:task_id>/submit/', submit_task, name='submit_task'),
     path('tasks/<int:task_id>/review/', review_task, name='review_task'),
     path('requests/manager/', RequestListCreateView.as_view(), name='manager-requests'),
     path('requests/admin/', RequestAdminListView.as_view(), name='admin-requests'),
     path('requests/<int:pk>/review/', RequestReviewView.as_view(), name='request-review'),
+    path('sync/', SyncView.as_view(), name='sync'),
+    path('org-chart/', OrgChartView.as_view(), name='org-chart'),
+    path('events/', event_stream, name='events'),
+    path('export/<str:dataset>/', ExportView.as_view(), name='export'),
 
 
-]
\ No newline at end of file
+]
+
+# Under ASGI, the read-heavy endpoints can be served by native async views instead
+if settings.ASYNC_VIEWS:
+    urlpatterns = [
+        path('tasks/', task_list_async, name='task-list'),
+        path('my-profile/', my_profile_async),
+        path('departments/<int:department_id>/employees/', department_employees_async),
+        path('attendance/<int:employee_id>/monthly/', monthly_attendance_async, name='monthly-attendance'),
+        path('my-attendance/', my_attendance_async, name='my-attendance'),
+    ] + urlpatterns
\ No newline at end of file
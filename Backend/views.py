@@ -2,18 +2,61 @@ from rest_framework import viewsets, permissions, status, generics
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
-from .models import CustomUser, Department, Employee, Task, Attendance, Request
-from .serializers import DepartmentSerializer, CustomUserSerializer, EmployeeSerializer, AttendanceSerializer, TaskSerializer, RequestSerializer
+from .models import CustomUser, Department, Employee, EmployeeHierarchy, Task, Attendance, Request, EmployeeMonthlyHours, DepartmentDailyHours
+from .serializers import DepartmentSerializer, CustomUserSerializer, EmployeeSerializer, AttendanceSerializer, TaskSerializer, RequestSerializer, BulkAttendanceEntrySerializer
+from .conditional import ConditionalGetMixin, conditional_get, table_versions
+from .deadlines import OPEN_STATUSES
+from .export import EXPORTS, OUTPUT_FORMATS, aiterate, export_chunks
+from .hierarchy import org_chart
+from .onboarding import import_employees, parse_rows
+from .search import search_employees
+from .sync import changes_since, cursor_for_timestamp, latest_cursor, visible_tasks
+from .attendance import apply_attendance_action, attendance_date, attendance_history, attendance_matrix, mark_attendance_bulk, monthly_summary
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
-from datetime import timedelta
+from django.core.cache import cache
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import date, timedelta
+import json
+from decimal import Decimal
+
+
+# Applies the serializer's select/prefetch profile to the view queryset
+class EagerLoadingViewMixin:
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        fields = self.sparse_fields()
+        if hasattr(serializer_class, 'setup_eager_loading'):
+            queryset = serializer_class.setup_eager_loading(queryset, fields)
+        if fields is not None:
+            columns = serializer_class.only_columns(fields)
+            if columns is not None:
+                # The paginator reads the cursor fields off the page's edge rows
+                ordering = (name.lstrip('-') for name in getattr(self, 'cursor_ordering', ()))
+                queryset = queryset.only(*columns, *(name for name in ordering if name not in queryset.query.annotations))
+        return queryset
+
+    # The ?fields= / ?exclude= selection for reads, or None for the full representation
+    def sparse_fields(self):
+        serializer_class = self.get_serializer_class()
+        if self.request.method not in ('GET', 'HEAD') or not hasattr(serializer_class, 'sparse_fieldset'):
+            return None
+        return serializer_class.sparse_fieldset(self.request.query_params)
 
 
 # Returns the past 30 days of attendance for a specific employee
-class EmployeeMonthlyAttendanceView(APIView):
+class EmployeeMonthlyAttendanceView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
+    etag_models = (Attendance, Employee)
 
     def get(self, request, employee_id):
         today = timezone.now().date()
@@ -25,41 +68,245 @@ class EmployeeMonthlyAttendanceView(APIView):
             return Response({'error': 'Employee not found'}, status=404)
 
         attendances = Attendance.objects.filter(employee=employee, date__gte=thirty_days_ago)
+        return Response(monthly_summary(attendances, today))
+
+
+# One employee's attendance between ?start= and ?end= (default: the last 30 days), including
+# months already moved to the archive; each record says whether it came from there
+class EmployeeAttendanceHistoryView(ConditionalGetMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    etag_models = (Attendance, Employee)
+    max_days = 366
+
+    def get(self, request, employee_id):
+        today = timezone.now().date()
+        try:
+            end = date.fromisoformat(request.query_params.get('end', today.isoformat()))
+            start = date.fromisoformat(request.query_params.get('start', (end - timedelta(days=29)).isoformat()))
+        except ValueError:
+            return Response({'error': 'Invalid start or end date'}, status=400)
+        if start > end or (end - start).days >= self.max_days:
+            return Response({'error': f'Date range must be between 1 and {self.max_days} days'}, status=400)
+        if not Employee.objects.filter(id=employee_id).exists():
+            return Response({'error': 'Employee not found'}, status=404)
+        return Response({'employee': employee_id, 'start': start, 'end': end, 'records': attendance_history(employee_id, start, end)})
+
+
+# Returns an employees x days attendance grid for a department or a manager's team
+class AttendanceMatrixView(ConditionalGetMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    etag_models = (Attendance, Employee)
+    max_days = 366
+
+    def get(self, request):
+        department_id = request.query_params.get('department')
+        manager_id = request.query_params.get('manager')
+        if bool(department_id) == bool(manager_id):
+            return Response({'error': 'Pass exactly one of department or manager'}, status=400)
+
+        today = timezone.now().date()
+        try:
+            end = date.fromisoformat(request.query_params.get('end', today.isoformat()))
+            start = date.fromisoformat(request.query_params.get('start', (end - timedelta(days=29)).isoformat()))
+            employees = Employee.objects.filter(department_id=int(department_id)) if department_id else Employee.objects.filter(manager_id=int(manager_id))
+        except ValueError:
+            return Response({'error': 'Invalid department, manager or date'}, status=400)
+        if start > end or (end - start).days >= self.max_days:
+            return Response({'error': f'Date range must be between 1 and {self.max_days} days'}, status=400)
+
+        return Response(attendance_matrix(employees, start, end))
 
-        # Create a map to quickly find attendance by date
-        attendance_map = {att.date: att for att in attendances}
-        result = []
-
-        # Generate attendance summary for each of the last 30 days
-        for i in range(30):
-            day = today - timedelta(days=i)
-            att = attendance_map.get(day)
-            result.append({
-                'date': day,
-                'clock_in': att.clock_in if att else None,
-                'clock_out': att.clock_out if att else None,
-                'was_present': bool(att and att.clock_in),
+
+# Hours worked per employee for one month (?month=YYYY-MM), read from the monthly rollup
+class MonthlyHoursReportView(ConditionalGetMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    etag_models = (Attendance, Employee)
+
+    def get(self, request):
+        department_id = request.query_params.get('department')
+        try:
+            month = date.fromisoformat(request.query_params.get('month', timezone.now().strftime('%Y-%m')) + '-01')
+            department_id = int(department_id) if department_id else None
+        except ValueError:
+            return Response({'error': 'month must be YYYY-MM and department an id'}, status=400)
+
+        rows = EmployeeMonthlyHours.objects.filter(month=month)
+        if department_id is not None:
+            rows = rows.filter(employee__department_id=department_id)
+
+        data = []
+        for row in rows.values('employee_id', 'employee__first_name', 'employee__last_name', 'seconds_worked', 'days_present'):
+            data.append({
+                'employee_id': row['employee_id'],
+                'name': f"{row['employee__first_name']} {row['employee__last_name']}",
+                'hours_worked': round(row['seconds_worked'] / 3600, 2),
+                'days_present': row['days_present'],
             })
+        return Response({'month': month.strftime('%Y-%m'), 'employees': data})
 
-        return Response(result[::-1])  # Reverse for chronological order
+
+# Hours worked per department over a date range, read from the daily department rollup
+class DepartmentHoursReportView(ConditionalGetMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    etag_models = (Attendance, Department)
+    max_days = 366
+
+    def get(self, request):
+        today = timezone.now().date()
+        try:
+            end = date.fromisoformat(request.query_params.get('end', today.isoformat()))
+            start = date.fromisoformat(request.query_params.get('start', end.replace(day=1).isoformat()))
+        except ValueError:
+            return Response({'error': 'Invalid start or end date'}, status=400)
+        if start > end or (end - start).days >= self.max_days:
+            return Response({'error': f'Date range must be between 1 and {self.max_days} days'}, status=400)
+
+        rows = (
+            DepartmentDailyHours.objects.filter(date__range=(start, end))
+            .values('department_id', 'department__name')
+            .annotate(seconds=Sum('seconds_worked'), attendance_days=Sum('employees_present'))
+            .order_by('department__name')
+        )
+        data = []
+        for row in rows:
+            data.append({
+                'department_id': row['department_id'],
+                'department_name': row['department__name'],
+                'hours_worked': round(row['seconds'] / 3600, 2),
+                'attendance_days': row['attendance_days'],
+            })
+        return Response({'start': start, 'end': end, 'departments': data})
 
 
 # Returns the last 30 attendance records for the logged-in employee
-class MyAttendanceView(APIView):
+class MyAttendanceView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
+    etag_models = (Attendance, Employee)
 
     def get(self, request):
         employee = request.user.employee_profile
-        attendances = Attendance.objects.filter(employee=employee).order_by('-date')[:30]  
+        attendances = AttendanceSerializer.setup_eager_loading(
+            Attendance.objects.filter(employee=employee)
+        ).order_by('-date')[:30]
         serializer = AttendanceSerializer(attendances, many=True)
         return Response(serializer.data)
 
 
-# Handles full CRUD for tasks
-class TaskViewSet(viewsets.ModelViewSet):
-    queryset = Task.objects.all()
+# Handles full CRUD for the tasks the caller may see (see visible_tasks). Lists filter on
+# ?status=<a,b> ?assigned_to= ?assigned_by= ?deadline_after= ?deadline_before= ?overdue=true
+# and sort by ?ordering=<field,-field> over ordering_fields.
+class TaskViewSet(ConditionalGetMixin, EagerLoadingViewMixin, viewsets.ModelViewSet):
+    # The paginator needs a non-null sort key, so tasks without a deadline sort as the latest
+    queryset = Task.objects.annotate(deadline_key=Coalesce('deadline', Value(date.max)))
     serializer_class = TaskSerializer
+    etag_models = (Task, Employee)
     permission_classes = [permissions.IsAuthenticated]
+    ordering_fields = {'created_at': 'created_at', 'updated_at': 'updated_at', 'deadline': 'deadline_key', 'status': 'status', 'title': 'title'}
+    filter_params = ('status', 'assigned_to', 'assigned_by', 'deadline_after', 'deadline_before', 'overdue', 'ordering')
+
+    @property
+    def cursor_ordering(self):
+        requested = self.request.query_params.get('ordering') if self.action == 'list' else None
+        if not requested:
+            return ('-created_at', '-id')
+        ordering = []
+        for name in requested.split(','):
+            field = self.ordering_fields.get(name.strip().lstrip('-'))
+            if field is None:
+                raise ValidationError({'ordering': f"Unknown field '{name.strip()}'; choose from {', '.join(self.ordering_fields)}."})
+            ordering.append(f'-{field}' if name.strip().startswith('-') else field)
+        ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return tuple(ordering)
+
+    def get_queryset(self):
+        return visible_tasks(self.request.user, super().get_queryset())
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action != 'list':
+            return queryset
+        params = self.request.query_params
+        if params.get('status'):
+            statuses = params['status'].split(',')
+            choices = [value for value, _ in Task.STATUS_CHOICES]
+            if any(value not in choices for value in statuses):
+                raise ValidationError({'status': f"Choose from {', '.join(choices)}."})
+            queryset = queryset.filter(status__in=statuses)
+        for name in ('assigned_to', 'assigned_by'):
+            if params.get(name):
+                if not params[name].isdigit():
+                    raise ValidationError({name: 'Expected an employee id.'})
+                queryset = queryset.filter(**{f'{name}_id': int(params[name])})
+        for name, lookup in (('deadline_after', 'deadline__gte'), ('deadline_before', 'deadline__lte')):
+            if params.get(name):
+                try:
+                    day = parse_date(params[name])
+                except ValueError:
+                    day = None
+                if day is None:
+                    raise ValidationError({name: 'Expected a YYYY-MM-DD date.'})
+                queryset = queryset.filter(**{lookup: day})
+        if params.get('overdue') == 'true':
+            queryset = queryset.filter(status__in=OPEN_STATUSES, deadline__lt=timezone.now().date())
+        return queryset.order_by(*self.cursor_ordering)
+
+
+# Delta feed of task, request and attendance changes after ?cursor= (or ?since=<ISO datetime>).
+# Without either it returns the current cursor and reset=true so the client does one full load.
+class SyncView(APIView):
+    permission_classes = [IsAuthenticated]
+    default_limit = 500
+    max_limit = 1000
+
+    def get(self, request):
+        params = request.query_params
+        if 'cursor' not in params and 'since' not in params:
+            return Response({'reset': True, 'cursor': latest_cursor()})
+
+        try:
+            limit = max(1, min(int(params.get('limit', self.default_limit)), self.max_limit))
+            if 'cursor' in params:
+                cursor = int(params['cursor'])
+            else:
+                since = parse_datetime(params['since'])
+                if since is None:
+                    raise ValueError
+                if timezone.is_naive(since):
+                    since = timezone.make_aware(since)
+                cursor = cursor_for_timestamp(since)
+        except ValueError:
+            return Response({'error': 'Invalid cursor, since or limit'}, status=400)
+
+        return Response(changes_since(request.user, cursor, limit))
+
+
+# Streams a whole dataset as CSV or NDJSON (?output=csv|ndjson), optionally limited to
+# ?start=/?end= dates. `format` is taken by DRF's content negotiation, hence `output`.
+class ExportView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, dataset):
+        if dataset not in EXPORTS:
+            return Response({'error': f"Unknown dataset; choose one of {', '.join(EXPORTS)}"}, status=404)
+        output = request.query_params.get('output', 'csv')
+        if output not in OUTPUT_FORMATS:
+            return Response({'error': f"Unknown output; choose one of {', '.join(OUTPUT_FORMATS)}"}, status=400)
+        dates = {}
+        for name in ('start', 'end'):
+            value = request.query_params.get(name)
+            try:
+                dates[name] = parse_date(value) if value else None
+            except ValueError:
+                dates[name] = None
+            if value and dates[name] is None:
+                return Response({'error': f'{name} must be a YYYY-MM-DD date'}, status=400)
+
+        chunks = export_chunks(dataset, output, dates['start'], dates['end'])
+        if hasattr(request._request, 'scope'):
+            chunks = aiterate(chunks)
+        response = StreamingHttpResponse(chunks, content_type=OUTPUT_FORMATS[output])
+        response['Content-Disposition'] = f'attachment; filename="{dataset}.{output}"'
+        return response
 
 
 # Handles clock in/out attendance submission for a given employee
@@ -75,25 +322,59 @@ class MarkAttendanceView(APIView):
         except Employee.DoesNotExist:
             return Response({'error': 'Employee not found'}, status=404)
 
-        today = timezone.now().date()
-        attendance, created = Attendance.objects.get_or_create(employee=employee, date=today)
+        now = timezone.now()
+        with transaction.atomic():
+            attendance, created = Attendance.objects.get_or_create(employee=employee, date=attendance_date(now))
 
-        if action == 'clock_in':
-            attendance.clock_in = timezone.now()
-        elif action == 'clock_out':
-            attendance.clock_out = timezone.now()
-        else:
-            return Response({'error': 'Invalid action'}, status=400)
+            try:
+                apply_attendance_action(attendance, action, now)
+            except ValueError:
+                return Response({'error': 'Invalid action'}, status=400)
 
-        attendance.save()
+            attendance.save()
         return Response(AttendanceSerializer(attendance).data)
 
 
+# Clocks a whole shift in or out in one request; each entry gets its own result
+class BulkMarkAttendanceView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+    max_entries = 1000
+
+    def post(self, request):
+        entries = request.data.get('entries') if isinstance(request.data, dict) else request.data
+        if not isinstance(entries, list) or not entries:
+            return Response({'error': 'Expected a non-empty list of entries'}, status=400)
+        if len(entries) > self.max_entries:
+            return Response({'error': f'At most {self.max_entries} entries per request'}, status=400)
+
+        results = [None] * len(entries)
+        valid_indexes = []
+        valid_entries = []
+        for index, entry in enumerate(entries):
+            serializer = BulkAttendanceEntrySerializer(data=entry)
+            if serializer.is_valid():
+                valid_indexes.append(index)
+                valid_entries.append(serializer.validated_data)
+            else:
+                results[index] = {'index': index, 'status': 'error', 'errors': serializer.errors}
+
+        for index, outcome in zip(valid_indexes, mark_attendance_bulk(valid_entries)):
+            result = {'index': index, 'employee_id': entries[index]['employee_id']}
+            if 'error' in outcome:
+                result.update(status='error', errors={'employee_id': [outcome['error']]})
+            else:
+                result.update(status='ok', attendance=AttendanceSerializer(outcome['attendance']).data)
+            results[index] = result
+
+        return Response({'results': results})
+
+
 # Returns the profile of the currently logged-in user
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_get(Employee, Department, CustomUser)
 def my_profile(request):
-    employee = Employee.objects.select_related('department').get(user=request.user)
+    employee = EmployeeSerializer.setup_eager_loading(Employee.objects.all()).get(user=request.user)
     serializer = EmployeeSerializer(employee)
     return Response(serializer.data)
 
@@ -127,6 +408,7 @@ class LoginView(APIView):
 # Lists employees in a specific department
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@conditional_get(Employee, CustomUser)
 def department_employees(request, department_id):
     employees = Employee.objects.filter(department__id=department_id).select_related('user')
     data = []
@@ -143,9 +425,11 @@ def department_employees(request, department_id):
 
 
 # User CRUD operations with permission filtering
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ConditionalGetMixin, EagerLoadingViewMixin, viewsets.ModelViewSet):
     queryset = CustomUser.objects.all()
     serializer_class = CustomUserSerializer
+    etag_models = (CustomUser,)
+    cursor_ordering = ('-date_joined', '-id')
     
     def get_permissions(self):
         if self.action == 'list':
@@ -170,9 +454,30 @@ class TestAuthView(APIView):
 
 
 # Full CRUD for departments with admin-only modification
-class DepartmentViewSet(viewsets.ModelViewSet):
+class DepartmentViewSet(ConditionalGetMixin, EagerLoadingViewMixin, viewsets.ModelViewSet):
     queryset = Department.objects.all()
     serializer_class = DepartmentSerializer
+    etag_models = (Department, Employee)
+    cursor_ordering = ('-created_at', '-id')
+
+    # Headcount and payroll come from one GROUP BY query, or from DepartmentStats when enabled.
+    # Each is only computed when the response includes it.
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.sparse_fields()
+        if settings.USE_DEPARTMENT_STATS:
+            annotations = {
+                'employee_count': Coalesce('stats__employee_count', 0),
+                'total_salary': Coalesce('stats__total_salary', Value(Decimal('0.00'))),
+            }
+        else:
+            annotations = {
+                'employee_count': Count('employees'),
+                'total_salary': Sum('employees__salary'),
+            }
+        return queryset.annotate(**{
+            name: expression for name, expression in annotations.items() if fields is None or name in fields
+        })
     
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -183,9 +488,12 @@ class DepartmentViewSet(viewsets.ModelViewSet):
     
 
 # Full CRUD for employees with admin-only modification
-class EmployeeViewSet(viewsets.ModelViewSet):
+class EmployeeViewSet(ConditionalGetMixin, EagerLoadingViewMixin, viewsets.ModelViewSet):
     queryset = Employee.objects.all()
     serializer_class = EmployeeSerializer
+    etag_models = (Employee, Department, CustomUser)
+    cursor_ordering = ('id',)
+    lookup_value_regex = r'\d+'
     
     def get_permissions(self):
         if self.action in ['create', 'update', 'partial_update', 'destroy']:
@@ -194,6 +502,139 @@ class EmployeeViewSet(viewsets.ModelViewSet):
             permission_classes = [permissions.IsAuthenticated]
         return [permission() for permission in permission_classes]
 
+    def missing_employee(self, pk):
+        if not Employee.objects.filter(pk=pk).exists():
+            return Response({'error': 'Employee not found'}, status=404)
+        return None
+
+    # Everyone below the employee at any depth (?max_depth= limits it), from one closure-table join
+    @action(detail=True)
+    def subtree(self, request, pk=None):
+        links = {'ancestor_links__ancestor_id': pk, 'ancestor_links__depth__gt': 0}
+        if request.query_params.get('max_depth', '').isdigit():
+            links['ancestor_links__depth__lte'] = int(request.query_params['max_depth'])
+        queryset = self.get_queryset().filter(**links).annotate(depth=F('ancestor_links__depth')).order_by('id')
+        page = self.paginate_queryset(queryset)
+        employees = list(page if page is not None else queryset)
+        if not employees:
+            missing = self.missing_employee(pk)
+            if missing:
+                return missing
+        data = self.get_serializer(employees, many=True).data
+        for item, employee in zip(data, employees):
+            item['depth'] = employee.depth
+        return self.get_paginated_response(data) if page is not None else Response(data)
+
+    # The reporting line from the direct manager up to the top
+    @action(detail=True)
+    def chain(self, request, pk=None):
+        employees = list(
+            self.get_queryset().filter(descendant_links__descendant_id=pk, descendant_links__depth__gt=0)
+            .annotate(depth=F('descendant_links__depth')).order_by('depth')
+        )
+        if not employees:
+            missing = self.missing_employee(pk)
+            if missing:
+                return missing
+        data = self.get_serializer(employees, many=True).data
+        for item, employee in zip(data, employees):
+            item['depth'] = employee.depth
+        return Response(data)
+
+    # Headcount and payroll of the whole subtree, aggregated over the closure table
+    @action(detail=True, url_path='subtree/stats')
+    def subtree_stats(self, request, pk=None):
+        totals = EmployeeHierarchy.objects.filter(ancestor_id=pk, depth__gt=0).aggregate(
+            headcount=Count('id'),
+            direct_reports=Count('id', filter=Q(depth=1)),
+            total_salary=Sum('descendant__salary'),
+            depth=Max('depth'),
+        )
+        if not totals['headcount']:
+            missing = self.missing_employee(pk)
+            if missing:
+                return missing
+        return Response({
+            'employee': int(pk),
+            'headcount': totals['headcount'],
+            'direct_reports': totals['direct_reports'],
+            'total_salary': totals['total_salary'] or Decimal('0.00'),
+            'depth': totals['depth'] or 0,
+        })
+
+    # Ranked search over names, employee id, position, department and email (?q=, ?limit=),
+    # tolerant of prefixes and typos; each result carries its `score`
+    @action(detail=False)
+    def search(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({'error': 'q is required'}, status=400)
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+            if limit < 1:
+                raise ValueError
+        except ValueError:
+            return Response({'error': 'limit must be a positive integer'}, status=400)
+
+        ranked = search_employees(query, limit)
+        employees = self.get_queryset().in_bulk([employee_id for employee_id, _ in ranked])
+        results = [(employees[employee_id], score) for employee_id, score in ranked if employee_id in employees]
+        data = self.get_serializer([employee for employee, _ in results], many=True).data
+        for item, (_, score) in zip(data, results):
+            item['score'] = score
+        return Response(data)
+
+
+# Bulk onboarding: a CSV or JSON file upload (`file`) or a JSON body of rows. Every row is
+# validated first; any error rejects the whole batch with per-row messages. ?dry_run=true
+# only validates.
+class EmployeeImportView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        try:
+            if upload is not None:
+                rows = parse_rows(upload.read(), upload.name)
+            else:
+                rows = request.data.get('employees') if isinstance(request.data, dict) else request.data
+        except (ValueError, KeyError, UnicodeDecodeError):
+            return Response({'error': 'Could not parse the uploaded file'}, status=400)
+        if not isinstance(rows, list) or not rows:
+            return Response({'error': 'Expected a non-empty list of employees'}, status=400)
+
+        result = import_employees(rows, dry_run=request.query_params.get('dry_run') == 'true')
+        return Response(result, status=400 if result['errors'] else 201)
+
+
+# Whole-organization chart as nested JSON (?root=<employee id> to start lower, ?depth=<levels>
+# to cut it short). Built from one values_list query and cached as rendered JSON until the
+# Employee or Department version moves.
+class OrgChartView(ConditionalGetMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    etag_models = (Employee, Department)
+
+    def get(self, request):
+        try:
+            root = int(request.query_params['root']) if request.query_params.get('root') else None
+            depth = int(request.query_params['depth']) if request.query_params.get('depth') else None
+            if depth is not None and depth < 0:
+                raise ValueError
+        except ValueError:
+            return Response({'error': 'root and depth must be non-negative integers'}, status=400)
+
+        versions = table_versions(self.etag_models)
+        key = 'org-chart:{}:{}:{}'.format(':'.join(str(versions[name][0]) for name in sorted(versions)), root, depth)
+        body = cache.get(key)
+        if body is None:
+            rows = Employee.objects.values_list('id', 'manager_id', 'first_name', 'last_name', 'position', 'department__name')
+            chart = org_chart(rows.iterator(chunk_size=5000), root, depth)
+            if chart is None:
+                return Response({'error': 'Employee not found'}, status=404)
+            body = json.dumps(chart, separators=(',', ':')).encode()
+            cache.set(key, body, settings.ORG_CHART_CACHE_TIMEOUT)
+        return HttpResponse(body, content_type='application/json')
+
 
 # Endpoint for employees to submit a task for review
 @api_view(['POST'])
@@ -241,26 +682,31 @@ def review_task(request, task_id):
 
 
 # List and create requests from managers
-class RequestListCreateView(generics.ListCreateAPIView):
+class RequestListCreateView(ConditionalGetMixin, EagerLoadingViewMixin, generics.ListCreateAPIView):
+    queryset = Request.objects.all()
     serializer_class = RequestSerializer
+    etag_models = (Request, Employee)
     permission_classes = [permissions.IsAuthenticated]
+    cursor_ordering = ('-date_submitted', '-id')
 
     def get_queryset(self):
-        return Request.objects.filter(submitted_by=self.request.user.employee_profile)
+        return super().get_queryset().filter(submitted_by=self.request.user.employee_profile)
 
     def perform_create(self, serializer):
         serializer.save(submitted_by=self.request.user.employee_profile)
 
 
 # List all requests for admins
-class RequestAdminListView(generics.ListAPIView):
+class RequestAdminListView(ConditionalGetMixin, EagerLoadingViewMixin, generics.ListAPIView):
     queryset = Request.objects.all()
     serializer_class = RequestSerializer
+    etag_models = (Request, Employee)
+    cursor_ordering = ('-date_submitted', '-id')
     permission_classes = [permissions.IsAdminUser]
 
 
 # Admin can review a request and mark it completed or declined
-class RequestReviewView(generics.UpdateAPIView):
+class RequestReviewView(EagerLoadingViewMixin, generics.UpdateAPIView):
     queryset = Request.objects.all()
     serializer_class = RequestSerializer
     permission_classes = [permissions.IsAdminUser]
@@ -44,6 +44,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'Backend.metrics.RequestMetricsMiddleware',
+    'Backend.replicas.ReplicaStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,6 +81,10 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'EMS_Backend.wsgi.application'
+ASGI_APPLICATION = 'EMS_Backend.asgi.application'
+
+# Route the read-heavy endpoints to the async views in Backend/async_views.py (use with ASGI)
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'False') == 'True'
 
 
 # Database
@@ -96,6 +102,49 @@ if 'DATABASE_URL' in os.environ:
         conn_health_checks=True,
     )
 
+# Read replicas, as comma-separated database URLs (e.g. sqlite:///replica.sqlite3 locally).
+# Backend.replicas routes safe requests' reads to them; tests mirror them onto default.
+DATABASE_REPLICAS = []
+for number, url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), start=1):
+    DATABASES[f'replica{number}'] = {
+        **dj_database_url.parse(url.strip(), conn_max_age=600, conn_health_checks=True),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{number}')
+DATABASE_ROUTERS = ['Backend.replicas.ReplicaRouter']
+
+# After a write, the writer's reads stay on the primary for this many seconds
+REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+REPLICA_PIN_CACHE = 'default'
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+}
+if 'REDIS_URL' in os.environ:
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+
+# Authenticated users are cached for this many seconds by CachedJWTAuthentication. Only a
+# shared cache sees every worker's invalidations, so caching stays off (None) without Redis.
+AUTH_USER_CACHE = 'default' if 'REDIS_URL' in os.environ else None
+AUTH_USER_CACHE_TIMEOUT = int(os.environ.get('AUTH_USER_CACHE_TIMEOUT', 300))
+
+# Rendered /api/org-chart/ responses are keyed by table versions, so this only bounds memory use
+ORG_CHART_CACHE_TIMEOUT = int(os.environ.get('ORG_CHART_CACHE_TIMEOUT', 3600))
+
+# Pub/sub backing /api/events/. The in-process broker only reaches clients connected
+# to the same process; point this at a shared broker before running several workers.
+EVENT_BROKER = os.environ.get('EVENT_BROKER', 'Backend.events.InProcessBroker')
+EVENT_HEARTBEAT_SECONDS = int(os.environ.get('EVENT_HEARTBEAT_SECONDS', 20))
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -140,8 +189,35 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'Backend.authentication.CachedJWTAuthentication',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'Backend.pagination.KeysetCursorPagination',
+    'DEFAULT_RENDERER_CLASSES': (
+        'Backend.metrics.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+}
+
+# Request metrics (Backend.metrics.RequestMetricsMiddleware): queries slower than
+# METRICS_SLOW_QUERY_MS are logged, and METRICS_PROFILE_SAMPLE_RATE of requests are
+# profiled, with profiles of requests slower than METRICS_PROFILE_MIN_MS logged
+METRICS_SLOW_QUERY_MS = float(os.environ.get('METRICS_SLOW_QUERY_MS', 200))
+METRICS_PROFILE_SAMPLE_RATE = float(os.environ.get('METRICS_PROFILE_SAMPLE_RATE', 0))
+METRICS_PROFILE_MIN_MS = float(os.environ.get('METRICS_PROFILE_MIN_MS', 500))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'Backend.metrics': {
+            'handlers': ['console'],
+            'level': os.environ.get('METRICS_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
 }
 
 from datetime import timedelta
@@ -152,3 +228,6 @@ SIMPLE_JWT = {
 }
 
 AUTH_USER_MODEL = 'Backend.CustomUser'
+
+# Serve department headcount/payroll from the denormalized DepartmentStats table
+USE_DEPARTMENT_STATS = os.environ.get('USE_DEPARTMENT_STATS', 'False') == 'True'
@@ -51,4 +51,24 @@ apiClient.interceptors.response.use(
   }
 );
 
-export default apiClient;
\ No newline at end of file
+export default apiClient;
+
+// Fetches one keyset page of a list endpoint. Passing pageSize opts into
+// server-side pagination; follow `next` from the response for deeper pages.
+export const fetchPage = (url, { pageSize = 50, cursor } = {}, config = {}) =>
+  axios.get(cursor || url, {
+    ...config,
+    params: cursor ? config.params : { ...config.params, page_size: pageSize },
+  });
+
+// Walks every page of a paginated list endpoint and returns the combined rows.
+export const fetchAllPages = async (url, pageSize = 200, config = {}) => {
+  const rows = [];
+  let response = await fetchPage(url, { pageSize }, config);
+  rows.push(...response.data.results);
+  while (response.data.next) {
+    response = await fetchPage(url, { cursor: response.data.next }, config);
+    rows.push(...response.data.results);
+  }
+  return rows;
+};